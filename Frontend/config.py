@@ -15,6 +15,9 @@ PRODUCTS = [
 
 # API Configuration
 API_BASE_URL = "http://localhost:8000"
+# Seconds the backend may spend on an AI request (sent as X-Request-Timeout); after
+# that the backend gives up and stops the upstream call instead of answering nobody
+AI_REQUEST_TIMEOUT = 90
 
 # Order Settings
 AUTO_APPROVAL_LIMIT = 100  # Orders above this amount (EUR) require manual approval
@@ -54,6 +57,8 @@ def init_session_state():
         st.session_state.voice_chat_recommendations = None  # Final recommendations from AI
     if 'voice_chat_pending' not in st.session_state:
         st.session_state.voice_chat_pending = False  # Flag to trigger AI response on next render
+    if 'voice_chat_session_id' not in st.session_state:
+        st.session_state.voice_chat_session_id = None  # Backend chat session holding the history
     # Image Chat Flow state
     if 'image_chat_messages' not in st.session_state:
         st.session_state.image_chat_messages = []  # Chat history for image analysis
@@ -62,7 +67,7 @@ def init_session_state():
     if 'image_chat_pending' not in st.session_state:
         st.session_state.image_chat_pending = False  # Flag for pending AI response
     if 'image_uploaded_data' not in st.session_state:
-        st.session_state.image_uploaded_data = None  # Base64 encoded image data
+        st.session_state.image_uploaded_data = None  # Uploaded image (bytes, media type, backend image_id)
     # Last order status for visual feedback
     if 'last_order_status' not in st.session_state:
         st.session_state.last_order_status = None  # "Auto-Approved", "Admin Approved", "Order Declined"
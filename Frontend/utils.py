@@ -2,9 +2,11 @@
 Helper functions for cart management, orders, and navigation
 """
 import streamlit as st
+import json
 import random
+import requests
 from datetime import datetime
-from config import AUTO_APPROVAL_LIMIT
+from config import API_BASE_URL, AUTO_APPROVAL_LIMIT, AI_REQUEST_TIMEOUT
 
 
 def add_to_cart(product, qty, add_mode=True):
@@ -85,3 +87,89 @@ def navigate_to(page):
     """Navigate to a different page"""
     st.session_state.current_page = page
 
+
+
+def iter_sse_events(response):
+    """Yield (event, data) pairs from a streamed text/event-stream response (data is JSON)"""
+    response.encoding = "utf-8"
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            # blank line ends an event
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+
+def render_streamed_items(placeholder, items):
+    """Show the materials received so far while the AI is still answering"""
+    lines = [
+        f"- **{item.get('artikelname') or item.get('artikel_id', 'Unknown')}** × {item.get('anzahl', 0)} "
+        f"— €{item.get('preis_gesamt', 0):.2f}"
+        for item in items
+    ]
+    placeholder.markdown("\n".join(lines))
+
+
+def ai_request_headers():
+    """Headers for AI endpoints: the deadline the backend enforces around the LLM call"""
+    return {"X-Request-Timeout": str(AI_REQUEST_TIMEOUT)}
+
+
+def upload_image(image_bytes, media_type):
+    """Store an image in the backend once (raw bytes, no base64); returns its image_id, or None (send it inline instead)"""
+    try:
+        response = requests.post(f"{API_BASE_URL}/images/raw", data=image_bytes,
+                                 headers={"Content-Type": media_type}, timeout=30)
+        if response.ok:
+            return response.json()["image_id"]
+    except requests.RequestException:
+        pass
+    return None
+
+
+def analyze_images(images, message=None):
+    """
+    Analyze several images (each {"image_id"} or inline) into one merged order.
+    Returns the /analyze_images result, or {"type": "error", "content": ...}.
+    """
+    try:
+        response = requests.post(f"{API_BASE_URL}/analyze_images", json={"images": images, "message": message or None},
+                                 headers=ai_request_headers(), timeout=(5, AI_REQUEST_TIMEOUT + 5))
+    except requests.RequestException as e:
+        return {"type": "error", "content": f"Could not connect to backend: {e}"}
+    if response.status_code == 504:
+        return {"type": "error", "content": "The AI took too long to answer, please try again"}
+    if not response.ok:
+        return {"type": "error", "content": f"Backend Error: {response.status_code}"}
+    return response.json()
+
+
+def stream_ai_result(url, payload, placeholder):
+    """
+    POST to a streaming endpoint, showing each priced item in `placeholder` as it arrives.
+    Returns the final result of the "done" event (same shape as the non-streaming endpoint),
+    or {"type": "expired"} when the backend no longer has the chat session or image it refers to.
+    """
+    items = []
+    with requests.post(url, json=payload, stream=True, headers=ai_request_headers(),
+                       timeout=(5, AI_REQUEST_TIMEOUT + 5)) as response:
+        if response.status_code == 504:
+            return {"type": "error", "content": "The AI took too long to answer, please try again"}
+        if response.status_code == 410:
+            return {"type": "expired", "content": response.json().get("detail", "Expired")}
+        if not response.ok:
+            return {"type": "error", "content": f"Backend Error: {response.status_code}"}
+        for event, data in iter_sse_events(response):
+            if event == "item":
+                items.append(data)
+                render_streamed_items(placeholder, items)
+            elif event == "done":
+                return data
+            elif event == "error":
+                return {"type": "error", "content": data.get("detail", "Unknown error")}
+    return {"type": "error", "content": "Stream ended without a result"}
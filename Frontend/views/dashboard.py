@@ -3,9 +3,9 @@ Dashboard View - Product Search with AI recommendations
 """
 import streamlit as st
 import requests
-from utils import add_to_cart
+from utils import add_to_cart, ai_request_headers
 from components import render_order_summary
-from config import API_BASE_URL
+from config import API_BASE_URL, AI_REQUEST_TIMEOUT
 
 
 def dashboard_view():
@@ -41,7 +41,9 @@ def dashboard_view():
                 try:
                     response = requests.post(
                         f"{API_BASE_URL}/receive_user_prompt",
-                        json={"prompt": search_query}
+                        json={"prompt": search_query},
+                        headers=ai_request_headers(),
+                        timeout=(5, AI_REQUEST_TIMEOUT + 5)
                     )
                     response.raise_for_status()
                     response_data = response.json()
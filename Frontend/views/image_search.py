@@ -2,49 +2,49 @@
 Image Search View - Analyze images (handwritten lists or photos of parts)
 """
 import streamlit as st
-import requests
 import base64
 from config import API_BASE_URL
 from components import render_chat_message, render_order_summary
-from utils import add_to_cart
+from utils import add_to_cart, analyze_images, stream_ai_result, upload_image
 
 
-def process_image_response():
-    """Call the AI backend to analyze the image and process the response"""
+def image_reference(image):
+    """The image_id of an uploaded image, or the image inline (base64) if the upload failed"""
+    if image.get("image_id"):
+        return {"image_id": image["image_id"]}
+    return {"image_base64": base64.b64encode(image["bytes"]).decode('utf-8'), "media_type": image["media_type"]}
+
+
+def process_image_response(live_items):
+    """Call the streaming AI backend to analyze the image and process the response"""
+    image = st.session_state.image_uploaded_data
     try:
-        response = requests.post(
-            f"{API_BASE_URL}/analyze_image",
-            json={
-                "image_base64": st.session_state.image_uploaded_data["base64"],
-                "media_type": st.session_state.image_uploaded_data["media_type"],
-                "messages": st.session_state.image_chat_messages
-            }
-        )
+        # the backend keeps the uploaded image: every turn only sends its ID
+        url = f"{API_BASE_URL}/analyze_image/stream"
+        result = stream_ai_result(url, {**image_reference(image), "messages": st.session_state.image_chat_messages}, live_items)
+        if result["type"] == "expired":
+            # evicted from the backend's image store: upload it once more
+            image["image_id"] = upload_image(image["bytes"], image["media_type"])
+            result = stream_ai_result(url, {**image_reference(image), "messages": st.session_state.image_chat_messages}, live_items)
+        if result.get("image_id"):
+            image["image_id"] = result["image_id"]
         
-        if response.ok:
-            result = response.json()
-            
-            if result["type"] == "question":
-                st.session_state.image_chat_messages.append({
-                    "role": "assistant",
-                    "content": result["content"]
-                })
-            elif result["type"] == "recommendations":
-                st.session_state.image_chat_recommendations = result["content"]
-                explanation = result["content"].get("explanation", "Here are my recommendations:")
-                st.session_state.image_chat_messages.append({
-                    "role": "assistant",
-                    "content": f"✅ {explanation}"
-                })
-            elif result["type"] == "error":
-                st.session_state.image_chat_messages.append({
-                    "role": "assistant",
-                    "content": f"❌ Error: {result['content']}"
-                })
-        else:
+        if result["type"] == "question":
+            st.session_state.image_chat_messages.append({
+                "role": "assistant",
+                "content": result["content"]
+            })
+        elif result["type"] == "recommendations":
+            st.session_state.image_chat_recommendations = result["content"]
+            explanation = result["content"].get("explanation", "Here are my recommendations:")
+            st.session_state.image_chat_messages.append({
+                "role": "assistant",
+                "content": f"✅ {explanation}"
+            })
+        elif result["type"] == "error":
             st.session_state.image_chat_messages.append({
                 "role": "assistant",
-                "content": f"❌ Backend Error: {response.status_code}"
+                "content": f"❌ Error: {result['content']}"
             })
     except Exception as e:
         st.session_state.image_chat_messages.append({
@@ -64,6 +64,48 @@ def add_user_message(user_message: str):
     st.session_state.image_chat_pending = True
 
 
+def media_type_of(uploaded_file):
+    """Media type of an uploaded file (from the browser, else from its extension)"""
+    if uploaded_file.type:
+        return uploaded_file.type
+    ext = uploaded_file.name.split('.')[-1].lower()
+    return f"image/{ext}" if ext in ['png', 'jpg', 'jpeg'] else "image/jpeg"
+
+
+def batch_images_section(uploaded_files):
+    """Several photos of one job (shelves, list pages): analyzed together into one order"""
+    cols = st.columns(min(len(uploaded_files), 5))
+    for i, uploaded_file in enumerate(uploaded_files):
+        with cols[i % len(cols)]:
+            st.image(uploaded_file.getvalue(), caption=uploaded_file.name, use_container_width=True)
+
+    note = st.text_input(
+        "Note for all images",
+        placeholder="Optional, e.g. 'Lager Nord, Regal 3-7'",
+        key="image_batch_note"
+    )
+    if st.button(f"🔍 Analyze all {len(uploaded_files)} images", type="primary", use_container_width=True, key="analyze_batch_btn"):
+        with st.spinner("🤖 AI is analyzing the images..."):
+            images = []
+            for uploaded_file in uploaded_files:
+                image = {"bytes": uploaded_file.getvalue(), "media_type": media_type_of(uploaded_file)}
+                image["image_id"] = upload_image(image["bytes"], image["media_type"])
+                images.append(image_reference(image))
+            result = analyze_images(images, note.strip())
+
+        st.session_state.image_chat_messages = []
+        if result["type"] == "error":
+            st.session_state.image_chat_recommendations = None
+            st.error(f"❌ Error: {result['content']}")
+            return
+        st.session_state.image_chat_recommendations = result["content"]
+        for entry in result["images"]:
+            if entry["type"] == "question":
+                st.info(f"Image {entry['index'] + 1} ({uploaded_files[entry['index']].name}): {entry['content']}")
+            elif entry["type"] == "error":
+                st.warning(f"Image {entry['index'] + 1} ({uploaded_files[entry['index']].name}) could not be analyzed: {entry['content']}")
+
+
 def image_search_view():
     """Image search view with upload and chat-based analysis"""
     
@@ -76,32 +118,32 @@ def image_search_view():
         
         # Image Upload Section
         with st.container(border=True):
-            uploaded_file = st.file_uploader(
+            uploaded_files = st.file_uploader(
                 "Upload Image",
                 type=["png", "jpg", "jpeg"],
+                accept_multiple_files=True,
                 label_visibility="collapsed",
                 key="image_uploader"
             )
             
+            # one photo: a conversation about it; several: one merged order
+            uploaded_file = uploaded_files[0] if len(uploaded_files) == 1 else None
+            if len(uploaded_files) > 1:
+                batch_images_section(uploaded_files)
+            
             if uploaded_file is not None:
                 # Store image data
                 image_bytes = uploaded_file.read()
-                image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-                
-                # Determine media type
-                if uploaded_file.type:
-                    media_type = uploaded_file.type
-                else:
-                    ext = uploaded_file.name.split('.')[-1].lower()
-                    media_type = f"image/{ext}" if ext in ['png', 'jpg', 'jpeg'] else "image/jpeg"
+                media_type = media_type_of(uploaded_file)
                 
                 # Check if this is a new image
                 if (st.session_state.image_uploaded_data is None or 
-                    st.session_state.image_uploaded_data.get("base64") != image_base64):
+                    st.session_state.image_uploaded_data.get("bytes") != image_bytes):
                     st.session_state.image_uploaded_data = {
-                        "base64": image_base64,
+                        "bytes": image_bytes,
                         "media_type": media_type,
-                        "name": uploaded_file.name
+                        "name": uploaded_file.name,
+                        "image_id": upload_image(image_bytes, media_type)
                     }
                     # Reset chat for new image
                     st.session_state.image_chat_messages = []
@@ -136,8 +178,9 @@ def image_search_view():
             
             # Process pending AI response
             if st.session_state.image_chat_pending:
+                live_items = st.empty()
                 with st.spinner("🤖 AI is analyzing..."):
-                    process_image_response()
+                    process_image_response(live_items)
                 st.rerun()
             
             # Text input for follow-up
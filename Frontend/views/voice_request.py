@@ -6,7 +6,7 @@ import requests
 import speech_recognition as sr
 from config import API_BASE_URL
 from components import render_chat_message, render_chat_history, render_order_summary
-from utils import add_to_cart
+from utils import add_to_cart, stream_ai_result
 
 
 def add_user_message(user_message: str):
@@ -18,40 +18,41 @@ def add_user_message(user_message: str):
     st.session_state.voice_chat_pending = True
 
 
-def process_ai_response():
-    """Call the AI backend and process the response"""
+def process_ai_response(live_items):
+    """Call the streaming AI backend and process the response (items appear in `live_items` as they arrive)"""
     try:
-        response = requests.post(
-            f"{API_BASE_URL}/chat_request",
-            json={"messages": st.session_state.voice_chat_messages}
-        )
+        # the backend keeps the conversation: send only the new message
+        history = st.session_state.voice_chat_messages
+        payload = {"message": history[-1]["content"]}
+        if st.session_state.voice_chat_session_id:
+            payload["session_id"] = st.session_state.voice_chat_session_id
+        result = stream_ai_result(f"{API_BASE_URL}/chat_request/stream", payload, live_items)
+        if result["type"] == "expired":
+            # backend restarted or the session timed out: start a new one from our copy
+            earlier = [m for m in history[:-1] if not m["content"].startswith("❌")]
+            payload = {"message": history[-1]["content"], "messages": earlier}
+            result = stream_ai_result(f"{API_BASE_URL}/chat_request/stream", payload, live_items)
+        if result.get("session_id"):
+            st.session_state.voice_chat_session_id = result["session_id"]
         
-        if response.ok:
-            result = response.json()
-            
-            if result["type"] == "question":
-                # AI is asking a clarifying question
-                st.session_state.voice_chat_messages.append({
-                    "role": "assistant",
-                    "content": result["content"]
-                })
-            elif result["type"] == "recommendations":
-                # AI has provided final recommendations
-                st.session_state.voice_chat_recommendations = result["content"]
-                explanation = result["content"].get("explanation", "Here are my recommendations:")
-                st.session_state.voice_chat_messages.append({
-                    "role": "assistant",
-                    "content": f"✅ {explanation}"
-                })
-            elif result["type"] == "error":
-                st.session_state.voice_chat_messages.append({
-                    "role": "assistant",
-                    "content": f"❌ Error: {result['content']}"
-                })
-        else:
+        if result["type"] == "question":
+            # AI is asking a clarifying question
+            st.session_state.voice_chat_messages.append({
+                "role": "assistant",
+                "content": result["content"]
+            })
+        elif result["type"] == "recommendations":
+            # AI has provided final recommendations
+            st.session_state.voice_chat_recommendations = result["content"]
+            explanation = result["content"].get("explanation", "Here are my recommendations:")
+            st.session_state.voice_chat_messages.append({
+                "role": "assistant",
+                "content": f"✅ {explanation}"
+            })
+        elif result["type"] == "error":
             st.session_state.voice_chat_messages.append({
                 "role": "assistant",
-                "content": f"❌ Backend Error: {response.status_code}"
+                "content": f"❌ Error: {result['content']}"
             })
     except Exception as e:
         st.session_state.voice_chat_messages.append({
@@ -82,8 +83,9 @@ def voice_request_view():
                 
                 # Process pending AI response (shows user message first, then spinner)
                 if st.session_state.voice_chat_pending:
+                    live_items = st.empty()
                     with st.spinner("🤖 AI is searching the catalog..."):
-                        process_ai_response()
+                        process_ai_response(live_items)
                     st.rerun()
             else:
                 st.info("💡 Start by clicking the microphone button or typing your request below.")
@@ -140,6 +142,12 @@ def voice_request_view():
         
         with col_clear:
             if st.button("Clear Chat", key="voice_chat_clear", use_container_width=True):
+                if st.session_state.voice_chat_session_id:
+                    try:
+                        requests.delete(f"{API_BASE_URL}/chat_request/{st.session_state.voice_chat_session_id}", timeout=2)
+                    except requests.RequestException:
+                        pass  # the session expires on its own
+                st.session_state.voice_chat_session_id = None
                 st.session_state.voice_chat_messages = []
                 st.session_state.voice_chat_recommendations = None
                 st.session_state.voice_chat_pending = False
@@ -0,0 +1,80 @@
+"""
+Benchmark: per-turn request size and prompt history with server-side chat sessions.
+
+Plays a long clarifying conversation turn by turn and reports, per turn:
+- bytes the client posts: the whole history (stateless) vs. session_id + message;
+- estimated tokens of history sent to Claude: unbounded vs. the session's budget
+  (older exchanges condensed into the system prompt);
+- time to build the chat request: catalog retrieval per turn vs. the session's
+  stored candidate rows.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_chat_sessions
+"""
+import json
+import time
+
+from backend.utils import request_agent as ra
+from backend.utils.catalog_index import load_catalog_csv
+from backend.utils.session_store import SessionStore
+
+
+TURNS = 24
+HISTORY_TOKEN_BUDGET = 400
+TOP_K = 40
+REPEATS = 200
+
+OPENING = "Wir bauen im zweiten OG Trockenbauwände, ca. 60 m², und streichen danach. Was brauchen wir?"
+ANSWERS = [
+    "Metallständerwerk, die Platten sind schon da",
+    "Schrauben TX20, Länge weiß ich nicht genau",
+    "Dübel 6mm für die Anschlussprofile, so 200 Stück",
+    "Farbe weiß, zwei Eimer",
+    "Abdeckfolie und Malervlies für den Flur",
+    "Handschuhe für 4 Leute, Größe 10",
+]
+QUESTION = "QUESTION: Sollen es Schrauben TX20 4x40 oder 5x60 sein, und wie viele Packungen braucht ihr?"
+
+
+def build_time(messages: list, catalog, context) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        ra._chat_request(messages, catalog, TOP_K, "auto", context)
+    return (time.perf_counter() - start) / REPEATS * 1000
+
+
+def run() -> None:
+    catalog = load_catalog_csv("backend/data/sample.csv")
+    store = SessionStore(history_token_budget=HISTORY_TOKEN_BUDGET)
+    session_id, session = store.create()
+    history = []
+
+    print(f"{'turn':>4} | {'stateless B':>11} | {'session B':>9} | {'history tok':>11} | {'budgeted tok':>12} | "
+          f"{'build ms':>8} | {'session ms':>10}")
+    for turn in range(TURNS):
+        message = OPENING if turn == 0 else ANSWERS[(turn - 1) % len(ANSWERS)]
+        history.append({"role": "user", "content": message})
+
+        stateless_bytes = len(json.dumps({"messages": history}, ensure_ascii=False).encode("utf-8"))
+        session_bytes = len(json.dumps({"session_id": session_id, "message": message}, ensure_ascii=False).encode("utf-8"))
+
+        sent = store.start_turn(session, message)
+        full_tokens = sum(ra.estimate_tokens(m["content"]) for m in history)
+        budget_tokens = sum(ra.estimate_tokens(m["content"]) for m in sent) + \
+            ra.estimate_tokens(session["context"].get("summary", ""))
+        stateless_ms = build_time(history, catalog, None)
+        ra._chat_request(sent, catalog, TOP_K, "auto", session["context"])  # fills the session's context
+        session_ms = build_time(sent, catalog, session["context"])
+
+        print(f"{turn + 1:>4} | {stateless_bytes:>11} | {session_bytes:>9} | {full_tokens:>11} | {budget_tokens:>12} | "
+              f"{stateless_ms:>8.3f} | {session_ms:>10.3f}")
+
+        store.finish_turn(session, {"type": "question", "content": QUESTION[len("QUESTION: "):]})
+        store.save(session_id, session)
+        history.append({"role": "assistant", "content": QUESTION[len("QUESTION: "):]})
+
+    print(store.stats())
+
+
+if __name__ == "__main__":
+    run()
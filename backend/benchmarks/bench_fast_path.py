@@ -0,0 +1,96 @@
+"""
+Benchmark: hit rate, precision and latency of the no-LLM fast path.
+
+A mix of fully specified orders (expected materials given) and free-form or
+ambiguous requests (expected to fall back to Claude, None). A hit with the
+wrong products or quantities counts as an error - those would be worse than
+the LLM round trip they save.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_fast_path
+"""
+import statistics
+import time
+
+from backend.utils.catalog_index import load_catalog_csv
+from backend.utils.fast_path import match_order
+
+
+CASES = [
+    # fully specified: {artikel_id: anzahl}
+    ("500 Schraube TX20 4x40", {"C001": 500}),
+    ("2x Arbeitshandschuhe Gr.9", {"C019": 2}),
+    ("C019 x 10", {"C019": 10}),
+    ("10x C013", {"C013": 10}),
+    ("Ich brauche 500 Schraube TX20 4x40 und 2x Arbeitshandschuhe Gr.9 bitte", {"C001": 500, "C019": 2}),
+    ("zwei Rollen Malervlies, 10 Stk Dübel 6mm", {"C025": 2, "C004": 10}),
+    ("two pairs of Arbeitshandschuhe Gr.10", {"C020": 2}),
+    ("Dübel 6mm: zweihundert", {"C004": 200}),
+    ("ein Zollstock", {"C047": 1}),
+    ("fünfundzwanzig Kabelbinder 200mm", {"C013": 25}),
+    ("Markierspray rot 5x", {"C029": 5}),
+    ("10 Schleifpapier 120", {"C036": 10}),
+    ("1.000 Kabelbinder 300mm", {"C014": 1000}),
+    ("C019 Arbeitshandschuhe Gr.9 x 4", {"C019": 4}),
+    ("I need 20 Bit TX25 please", {"C033": 20}),
+    ("4 Mehrfachsteckdosen", {"C059": 4}),
+    ("3 Dosen WD-40 Spray; 2 Dosen Rostlöser", {"C077": 3, "C078": 2}),
+    ("50 m Installationsdraht 2.5mm", {"C018": 50}),
+    ("Warnweste orange x 6\nBauhelm gelb x 6", {"C024": 6, "C074": 6}),
+    ("zwölf Paar Gehörschutzstöpsel", {"C022": 12}),
+    ("100 Stück Mutter M10 + 100 Stück Unterlegscheibe M8", {"C010": 100, "C008": 100}),
+    ("eine Kabeltrommel und 2 Verlängerungskabel 20m", {"C060": 1, "C058": 2}),
+    # free-form, ambiguous or unsupported: must go to Claude
+    ("Arbeitshandschuhe", None),
+    ("10 Schrauben", None),
+    ("3 Box Dübel 6mm", None),
+    ("3 Rollen Dübel 6mm", None),
+    ("Schleifpapier 120", None),
+    ("gloves (42069x) and a bucket.", None),
+    ("Material für Trockenbau im 2. OG", None),
+    ("Wir streichen morgen zwei Räume, was brauchen wir?", None),
+    ("Ich brauche Dübel und Schrauben für die Regalmontage", None),
+    ("5 Farbroller", None),
+    ("Bauhelme für das ganze Team", None),
+    ("20 Schraube TX20 und etwas zum Abdecken", None),
+    ("Need safety gear for 4 workers", None),
+    ("2 Bauhelm", None),
+]
+REPEATS = 200
+
+
+def run() -> None:
+    catalog = load_catalog_csv("backend/data/sample.csv")
+
+    hits = correct = wrong = missed = 0
+    timings = []
+    for text, expected in CASES:
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            selection = match_order(text, catalog)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        got = None if selection is None else {m[0]: m[1] for m in selection["materials"]}
+        if got is not None:
+            hits += 1
+            if got == expected:
+                correct += 1
+            else:
+                wrong += 1
+                print(f"  WRONG {text!r}: {got} (expected {expected})")
+        elif expected is not None:
+            missed += 1
+            print(f"  missed {text!r} (expected {expected})")
+
+    specified = sum(expected is not None for _, expected in CASES)
+    timings.sort()
+    print(f"requests: {len(CASES)} ({specified} fully specified)")
+    print(f"fast-path hit rate: {hits / len(CASES):.0%} of all requests, "
+          f"{correct / specified:.0%} of fully specified ({missed} missed)")
+    print(f"wrong hits: {wrong}")
+    print(f"latency: p50 {statistics.median(timings):.3f} ms, "
+          f"p99 {timings[int(len(timings) * 0.99)]:.3f} ms per request (vs. seconds for a Claude round trip)")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,104 @@
+"""
+Benchmark: fuzzy ID index (ngram_index.TrigramIndex) vs. difflib.get_close_matches for unknown article IDs.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_fuzzy_ids
+"""
+import difflib
+import random
+import string
+import time
+
+from backend.utils.ngram_index import TrigramIndex
+
+
+def make_keys(n: int, seed: int = 7) -> list:
+    """Synthetic SKUs shaped like supplier article numbers (prefix + digits + suffix)."""
+    rng = random.Random(seed)
+    prefixes = ["C", "WUE", "FIS", "HIL", "BOS", "RE", "UVX", "STB"]
+    keys = set()
+    while len(keys) < n:
+        prefix = rng.choice(prefixes)
+        digits = "".join(rng.choice(string.digits) for _ in range(rng.randint(3, 6)))
+        suffix = rng.choice(["", "", "-" + rng.choice(string.ascii_uppercase) + str(rng.randint(1, 99))])
+        keys.add(f"{prefix}{digits}{suffix}")
+    return sorted(keys)
+
+
+def hallucinate(key: str, rng: random.Random) -> str:
+    """Typical LLM ID mistakes: swapped/dropped/extra digit, dropped separator."""
+    chars = list(key)
+    op = rng.choice(["swap", "drop", "insert", "replace"])
+    i = rng.randrange(len(chars))
+    if op == "swap" and len(chars) > 1:
+        j = min(i + 1, len(chars) - 1)
+        chars[i], chars[j] = chars[j], chars[i]
+    elif op == "drop" and len(chars) > 2:
+        del chars[i]
+    elif op == "insert":
+        chars.insert(i, rng.choice(string.digits))
+    else:
+        chars[i] = rng.choice(string.digits)
+    return "".join(chars)
+
+
+def score(query: str, key) -> float:
+    return difflib.SequenceMatcher(None, key, query).ratio() if key else 0.0
+
+
+# (keys, query): a key one edit away that is not the best ratio; the synthetic corpus
+# rarely produces these, but a wrong key here prices the wrong article
+EDGE_CASES = [
+    (["C018X", "C019XYZ"], "C019X"),
+    (["WUE1234", "WUE12345-A1"], "WUE1235-A1"),
+    (["C01", "C0012"], "C012"),
+]
+
+
+def check_edge_cases() -> None:
+    agree = 0
+    for keys, query in EDGE_CASES:
+        expected = difflib.get_close_matches(query, keys, n=1, cutoff=0.6)
+        got = TrigramIndex(keys).close_matches(query, n=1, cutoff=0.6)
+        agree += got == expected
+        if got != expected:
+            print(f"  MISMATCH {query!r} in {keys}: index {got}, difflib {expected}")
+    print(f"edge cases: {agree}/{len(EDGE_CASES)} same as difflib")
+
+
+def timed(fn, queries) -> tuple:
+    start = time.perf_counter()
+    results = [fn(q) for q in queries]
+    return (time.perf_counter() - start) / len(queries), results
+
+
+def run(size: int, n_queries: int, difflib_queries: int) -> None:
+    rng = random.Random(size)
+    keys = make_keys(size)
+
+    start = time.perf_counter()
+    index = TrigramIndex(keys)
+    build_s = time.perf_counter() - start
+
+    queries = [hallucinate(rng.choice(keys), rng) for _ in range(n_queries)]
+    idx_avg, idx_results = timed(index.closest, queries)
+
+    # difflib is linear in the catalog; only time a subset at large sizes
+    sub = queries[:difflib_queries]
+    dl_avg, dl_results = timed(
+        lambda q: (difflib.get_close_matches(q, keys, n=1, cutoff=0.6) or [None])[0], sub
+    )
+    agree = sum(1 for a, b in zip(idx_results, dl_results) if a == b) / len(sub)
+    # a different key with the same ratio is an equally good answer (ties)
+    as_good = sum(1 for q, a, b in zip(sub, idx_results, dl_results) if score(q, a) >= score(q, b)) / len(sub)
+
+    print(f"{size:>9,} keys | build {build_s * 1000:8.1f} ms | "
+          f"index {idx_avg * 1000:7.3f} ms/query | difflib {dl_avg * 1000:9.1f} ms/query | "
+          f"same key {agree:.0%}, same score {as_good:.0%} ({len(sub)} queries)")
+
+
+if __name__ == "__main__":
+    check_edge_cases()
+    run(100, n_queries=1000, difflib_queries=1000)
+    run(10_000, n_queries=1000, difflib_queries=100)
+    run(1_000_000, n_queries=1000, difflib_queries=5)
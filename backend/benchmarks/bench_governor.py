@@ -0,0 +1,105 @@
+"""
+Benchmark: the LLM governor against a mock messages API that answers 429 above its rate limit.
+
+A burst of concurrent calls (a batch run plus foremen at once) hits the mock, which
+allows RATE_LIMIT requests per second with small bursts, like the API's tier limits:
+
+1. ungoverned: every call goes straight out (SDK retries disabled) - most get 429
+2. governed, limits configured correctly: calls are paced below the limit, no 429
+3. governed, limits configured 50% too high (e.g. a second worker shares the key):
+   429s happen, the governor pauses everyone for retry-after and retries them
+4. priority: interactive calls arriving behind queued batch calls are admitted first
+
+Run from the project root:
+    python -m backend.benchmarks.bench_governor
+"""
+import threading
+import time
+
+from backend.benchmarks.mock_anthropic import MockAnthropic
+from backend.utils.llm_client import get_client, set_client, set_governor
+from backend.utils.llm_governor import BATCH, INTERACTIVE, LLMGovernor, llm_priority
+
+
+CALLS = 60
+RATE_LIMIT = 10      # requests per second the mock accepts (bursts of up to BURST)
+BURST = 5
+RETRY_AFTER = 0.5    # seconds, sent with every 429
+LATENCY = 0.05       # seconds per accepted call
+
+REQUEST = {"model": "claude-sonnet-4-20250514", "max_tokens": 100,
+           "messages": [{"role": "user", "content": "Ich brauche Arbeitshandschuhe"}]}
+
+
+def install(per_second: float = None) -> tuple:
+    """Install a fresh rate-limited mock and a governor for it; returns (mock, governor)."""
+    mock = MockAnthropic(["QUESTION: Welche Größe?"], latency=LATENCY,
+                         rate_limit=(BURST, BURST / RATE_LIMIT), retry_after=RETRY_AFTER)
+    if per_second is None:
+        # effectively unlimited and no retries: the calls behave as without the governor
+        governor = LLMGovernor(1e9, 1e12, max_queue=CALLS, max_retries=0)
+    else:
+        governor = LLMGovernor(per_second * 60, 1e12, max_queue=CALLS, max_wait=30,
+                               max_retries=6, backoff_base=0.2, burst=BURST)
+    set_governor(governor)
+    set_client(mock)
+    return mock, governor
+
+
+def burst(n: int, priority_of=lambda i: INTERACTIVE) -> tuple:
+    """Fire n concurrent calls; returns (ok, failed, wall seconds, admission order)."""
+    results = []
+    order = []
+    lock = threading.Lock()
+
+    def call(i: int) -> None:
+        llm_priority.set(priority_of(i))
+        try:
+            get_client().messages.create(**REQUEST)
+            outcome = True
+        except Exception:
+            outcome = False
+        with lock:
+            results.append(outcome)
+            order.append(i)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.001)  # stable arrival order
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    return sum(results), n - sum(results), wall, order
+
+
+def report(label: str, mock: MockAnthropic, governor: LLMGovernor, ok: int, failed: int, wall: float) -> None:
+    stats = governor.stats()
+    print(f"{label:<34} | ok {ok:>2}/{ok + failed} | 429s from API {mock.messages.rejected:>3} | "
+          f"retries {stats['retries']:>2} | wall {wall:5.2f} s | "
+          f"wait avg {stats['wait_ms_avg']:6.1f} ms, max {stats['wait_ms_max']:6.1f} ms | "
+          f"peak queue {stats['peak_queue_depth']}")
+
+
+def run() -> None:
+    print(f"{CALLS} concurrent calls, mock limit {RATE_LIMIT} req/s (burst {BURST}), "
+          f"minimum wall time ~{(CALLS - BURST) / RATE_LIMIT:.1f} s")
+    for label, per_second in (("ungoverned", None),
+                              ("governed, correct limits", RATE_LIMIT),
+                              ("governed, limits 50% too high", RATE_LIMIT * 1.5)):
+        mock, governor = install(per_second)
+        ok, failed, wall, _ = burst(CALLS)
+        report(label, mock, governor, ok, failed, wall)
+
+    # priority: 20 batch calls queue up, then 5 interactive calls arrive behind them
+    install(RATE_LIMIT)
+    n_batch, n_interactive = 20, 5
+    _, _, _, order = burst(n_batch + n_interactive, lambda i: BATCH if i < n_batch else INTERACTIVE)
+    interactive_positions = [order.index(i) for i in range(n_batch, n_batch + n_interactive)]
+    print(f"priority: interactive calls (arrived last, #{n_batch + 1}-{n_batch + n_interactive}) "
+          f"finished at positions {sorted(p + 1 for p in interactive_positions)} of {n_batch + n_interactive}")
+
+
+if __name__ == "__main__":
+    run()
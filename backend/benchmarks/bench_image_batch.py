@@ -0,0 +1,105 @@
+"""
+Benchmark: several photos of one job in one POST /analyze_images vs. one after another.
+
+Drives the FastAPI app in-process (httpx ASGI transport) against the mock messages API
+with a fixed vision latency. Each photo shows a few catalog articles; some articles are
+on several photos, one photo is sent twice and one is too blurry (the mock asks a
+question). Reports wall time at concurrency 1 (the images one after another, as the
+chat flow would) and at the default concurrency, and checks the merged order: one line
+per article with the quantities of all distinct photos summed, and that an unusable
+image (undecodable, expired) fails alone instead of failing the batch.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_image_batch
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import random
+
+import httpx
+
+from backend import main
+from backend.benchmarks.mock_anthropic import MockAnthropic
+from backend.utils.llm_client import set_client, set_governor
+from backend.utils.llm_governor import LLMGovernor
+
+
+IMAGES = 12
+VISION_LATENCY = 0.5  # seconds per mocked vision call
+ARTICLES = ["C001", "C002", "C003", "C004", "C020"]
+
+
+def run() -> None:
+    rng = random.Random(5)
+    photos = [os.urandom(50_000) for _ in range(IMAGES)]
+    shown = {}  # sha of the base64 sent -> materials on that photo (None: blurry)
+    for i, photo in enumerate(photos):
+        materials = None if i == IMAGES - 1 else [[a, rng.randint(1, 20), ""] for a in rng.sample(ARTICLES, 2)]
+        shown[hashlib.sha256(base64.b64encode(photo)).hexdigest()] = materials
+
+    def answer(kwargs) -> str:
+        image = kwargs["messages"][0]["content"][0]["source"]["data"]
+        materials = shown[hashlib.sha256(image.encode()).hexdigest()]
+        if materials is None:
+            return "QUESTION: • What I see: a blurry shelf\n• Need to know: Can you take the photo again?"
+        return json.dumps({"materials": materials, "explanation": f"{len(materials)} articles on the shelf"})
+
+    set_client(MockAnthropic(answer, latency=VISION_LATENCY))
+    # the opening turns send the whole catalog: no rate limit on the mock, measure the batch alone
+    set_governor(LLMGovernor(1e9, 1e12, max_retries=0))
+
+    expected = {}
+    for materials in shown.values():
+        for artikel_id, anzahl, _ in materials or []:
+            expected[artikel_id] = expected.get(artikel_id, 0) + anzahl
+
+    async def batch(client, concurrency: int) -> dict:
+        image_ids = []
+        for photo in photos:
+            response = await client.post("/images/raw", content=photo,
+                                          headers={"Content-Type": "image/jpeg", "X-Image-Mode": "off"})
+            image_ids.append(response.json()["image_id"])
+        images = [{"image_id": image_id} for image_id in image_ids + image_ids[:1]]  # the first photo twice
+        response = await client.post("/analyze_images", json={"images": images, "concurrency": concurrency})
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    async def go() -> None:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=120) as client:
+            for concurrency in (1, main.IMAGE_BATCH_MAX_CONCURRENCY):
+                result = await batch(client, concurrency)
+                summary = result["summary"]
+                got = {item["artikel_id"]: item["anzahl"] for item in result["content"]["items"]}
+                print(f"concurrency {concurrency}: {summary['images']} images ({summary['unique_images']} distinct) "
+                      f"in {summary['seconds']:.2f} s (one after another: {summary['sequential_seconds']:.2f} s), "
+                      f"{summary['needs_clarification']} need clarification, "
+                      f"merged order {'correct' if got == expected else f'WRONG {got} != {expected}'}")
+                assert result["images"][-1]["duplicate_of"] == 0
+
+            good = result["images"][0]["image_id"]
+            response = await client.post("/analyze_images", json={"images": [
+                {"image_id": good},
+                {"image_base64": "not base64!", "media_type": "image/jpeg"},
+                {"image_id": "0" * 64},
+            ]})
+            assert response.status_code == 200, response.text
+            statuses = [entry.get("status_code", 200) for entry in response.json()["images"]]
+            print(f"batch with unusable images: {response.status_code}, per image {statuses}, "
+                  f"{response.json()['summary']['errors']} errors")
+            assert statuses[0] == 200 and statuses[1:] == [422, 410]
+
+            response = await client.post("/analyze_images", json={"images": []})
+            print(f"empty batch: {response.status_code}")
+            response = await client.post("/analyze_images", json={
+                "images": [{"image_id": "0" * 64}] * (main.IMAGE_BATCH_MAX_IMAGES + 1)})
+            print(f"{main.IMAGE_BATCH_MAX_IMAGES + 1} images: {response.status_code}")
+
+    asyncio.run(go())
+
+
+if __name__ == "__main__":
+    run()
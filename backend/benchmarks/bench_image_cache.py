@@ -0,0 +1,190 @@
+"""
+Benchmark: perceptual-hash reuse of opening image analyses.
+
+A stream of opening /analyze_image turns (Pillow required): synthetic handwritten lists,
+each photographed again with REPEAT_SHARE probability as a retry or from a second
+device - re-encoded, darker, cropped by a few percent or tilted - and preprocessed like
+uploads are. The mock messages API answers with the list it was shown, so every hit
+can be checked against the list actually photographed.
+
+Then near misses: every list photographed again after one quantity or one whole line
+was rewritten - the same layout, different content - must not reuse its analysis.
+
+Reports the hit ratio among repeats, false hits (another list's analysis reused, or a
+near miss's), vision calls saved, turn latency on a hit vs. a call, and the lookup cost
+of a full cache.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_image_cache
+"""
+import base64
+import hashlib
+import io
+import random
+import statistics
+import time
+
+from backend.benchmarks.mock_anthropic import MockAnthropic
+from backend.utils import request_agent as ra
+from backend.utils.catalog_index import load_catalog_csv
+from backend.utils.image_cache import DETAIL_SIZE, Image, ImageAnalysisCache, perceptual_hash
+from backend.utils.image_preprocess import prepare_image
+from backend.utils.llm_client import set_client, set_governor
+from backend.utils.llm_governor import LLMGovernor
+
+
+LISTS = 40
+TURNS = 120
+REPEAT_SHARE = 0.4
+VISION_LATENCY = 0.4  # seconds per mocked vision call
+FULL_CACHE = 2048
+TOP_K = 40
+OPENING = "Please analyze this image and identify what materials are needed."
+
+
+PAPER = (236, 232, 220)
+
+
+def handwritten_list(seed: int):
+    from PIL import ImageDraw
+
+    rng = random.Random(seed)
+    img = Image.new("RGB", (1512, 2016), PAPER)
+    draw = ImageDraw.Draw(img)
+    for line in range(rng.randint(6, 14)):
+        handwriting(draw, rng, 150 + line * 110, rng.randint(600, 1350))
+    return img
+
+
+def handwriting(draw, rng: random.Random, y: int, end: int, x: int = 120) -> None:
+    while x < end:
+        x2, y2 = x + rng.randint(10, 30), y + rng.randint(-20, 20)
+        draw.line((x, y, x2, y2), fill=(70, 70, 90), width=4)
+        x, y = x2, y + rng.randint(-3, 3)
+        if rng.random() < 0.15:
+            x += 30
+
+
+def rewritten(seed: int, change: str):
+    """List `seed` with one line's quantity (its first word) or the whole line written anew."""
+    from PIL import ImageDraw
+
+    img = handwritten_list(seed)
+    rng = random.Random(LISTS + seed)
+    y = 150 + rng.randrange(random.Random(seed).randint(6, 14)) * 110
+    draw = ImageDraw.Draw(img)
+    end = 240 if change == "quantity" else rng.randint(600, 1350)
+    draw.rectangle((100, y - 60, end + 60, y + 60), fill=PAPER)
+    handwriting(draw, rng, y, end)
+    return img
+
+
+def photographed_again(img, rng: random.Random):
+    from PIL import ImageEnhance
+
+    variant = rng.choice(("recompressed", "darker", "cropped", "tilted"))
+    if variant == "darker":
+        img = ImageEnhance.Brightness(img).enhance(rng.uniform(0.75, 0.9))
+    elif variant == "cropped":
+        dx, dy = int(img.width * rng.uniform(0.01, 0.03)), int(img.height * rng.uniform(0.01, 0.03))
+        img = img.crop((dx, dy, img.width - dx, img.height - dy))
+    elif variant == "tilted":
+        img = img.rotate(rng.uniform(-2, 2), fillcolor=PAPER)
+    return img, variant
+
+
+def jpeg(img, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def run() -> None:
+    if Image is None:
+        print("Pillow is not installed (pip install Pillow): no perceptual hashes, no hits")
+        return
+    rng = random.Random(3)
+    catalog = load_catalog_csv("backend/data/sample.csv")
+    lists = [handwritten_list(seed) for seed in range(LISTS)]
+    shown = {}  # sha of the base64 sent -> list number, for the mock's answer
+
+    def answer(kwargs) -> str:
+        image = kwargs["messages"][0]["content"][0]["source"]["data"]
+        number = shown[hashlib.sha256(image.encode()).hexdigest()]
+        return f"QUESTION: • What I see: handwritten list #{number}\n• Need to know: Which sizes?"
+
+    set_client(MockAnthropic(answer, latency=VISION_LATENCY))
+    # the opening turns send the whole catalog: no rate limit on the mock, measure the cache alone
+    set_governor(LLMGovernor(1e9, 1e12, max_retries=0))
+    cache = ImageAnalysisCache()
+    photographed = []
+    hit_ms, miss_ms = [], []
+    repeats = repeat_hits = false_hits = calls = 0
+    variants = {}
+
+    for _ in range(TURNS):
+        if photographed and rng.random() < REPEAT_SHARE:
+            number = rng.choice(photographed)
+            img, variant = photographed_again(lists[number], rng)
+            repeats += 1
+        else:
+            number = rng.choice([n for n in range(LISTS) if n not in photographed] or range(LISTS))
+            img, variant = lists[number], None
+            photographed.append(number)
+        prepared = prepare_image(jpeg(img, rng.choice((70, 85, 92))), "image/jpeg")
+        image_base64 = base64.b64encode(prepared.data).decode("ascii")
+        shown[hashlib.sha256(image_base64.encode()).hexdigest()] = number
+
+        start = time.perf_counter()
+        result = ra.analyze_image_request(image_base64, prepared.media_type, [{"role": "user", "content": OPENING}],
+                                          catalog, top_k=TOP_K, image_cache=cache)
+        elapsed = (time.perf_counter() - start) * 1000
+        hit = result["meta"].get("image_cache", {}).get("status") == "hit"
+        (hit_ms if hit else miss_ms).append(elapsed)
+        calls += not hit
+        if hit:
+            correct = f"#{number}\n" in result["content"]
+            false_hits += not correct
+            repeat_hits += variant is not None and correct
+            if variant:
+                variants.setdefault(variant, [0, 0])[0] += 1
+        if variant:
+            variants.setdefault(variant, [0, 0])[1] += 1
+
+    print(f"{TURNS} opening turns, {repeats} re-photographed lists: {repeat_hits}/{repeats} reused "
+          f"({repeat_hits / max(repeats, 1):.0%}), {false_hits} false hits")
+    print("  reused by variant: " + ", ".join(f"{v} {hits}/{total}" for v, (hits, total) in sorted(variants.items())))
+    print(f"vision calls: {calls} instead of {TURNS}")
+    print(f"turn latency: call p50 {statistics.median(miss_ms):.0f} ms, "
+          f"hit p50 {statistics.median(hit_ms) if hit_ms else 0:.1f} ms")
+
+    near_misses = {}
+    for number in sorted(set(photographed)):
+        for change in ("quantity", "line"):
+            prepared = prepare_image(jpeg(rewritten(number, change), 85), "image/jpeg")
+            hit = cache.get(perceptual_hash(prepared.data), cache.prompt_key(
+                OPENING, catalog.assortment_version, TOP_K, "json_pretty")) is not None
+            counts = near_misses.setdefault(change, [0, 0])
+            counts[0] += hit
+            counts[1] += 1
+    print("near misses reused (false hits): " + ", ".join(
+        f"{change} rewritten {hits}/{total}" for change, (hits, total) in near_misses.items()))
+
+    full = ImageAnalysisCache(max_entries=FULL_CACHE)
+    key = full.prompt_key(OPENING, catalog.assortment_version, TOP_K, "json_pretty")
+    for _ in range(FULL_CACHE):
+        full.set((rng.getrandbits(256), 0.75, rng.randbytes(DETAIL_SIZE * DETAIL_SIZE)), key, {})
+    probe = perceptual_hash(prepare_image(jpeg(lists[0], 85), "image/jpeg").data)
+    start = time.perf_counter()
+    for _ in range(100):
+        full.get(probe, key)
+    print(f"lookup in a full cache ({FULL_CACHE} entries): {(time.perf_counter() - start) * 10:.2f} ms")
+    start = time.perf_counter()
+    for _ in range(20):
+        perceptual_hash(prepared.data)
+    print(f"perceptual_hash of a prepared upload: {(time.perf_counter() - start) * 50:.2f} ms")
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    run()
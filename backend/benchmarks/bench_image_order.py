@@ -0,0 +1,153 @@
+"""
+Benchmark: fused single-call vs. two-stage (describe, then select) image orders.
+
+Runs image_processing.image_to_order in both modes over labelled site photos, against
+the mock messages API with a latency model of a real call: time to first token, prefill
+of the input tokens and decoding of the output tokens. Reports per mode the calls, the
+billed input/output tokens, the wall time and match accuracy against the labels.
+
+The mock stands in for the model, so accuracy here only reflects what each mode gives
+the model to work with, not its vision:
+- the describe call sees the photo but no catalog: it writes each item as a catalog-blind
+  phrase ("Dübel, dünn"), which the selection call then has to map to a catalog row;
+- the fused call sees the photo and the retrieved rows: it cites the right artikel_id when
+  that row is in its prompt, and otherwise has only the same phrase.
+A phrase is mapped to a row the way the repo resolves names (CatalogIndex.match_name).
+Run against real photos and the real API for the model's own accuracy.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_image_order
+"""
+import hashlib
+import json
+import os
+import re
+import statistics
+import tempfile
+import time
+
+from backend.benchmarks.mock_anthropic import MockAnthropic
+from backend.utils import image_processing
+from backend.utils.catalog_index import load_catalog_csv
+from backend.utils.llm_client import set_client, set_governor
+from backend.utils.llm_governor import LLMGovernor
+
+
+CATALOG_PATH = "backend/data/sample.csv"
+FIRST_TOKEN_S = 0.4
+PREFILL_TOKENS_PER_S = 10000
+DECODE_TOKENS_PER_S = 60
+REPEATS = 2
+
+# (site context, [(artikel_id, anzahl, how a catalog-blind description names it)])
+SCENES = [
+    ("Fliesen im Bad verlegen", [("C092", 200, "Fliesenkreuze klein 3mm"), ("C094", 1, "Gummihammer"),
+                                 ("C041", 2, "Acryl Kartusche weiß")]),
+    ("", [("C001", 500, "Torx Schrauben kurz"), ("C004", 500, "Dübel dünn")]),
+    ("Elektroinstallation Keller", [("C017", 50, "Installationsdraht dünn"), ("C013", 100, "Kabelbinder"),
+                                    ("C015", 2, "Isolierband schwarz")]),
+    ("", [("C019", 10, "Arbeitshandschuhe Größe 9"), ("C021", 10, "Schutzbrille")]),
+    ("Malerarbeiten Treppenhaus", [("C069", 2, "Eimer Farbe weiß"), ("C066", 2, "Farbroller groß"),
+                                   ("C025", 1, "Malervlies Rolle")]),
+    ("Abbruch, Schutt entsorgen", [("C053", 50, "Müllsäcke 120L"), ("C051", 2, "Besen groß"),
+                                   ("C023", 10, "FFP2 Masken")]),
+    ("", [("C029", 3, "Markierspray rot"), ("C049", 5, "Baukreide rot")]),
+    ("Ladung sichern", [("C085", 4, "Spanngurte lang"), ("C087", 20, "Kantenschutz")]),
+    ("Fenster einbauen und abdichten", [("C042", 3, "PU-Schaum Dose"), ("C039", 4, "Silikon transparent"),
+                                        ("C076", 1, "Reiniger für Schaum")]),
+    ("", [("C057", 2, "Verlängerungskabel"), ("C056", 2, "LED Lampe")]),
+]
+
+
+def scene_photos(directory: str) -> list:
+    """One image file per scene (distinct images; their content is irrelevant to the mock)."""
+    paths = []
+    for i in range(len(SCENES)):
+        path = os.path.join(directory, f"scene{i}.png")
+        try:
+            from PIL import Image
+
+            Image.new("RGB", (640, 480), (40 + i * 20, 90, 200 - i * 15)).save(path)
+        except ImportError:
+            with open(path, "wb") as f:
+                f.write(os.urandom(20_000))
+        paths.append(path)
+    return paths
+
+
+class MeteredMock(MockAnthropic):
+    """MockAnthropic that keeps the usage of every call and sleeps like a real call would."""
+
+    def __init__(self, replies):
+        super().__init__(replies)
+        self.usage = []
+        create = self.messages.create
+
+        def metered(**kwargs):
+            message = create(**kwargs)
+            usage = message.usage
+            self.usage.append(usage)
+            input_tokens = usage.input_tokens + usage.cache_read_input_tokens + usage.cache_creation_input_tokens
+            time.sleep(FIRST_TOKEN_S + input_tokens / PREFILL_TOKENS_PER_S
+                       + usage.output_tokens / DECODE_TOKENS_PER_S)
+            return message
+
+        self.messages.create = metered
+
+
+def run() -> None:
+    catalog = load_catalog_csv(CATALOG_PATH)
+    paths = scene_photos(tempfile.mkdtemp(prefix="bench-image-order-"))
+    # the mock recognises a scene by the (prepared) image it is sent
+    scene_of = {hashlib.sha256(image_processing._read_image(path)[1].encode()).hexdigest(): scene
+                for path, scene in zip(paths, SCENES)}
+
+    def answer(kwargs) -> str:
+        first = kwargs["messages"][0]["content"]
+        if isinstance(first, str):
+            # selection call on a description: only the phrases to go on
+            lines = re.findall(r"^- (.+): (\d+)$", first, re.MULTILINE)
+            materials = [[catalog.match_name(phrase) or "", int(anzahl), phrase] for phrase, anzahl in lines]
+            return json.dumps({"materials": materials, "explanation": "Nach Beschreibung"}, ensure_ascii=False)
+
+        _, items = scene_of[hashlib.sha256(first[0]["source"]["data"].encode()).hexdigest()]
+        if not kwargs.get("system"):
+            # describe call: no catalog in sight
+            return ("Im Fokus des Bildes:\n" + "\n".join(f"- {phrase}: {anzahl}" for _, anzahl, phrase in items)
+                    + "\nAlles in gutem Zustand, Menge geschätzt nach Verpackung.")
+        shown = set(re.findall(r"C\d{3}", json.dumps(kwargs["system"])))
+        materials = [[artikel_id if artikel_id in shown else catalog.match_name(phrase) or "", anzahl, phrase]
+                     for artikel_id, anzahl, phrase in items]
+        return json.dumps({"materials": materials, "explanation": "Auf dem Foto erkannt"}, ensure_ascii=False)
+
+    # no rate limit on the mock: measure the modes alone
+    set_governor(LLMGovernor(1e9, 1e12, max_retries=0))
+    print(f"{len(SCENES)} labelled photos, {len(catalog)} catalog rows, fused top_k={image_processing.FUSED_TOP_K}")
+    print(f"{'mode':<10} | {'calls':>5} | {'input tok':>9} | {'output tok':>10} | {'p50 s':>6} | "
+          f"{'ids right':>9} | {'qty right':>9} | {'wrong ids':>9}")
+    for mode in image_processing.IMAGE_ORDER_MODES:
+        mock = MeteredMock(answer)
+        set_client(mock)
+        seconds, right, quantities, wrong, labelled = [], 0, 0, 0, 0
+        for _ in range(REPEATS):
+            for path, (context, items) in zip(paths, SCENES):
+                start = time.perf_counter()
+                result = image_processing.image_to_order(path, context, mode=mode, catalog_path=CATALOG_PATH)
+                seconds.append(time.perf_counter() - start)
+                expected = {artikel_id: anzahl for artikel_id, anzahl, _ in items}
+                got = {item["artikel_id"]: item["anzahl"] for item in result["items"] if item.get("matched")}
+                right += len(expected.keys() & got.keys())
+                quantities += sum(got[k] == v for k, v in expected.items() if k in got)
+                wrong += len(got.keys() - expected.keys())
+                labelled += len(expected)
+        calls = len(mock.usage) / (REPEATS * len(SCENES))
+        input_tokens = sum(u.input_tokens + u.cache_read_input_tokens + u.cache_creation_input_tokens
+                           for u in mock.usage) / (REPEATS * len(SCENES))
+        output_tokens = sum(u.output_tokens for u in mock.usage) / (REPEATS * len(SCENES))
+        print(f"{mode:<10} | {calls:>5.1f} | {input_tokens:>9.0f} | {output_tokens:>10.0f} | "
+              f"{statistics.median(seconds):>6.2f} | {right / labelled:>9.0%} | {quantities / labelled:>9.0%} | "
+              f"{wrong:>9}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,87 @@
+"""
+Benchmark: bytes posted and prompt tokens billed per image-analysis turn.
+
+Plays a clarifying image conversation turn by turn and reports, per turn:
+- bytes the client posts: the base64 image inline every turn vs. one POST /images
+  upload and an image_id afterwards;
+- input tokens billed at the full rate by the mock messages API, now that the image
+  block is prompt-cached (Claude is stateless, so the image itself is still part of
+  every request; the cache makes repeats cheap);
+- time to resolve an image_id from the store (memory and after a spill to disk).
+
+Run from the project root:
+    python -m backend.benchmarks.bench_image_store
+"""
+import base64
+import json
+import os
+import tempfile
+import time
+
+from backend.benchmarks.mock_anthropic import MockAnthropic
+from backend.utils import request_agent as ra
+from backend.utils.catalog_index import load_catalog_csv
+from backend.utils.image_store import ImageStore
+from backend.utils.llm_client import set_client
+
+
+TURNS = 6
+IMAGE_BYTES = 1_500_000  # a phone photo
+REPEATS = 200
+
+ANSWERS = ["Für die Baustelle im zweiten OG", "Größe 10, für 4 Leute", "Ja, dazu Abdeckfolie", "Zwei Rollen",
+           "Nein, das reicht", "Danke"]
+
+
+def lookup_time(store: ImageStore, image_id: str) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        store.get_base64(image_id)
+    return (time.perf_counter() - start) / REPEATS * 1000
+
+
+def run() -> None:
+    image = os.urandom(IMAGE_BYTES)
+    image_base64 = base64.b64encode(image).decode("ascii")
+    store = ImageStore(max_memory_bytes=IMAGE_BYTES, spill_dir=tempfile.mkdtemp(prefix="bench-images-"))
+    image_id, _ = store.put(image, "image/jpeg")
+
+    catalog = load_catalog_csv("backend/data/sample.csv")
+    mock = MockAnthropic(lambda kwargs: "QUESTION: • What I see: Arbeitshandschuhe\nWelche Größe?")
+    set_client(mock)
+
+    messages = [{"role": "user", "content": "Please analyze this image and recommend materials."}]
+    inline_total = reference_total = len(json.dumps({"image_base64": image_base64, "media_type": "image/jpeg"}))
+    print(f"{'turn':>4} | {'inline B':>10} | {'image_id B':>10} | {'full-rate tok':>13} | {'cached tok':>10}")
+    for turn in range(TURNS):
+        inline_bytes = len(json.dumps({"image_base64": image_base64, "media_type": "image/jpeg",
+                                       "messages": messages}, ensure_ascii=False).encode("utf-8"))
+        reference_bytes = len(json.dumps({"image_id": image_id, "messages": messages},
+                                         ensure_ascii=False).encode("utf-8"))
+        if turn:
+            inline_total += inline_bytes
+            reference_total += reference_bytes
+
+        media_type, data = store.get_base64(image_id)
+        result = ra.analyze_image_request(data, media_type, messages, catalog)
+        cache = result["meta"]["prompt_cache"]
+        print(f"{turn + 1:>4} | {inline_bytes:>10} | {reference_bytes:>10} | {cache['input_tokens']:>13} | "
+              f"{cache['cached_tokens']:>10}")
+
+        messages += [{"role": "assistant", "content": result["content"]},
+                     {"role": "user", "content": ANSWERS[turn % len(ANSWERS)]}]
+
+    print(f"posted over {TURNS} turns: {inline_total / 1e6:.1f} MB inline vs. {reference_total / 1e6:.1f} MB "
+          f"with one upload")
+
+    memory_ms = lookup_time(store, image_id)
+    store.put(os.urandom(IMAGE_BYTES), "image/jpeg")  # spills the first image
+    start = time.perf_counter()
+    store.get_base64(image_id)
+    disk_ms = (time.perf_counter() - start) * 1000
+    print(f"image_id lookup: {memory_ms:.3f} ms from memory, {disk_ms:.3f} ms promoted from disk")
+    print(store.stats())
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,96 @@
+"""
+Benchmark: raw image upload (POST /images/raw) vs. base64 in JSON (POST /images).
+
+Drives the FastAPI app in-process (httpx ASGI transport) with 1-20 MB images and
+preprocessing off, so only the upload path is measured: bytes on the wire, latency,
+and the server's peak RSS above its resident size before the request. Every case runs
+in a fresh process (the request body is built before measuring); peak RSS is reset via
+/proc/self/clear_refs (Linux), elsewhere the process's lifetime peak is reported.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_image_upload
+"""
+import asyncio
+import base64
+import json
+import multiprocessing
+import os
+import resource
+import time
+
+import httpx
+
+
+SIZES_MB = (1, 5, 10, 20)
+REPEATS = 3
+
+
+def _rss_kb(field: str) -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _reset_peak() -> None:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _request(path: str, data: bytes) -> tuple:
+    """(content, headers) of an upload of `data` to `path`."""
+    if path == "/images/raw":
+        return data, {"Content-Type": "image/jpeg", "X-Image-Mode": "off"}
+    body = {"image_base64": base64.b64encode(data).decode("ascii"), "media_type": "image/jpeg", "image_mode": "off"}
+    return json.dumps(body).encode("utf-8"), {"Content-Type": "application/json"}
+
+
+def measure(path: str, size_mb: int, results) -> None:
+    from backend import main
+
+    main.IMAGE_MAX_BYTES = main.image_store.max_image_bytes = (max(SIZES_MB) + 1) * 1024 * 1024
+    main.image_store.spill_dir = None
+
+    async def run() -> None:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=120) as client:
+            content, headers = _request(path, os.urandom(1024))
+            await client.post(path, content=content, headers=headers)  # warm up the route
+            timings, peaks = [], []
+            for _ in range(REPEATS):
+                content, headers = _request(path, os.urandom(size_mb * 1024 * 1024))
+                _reset_peak()
+                before = _rss_kb("VmRSS")
+                start = time.perf_counter()
+                response = await client.post(path, content=content, headers=headers)
+                timings.append(time.perf_counter() - start)
+                peaks.append(_rss_kb("VmHWM") - before)
+                assert response.status_code == 200, response.text
+                del content
+            results.put((len(_request(path, b"x" * size_mb * 1024 * 1024)[0]), min(timings), max(peaks)))
+
+    asyncio.run(run())
+
+
+def run() -> None:
+    context = multiprocessing.get_context("spawn")
+    print(f"{'size':>5} | {'path':<12} | {'wire MB':>7} | {'latency ms':>10} | {'peak RSS MB':>11}")
+    for size_mb in SIZES_MB:
+        for path in ("/images", "/images/raw"):
+            results = context.Queue()
+            process = context.Process(target=measure, args=(path, size_mb, results))
+            process.start()
+            wire, latency, peak_kb = results.get()
+            process.join()
+            print(f"{size_mb:>3} MB | {path:<12} | {wire / 1e6:>7.1f} | {latency * 1000:>10.1f} | {peak_kb / 1024:>11.1f}")
+
+
+if __name__ == "__main__":
+    run()
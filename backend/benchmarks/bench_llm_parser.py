@@ -0,0 +1,168 @@
+"""
+Fuzz check and benchmark for the shared LLM response parser (backend/utils/llm_parser).
+
+1. Corpus: recorded well-formed and malformed model replies (llm_outputs.json) must be
+   classified as expected, both in one call and when fed in random stream deltas.
+2. Fuzz: truncated and mutated replies must never raise, and streamed entries must
+   match the one-shot parse.
+3. Benchmark: one-shot parse and streaming (4-character deltas) of a long reply,
+   against the fence/brace extraction previously copy-pasted in request_agent.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_llm_parser
+"""
+import json
+import os
+import random
+import time
+
+from backend.utils.llm_parser import ResponseParser, parse_response
+
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "llm_outputs.json")
+SPLITS_PER_CASE = 50
+MUTATIONS_PER_CASE = 300
+
+
+def legacy_extract(response_text: str):
+    """The previous chat/image extraction: repeated find/slice passes, then json.loads."""
+    json_text = response_text.strip()
+    if "```json" in json_text:
+        start = json_text.find("```json") + 7
+        end = json_text.find("```", start)
+        json_text = json_text[start:end].strip()
+    elif "```" in json_text:
+        start = json_text.find("```") + 3
+        end = json_text.find("```", start)
+        json_text = json_text[start:end].strip()
+    elif "{" in json_text:
+        first = json_text.find("{")
+        last = json_text.rfind("}")
+        if first != -1 and last != -1:
+            json_text = json_text[first:last + 1]
+    return json.loads(json_text)
+
+
+def feed_in_pieces(text: str, rng: random.Random) -> tuple:
+    parser = ResponseParser()
+    streamed = []
+    pos = 0
+    while pos < len(text):
+        step = rng.randint(1, 12)
+        streamed.extend(parser.feed(text[pos:pos + step]))
+        pos += step
+    return parser.result(), streamed, parser
+
+
+def materials_of(parsed: dict) -> list:
+    if parsed["type"] != "json":
+        return []
+    materials = parsed["content"].get("materials")
+    return materials if isinstance(materials, list) else []
+
+
+def check_corpus(corpus: list, rng: random.Random) -> int:
+    failures = 0
+    legacy_ok = 0
+    for case in corpus:
+        parsed = parse_response(case["text"])
+        ok = parsed["type"] == case["expect_type"] and len(materials_of(parsed)) == case["expect_materials"]
+        for _ in range(SPLITS_PER_CASE):
+            streamed_parsed, _, _ = feed_in_pieces(case["text"], rng)
+            ok = ok and streamed_parsed == parsed
+        if not ok:
+            failures += 1
+            print(f"  FAIL {case['name']}: got {parsed['type']} with {len(materials_of(parsed))} materials")
+
+        try:
+            legacy = legacy_extract(case["text"])
+            legacy_ok += case["expect_type"] == "json" and len(legacy.get("materials", [])) == case["expect_materials"]
+        except Exception:
+            pass
+
+    expected_json = sum(c["expect_type"] == "json" for c in corpus)
+    print(f"corpus: {len(corpus) - failures}/{len(corpus)} replies classified as expected "
+          f"(legacy extraction recovered {legacy_ok}/{expected_json} JSON replies)")
+    return failures
+
+
+def mutate(text: str, rng: random.Random) -> str:
+    if not text:
+        return rng.choice(['{', '[', '"', 'QUESTION'])
+    op = rng.random()
+    pos = rng.randrange(len(text))
+    if op < 0.4:
+        return text[:pos]  # cut off mid-reply
+    if op < 0.7:
+        return text[:pos] + text[pos + 1:]
+    return text[:pos] + rng.choice('{}[]",:\\`\n') + text[pos:]
+
+
+def fuzz(corpus: list, rng: random.Random) -> int:
+    failures = 0
+    runs = 0
+    for case in corpus:
+        for _ in range(MUTATIONS_PER_CASE):
+            text = mutate(case["text"], rng)
+            runs += 1
+            try:
+                parsed = parse_response(text)
+                streamed_parsed, streamed, parser = feed_in_pieces(text, rng)
+                assert parsed["type"] in ("question", "json", "text")
+                assert streamed_parsed == parsed
+                if parsed["type"] == "json" and "recovered" not in parsed and not parser.discarded:
+                    # every streamed entry is one of the final entries, in order
+                    # (entries of a discarded candidate are superseded by the "done" result)
+                    final = materials_of(parsed)
+                    assert streamed == final[:len(streamed)], (streamed, final)
+            except Exception as e:
+                failures += 1
+                if failures <= 5:
+                    print(f"  FAIL {case['name']} mutated: {type(e).__name__}: {e!r:.200}\n    {text!r:.200}")
+    print(f"fuzz: {runs - failures}/{runs} mutated replies parsed without error")
+    return failures
+
+
+def bench() -> None:
+    materials = [[f"C{i:03d}", i + 1, f"Artikel {i} mit {{Klammern}} und \"Zitat\""] for i in range(60)]
+    body = json.dumps({"materials": materials, "explanation": "Begründung " * 80}, ensure_ascii=False, indent=2)
+    reply = "Hier ist die Bestellung:\n```json\n" + body + "\n```\nViel Erfolg auf der Baustelle!"
+    repeats = 300
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        legacy_extract(reply)
+    legacy_us = (time.perf_counter() - start) / repeats * 1e6
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        parse_response(reply)
+    oneshot_us = (time.perf_counter() - start) / repeats * 1e6
+
+    deltas = [reply[i:i + 4] for i in range(0, len(reply), 4)]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        parser = ResponseParser()
+        for delta in deltas:
+            parser.feed(delta)
+        parser.result()
+    stream_us = (time.perf_counter() - start) / repeats * 1e6
+
+    print(f"bench: {len(reply)} chars, {len(materials)} materials")
+    print(f"  legacy find/slice + json.loads: {legacy_us:8.1f} us")
+    print(f"  parse_response (one shot):      {oneshot_us:8.1f} us")
+    print(f"  ResponseParser ({len(deltas)} deltas): {stream_us:8.1f} us")
+
+
+def run() -> None:
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    rng = random.Random(12)
+    failures = check_corpus(corpus, rng) + fuzz(corpus, rng)
+    bench()
+    if failures:
+        raise SystemExit(f"{failures} parser failures")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,119 @@
+"""
+Benchmark: cost and latency of the model routing table against "everything on Sonnet".
+
+Runs a scripted mix of chat turns (clarifying questions and final selections) and
+self-correcting voice transcripts (the ones the local normalizer hands to Claude
+with llm_fallback) through request_agent against the mock messages API, once with
+MODEL_ROUTES as configured and once with every task on the large model. The mock
+answers slower on the large model and, like a real small model now and then, gets
+one question and one transcript wrong, so the escalation path is exercised too.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_model_routing
+"""
+import json
+import time
+
+from backend.benchmarks.mock_anthropic import MockAnthropic
+from backend.utils import request_agent as ra
+from backend.utils.catalog_index import load_catalog_csv
+from backend.utils.llm_client import set_client
+
+
+# seconds per call (time to first token plus generation), small vs. large model
+LATENCY = {ra.SMALL_MODEL: 0.15, ra.LARGE_MODEL: 0.45}
+
+# opening requests that need a clarifying question, and the question
+QUESTIONS = {
+    "Ich brauche Arbeitshandschuhe": "QUESTION: Welche Größe, Gr.9 oder Gr.10?",
+    "Schrauben für die Regalmontage": "QUESTION: Holz- oder Metallregal?",
+    "Dübel bitte": "QUESTION: Welcher Durchmesser, 6mm oder 8mm?",
+    "Farbe für das Treppenhaus": "QUESTION: Wie viele Quadratmeter?",
+}
+# the small model botches this one (empty question): escalated to the large model
+SMALL_MODEL_FAILS = "Farbe für das Treppenhaus"
+SELECTION = json.dumps({
+    "materials": [["C020", 10, "Arbeitshandschuhe Gr.10"], ["C004", 200, "Dübel 6mm"]],
+    "explanation": "Handschuhe und Dübel für die Montage",
+}, ensure_ascii=False)
+
+CHATS = [
+    ["Ich brauche Arbeitshandschuhe"],
+    ["Ich brauche Arbeitshandschuhe", "Gr.10, 10 Paar"],
+    ["Schrauben für die Regalmontage"],
+    ["Schrauben für die Regalmontage", "Holzregal, 4 Regale"],
+    ["Dübel bitte"],
+    ["Material für die Montage von 20 m² Trockenbauwand"],
+    ["Farbe für das Treppenhaus"],
+    ["Farbe für das Treppenhaus", "etwa 60 m²"],
+]
+TRANSCRIPTS = [
+    "ähm also ich bräuchte äh zwei nein drei Packungen Dübel sechs Millimeter und so",
+    "hallo ja ähm wir brauchen noch zehn Paar Handschuhe Größe neun, ich meine zehn, danke",
+    "ja also äh fünfhundert Schrauben TX20 vier mal vierzig, nein, fünf mal sechzig bitte",
+]
+RAMBLING = "hallo ja ähm wir brauchen noch zehn Paar Handschuhe Größe neun, ich meine zehn, danke"
+
+
+def reply(kwargs: dict) -> str:
+    model = kwargs.get("model")
+    last = kwargs["messages"][-1]["content"]
+    if isinstance(last, str) and last.startswith("You are a helpful assistant. Clean up"):
+        raw = last.split('Raw Input: "', 1)[1].split('"', 1)[0]
+        if model == ra.SMALL_MODEL and raw == RAMBLING:
+            return "Here is the cleaned transcript you asked for. " * 6 + raw
+        return " ".join(w for w in raw.split() if w not in ("ähm", "äh", "also", "ja", "hallo", "und", "so", "bitte", "danke"))
+    if last in QUESTIONS:
+        if model == ra.SMALL_MODEL and last == SMALL_MODEL_FAILS:
+            return "QUESTION:"
+        return QUESTIONS[last]
+    return SELECTION
+
+
+def run_workload(catalog) -> float:
+    set_client(MockAnthropic(reply, latency=LATENCY, chunk_chars=16))
+    ra._routing_stats.clear()
+    start = time.perf_counter()
+    for turns in CHATS:
+        messages = []
+        for i, turn in enumerate(turns):
+            messages.append({"role": "user", "content": turn})
+            if i < len(turns) - 1:
+                messages.append({"role": "assistant", "content": QUESTIONS[turn][len("QUESTION: "):]})
+        ra.chat_procurement_request(messages, catalog, top_k=20, catalog_format="auto")
+    for raw in TRANSCRIPTS:
+        ra.clean_voice_transcript(raw, llm_fallback=True)
+    return time.perf_counter() - start
+
+
+def report(label: str, wall: float) -> None:
+    stats = ra.model_routing_stats()
+    total = sum(m["cost_usd"] for task in stats.values() for m in task["models"].values())
+    print(f"{label}: {wall:.2f} s wall, ${total * 1000:.3f} per 1000 workloads")
+    for task, task_stats in stats.items():
+        for model, m in task_stats["models"].items():
+            print(f"  {task:<17} {model:<27} calls {m['calls']:>2} | avg {m['avg_latency_ms']:6.1f} ms | "
+                  f"avg ${m['avg_cost_usd'] * 1000:.3f}/1000")
+        print(f"  {task:<17} escalations {task_stats['escalations']}, hand-overs {task_stats['handoffs']}, "
+              f"early stops {task_stats['early_stops']}")
+
+
+def run() -> None:
+    catalog = load_catalog_csv("backend/data/sample.csv")
+    print(f"{len(CHATS)} chat turns, {len(TRANSCRIPTS)} transcripts")
+
+    report("routed", run_workload(catalog))
+
+    routes = {task: dict(route) for task, route in ra.MODEL_ROUTES.items()}
+    try:
+        for route in ra.MODEL_ROUTES.values():
+            route["model"] = ra.LARGE_MODEL
+            route.pop("escalate", None)
+        report("all on the large model", run_workload(catalog))
+    finally:
+        ra.MODEL_ROUTES.clear()
+        ra.MODEL_ROUTES.update(routes)
+
+
+if __name__ == "__main__":
+    run()
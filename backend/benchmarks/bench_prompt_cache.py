@@ -0,0 +1,49 @@
+"""
+Check: the catalog system block is only sent to (and cached on) the selection model.
+
+Runs a three-turn chat against the local mock messages API and prints the
+prompt-cache metadata returned with every turn. The clarifying turns are answered
+by the decision model from the candidates' names, so they carry no catalog; the
+recommendation turn writes the catalog block once, on the selection model.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_prompt_cache
+"""
+from backend.benchmarks.mock_anthropic import MockAnthropic
+from backend.utils import request_agent as ra
+from backend.utils.catalog_index import load_catalog_csv
+from backend.utils.llm_client import set_client
+
+
+REPLIES = [
+    'QUESTION: Welche Größe brauchst du, Gr.9 oder Gr.10?',
+    'QUESTION: Wie viele Paar?',
+    '{"materials": [["C020", 10, "Arbeitshandschuhe Gr.10"]], "explanation": "10 Paar Gr.10"}',
+]
+
+
+def run() -> None:
+    catalog = load_catalog_csv("backend/data/sample.csv")
+    set_client(MockAnthropic(REPLIES))
+
+    messages = [{"role": "user", "content": "Ich brauche Arbeitshandschuhe"}]
+    for turn, answer in enumerate(["Gr.10", "10 Paar"], start=1):
+        result = ra.chat_procurement_request(messages, catalog, top_k=20, catalog_format="auto")
+        print_turn(turn, result)
+        messages += [{"role": "assistant", "content": result["content"]},
+                     {"role": "user", "content": answer}]
+
+    result = ra.chat_procurement_request(messages, catalog, top_k=20, catalog_format="auto")
+    print_turn(3, result)
+
+
+def print_turn(turn: int, result: dict) -> None:
+    meta = result.get("meta", {})
+    cache = meta.get("prompt_cache", {})
+    print(f"turn {turn}: {result['type']:<15} block {meta.get('catalog_block')} | "
+          f"cache {cache.get('status'):<8} cached {cache.get('cached_tokens'):>5} "
+          f"written {cache.get('cache_write_tokens'):>5} uncached {cache.get('input_tokens'):>5}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,86 @@
+"""
+Benchmark: recall and latency of the BM25 prompt retriever on golden prompts.
+
+Recall@K is the share of the articles a correct order needs that are among the
+K rows sent to the model. "fallback" counts prompts with no lexical hit, which
+get the whole catalog. Product prompts name what they need; task prompts describe
+the job ("Regal an Betonwand dübeln") and need the rows around it too: other sizes,
+the matching drill bit, PPE.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_retrieval
+"""
+import time
+
+from backend.utils.catalog_index import load_catalog_csv
+
+
+# (foreman message, article IDs a correct order must be able to use)
+GOLDEN_PROMPTS = [
+    ("Ich brauche Schrauben TX20 und passende Bits", {"C001", "C002", "C032"}),
+    ("Dübel 8mm und 10mm für Betonwand", {"C005", "C006"}),
+    ("Arbeitshandschuhe Größe 10 und Schutzbrille", {"C020", "C021"}),
+    ("Silikon weiß und Acryl für die Badfugen", {"C040", "C041"}),
+    ("Kabelbinder 300mm und Isolierband schwarz", {"C014", "C015"}),
+    ("Markierspray rot und blau für den Tiefbau", {"C029", "C030"}),
+    ("Wand streichen: Farbe weiß, Farbroller groß, Malervlies, Abdeckfolie", {"C069", "C066", "C025", "C026"}),
+    ("Fliesen legen, Fliesenkreuze 3mm und Gummihammer", {"C092", "C094"}),
+    ("Verlängerungskabel 20m und eine Baustellenlampe", {"C058", "C056"}),
+    ("Müllsäcke 240L und Besen zum Aufräumen", {"C054", "C051"}),
+    ("Bauhelm gelb und Warnweste für neue Kollegen", {"C074", "C024"}),
+    ("PU-Schaum und Montageschaum Reiniger für Fenstereinbau", {"C042", "C076"}),
+    ("Schleifpapier 120 und 240 für den Innenausbau", {"C036", "C037"}),
+    ("Spanngurt 10m und Kantenschutz für Transport", {"C085", "C087"}),
+    ("Unterlegscheibe M8 und Mutter M8 Stahlbau", {"C008", "C009"}),
+    ("Wasserwaage, Zollstock und Bleistift", {"C046", "C047", "C048"}),
+    ("Rostlöser und WD-40 Spray", {"C078", "C077"}),
+    ("Atemschutzmaske FFP2 für Schleifarbeiten", {"C023"}),
+    ("Handschuhe Größe 9 für das ganze Team", {"C019"}),
+    ("Klebeband silber und Putztücher", {"C027", "C055"}),
+    ("Schrauben für Trockenbau", {"C001", "C002"}),
+    ("I need drywall screws and gloves", {"C001", "C019"}),
+    ("masking tape and a bucket", {"C027", "C061"}),
+]
+
+# (task description, article IDs a correct order must be able to use)
+TASK_PROMPTS = [
+    ("Regal an Betonwand dübeln", {"C005", "C006", "C034", "C035", "C021"}),
+    ("Handschuhe für das Team", {"C019", "C020"}),
+    ("Brauche Arbeitshandschuhe", {"C019", "C020", "C098"}),
+    ("Fliesen im Bad verlegen", {"C092", "C093", "C094"}),
+    ("Trockenbauwand spachteln und schleifen", {"C062", "C063", "C036", "C037", "C023"}),
+    ("Kabel im Keller verlegen und festmachen", {"C013", "C014", "C057", "C060"}),
+    ("Dachlatten verschrauben", {"C001", "C002", "C003", "C032", "C033"}),
+    ("Decke streichen, Boden abdecken", {"C026", "C025", "C066", "C069"}),
+    ("Ladung auf dem Anhänger sichern", {"C084", "C085", "C087"}),
+    ("Baustelle fegen und Müll entsorgen", {"C051", "C089", "C053", "C054"}),
+]
+
+K_VALUES = (10, 20, 40)
+
+
+def run() -> None:
+    index = load_catalog_csv("backend/data/sample.csv")
+    print(f"catalog: {len(index)} rows, version {index.version}")
+
+    for name, prompts in (("product", GOLDEN_PROMPTS), ("task", TASK_PROMPTS)):
+        for k in K_VALUES:
+            found = needed = fallbacks = sent = 0
+            start = time.perf_counter()
+            for prompt, expected in prompts:
+                rows = index.candidates(prompt, k)
+                if rows is index.rows:
+                    fallbacks += 1
+                else:
+                    sent += len(rows)
+                ids = {row["artikel_id"] for row in rows}
+                found += len(expected & ids)
+                needed += len(expected)
+            avg_ms = (time.perf_counter() - start) * 1000 / len(prompts)
+            retrieved = len(prompts) - fallbacks
+            print(f"{name:<7} K={k:>3} | recall {found / needed:6.1%} | {avg_ms:.3f} ms/prompt | "
+                  f"rows sent {sent / max(retrieved, 1):4.1f} | fallback to full catalog {fallbacks}/{len(prompts)}")
+
+
+if __name__ == "__main__":
+    run()
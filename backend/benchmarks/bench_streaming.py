@@ -0,0 +1,63 @@
+"""
+Benchmark: time to first item when streaming vs. waiting for the full reply.
+
+Streams a recommendation through stream_chat_procurement_request against the
+local mock messages API, which emits the reply in small deltas at a fixed
+output speed. The "done" time is what the blocking /chat_request waits before
+the frontend can show anything. The turn starts with the small model's decision
+(see request_agent.MODEL_ROUTES), which hands over to the large model at the
+reply's first character.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_streaming
+"""
+import json
+import time
+
+from backend.benchmarks.mock_anthropic import MockAnthropic
+from backend.utils import request_agent as ra
+from backend.utils.catalog_index import load_catalog_csv
+from backend.utils.llm_client import set_client
+
+
+# API latency before the first delta, per model
+FIRST_TOKEN_SECONDS = {ra.SMALL_MODEL: 0.3, ra.LARGE_MODEL: 0.8}
+CHUNK_CHARS = 4             # ~1 token per delta
+CHUNK_DELAY = 0.02          # ~50 output tokens/s
+
+
+def build_reply(catalog, n_items: int = 8) -> str:
+    rows = catalog.rows[:n_items]
+    return json.dumps({
+        "materials": [[r["artikel_id"], i + 1, r["artikelname"]] for i, r in enumerate(rows)],
+        "explanation": "Alles für die Montage: Befestigung, Werkzeug und Schutzausrüstung. " * 4,
+    }, ensure_ascii=False, indent=2)
+
+
+def run() -> None:
+    catalog = load_catalog_csv("backend/data/sample.csv")
+    reply = build_reply(catalog)
+    set_client(MockAnthropic([reply], latency=FIRST_TOKEN_SECONDS, chunk_chars=CHUNK_CHARS, chunk_delay=CHUNK_DELAY))
+
+    messages = [{"role": "user", "content": "Material für die Montage von Trockenbauwänden"}]
+    start = time.perf_counter()
+    item_times = []
+    for event, data in ra.stream_chat_procurement_request(messages, catalog, top_k=20, catalog_format="auto"):
+        if event == "item":
+            item_times.append(time.perf_counter() - start)
+        elif event == "done":
+            done = time.perf_counter() - start
+            result = data
+
+    print(f"reply: {len(reply)} chars in {-(-len(reply) // CHUNK_CHARS)} deltas, "
+          f"{FIRST_TOKEN_SECONDS[ra.SMALL_MODEL]:.1f}s / {FIRST_TOKEN_SECONDS[ra.LARGE_MODEL]:.1f}s "
+          f"to first token (small / large model)")
+    print(f"items streamed:     {len(item_times)} (final result: {result['type']}, "
+          f"{len(result['content']['items'])} items)")
+    print(f"time to first item: {item_times[0]:.2f}s")
+    print(f"time to last item:  {item_times[-1]:.2f}s")
+    print(f"time to done:       {done:.2f}s  (what the blocking endpoint waits)")
+
+
+if __name__ == "__main__":
+    run()
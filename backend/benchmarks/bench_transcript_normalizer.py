@@ -0,0 +1,98 @@
+"""
+Benchmark: local transcript normalizer against the Claude cleanup it replaces.
+
+1. Corpus: recorded speech-to-text transcripts (voice_transcripts.json) must clean to
+   the expected text and carry the expected flags ("expected": null = flagged for
+   Claude, text not checked).
+2. Downstream: how many cleaned transcripts the no-LLM fast path can then resolve
+   against the catalog, compared with the raw transcripts.
+3. Latency: normalize_transcript() per transcript, and a pass over the corpus through
+   clean_voice_transcript() with and without llm_fallback against the mock messages
+   API (small-model latency), counting the LLM calls left.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_transcript_normalizer
+"""
+import json
+import os
+import statistics
+import time
+
+from backend.benchmarks.mock_anthropic import MockAnthropic
+from backend.utils import request_agent as ra
+from backend.utils.catalog_index import load_catalog_csv
+from backend.utils.fast_path import match_order
+from backend.utils.llm_client import set_client
+from backend.utils.transcript_normalizer import normalize_transcript
+
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "voice_transcripts.json")
+REPEATS = 500
+# seconds per clean_transcript call on the small model (time to first token plus generation)
+LLM_LATENCY = 0.35
+
+
+def check_corpus(corpus: list) -> None:
+    exact = flags_ok = 0
+    checked = sum(case["expected"] is not None for case in corpus)
+    for case in corpus:
+        got = normalize_transcript(case["raw"])
+        if case["expected"] is not None:
+            if got.text == case["expected"]:
+                exact += 1
+            else:
+                print(f"  MISMATCH {case['raw']!r}:\n    got      {got.text!r}\n    expected {case['expected']!r}")
+        if got.flags == case["flags"]:
+            flags_ok += 1
+        else:
+            print(f"  FLAGS {case['raw'][:60]!r}: {got.flags} (expected {case['flags']})")
+    flagged = sum(bool(case["flags"]) for case in corpus)
+    print(f"transcripts: {len(corpus)} ({flagged} flagged for Claude)")
+    print(f"cleaned as expected: {exact}/{checked}, flags as expected: {flags_ok}/{len(corpus)}")
+
+
+def check_fast_path(corpus: list, catalog) -> None:
+    raw_hits = cleaned_hits = 0
+    for case in corpus:
+        raw_hits += match_order(case["raw"], catalog) is not None
+        cleaned_hits += match_order(normalize_transcript(case["raw"]).text, catalog) is not None
+    print(f"fast-path hits: {raw_hits} raw -> {cleaned_hits} cleaned transcripts")
+
+
+def time_cleanup(corpus: list, llm_fallback: bool) -> tuple:
+    set_client(MockAnthropic(lambda kwargs: "2 Packungen Dübel 6mm", latency=LLM_LATENCY))
+    ra._routing_stats.clear()
+    start = time.perf_counter()
+    for case in corpus:
+        ra.clean_voice_transcript(case["raw"], llm_fallback=llm_fallback)
+    wall = time.perf_counter() - start
+    calls = sum(m["calls"] for task in ra.model_routing_stats().values() for m in task["models"].values())
+    return wall, calls
+
+
+def run() -> None:
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        corpus = json.load(f)
+    catalog = load_catalog_csv("backend/data/sample.csv")
+
+    check_corpus(corpus)
+    check_fast_path(corpus, catalog)
+
+    timings = []
+    for case in corpus:
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            normalize_transcript(case["raw"])
+            timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    print(f"normalize_transcript: p50 {statistics.median(timings):.1f} µs, "
+          f"p99 {timings[int(len(timings) * 0.99)]:.1f} µs per transcript")
+
+    for llm_fallback in (False, True):
+        wall, calls = time_cleanup(corpus, llm_fallback)
+        print(f"clean_voice_transcript(llm_fallback={llm_fallback}): {wall * 1000:.1f} ms for the corpus, "
+              f"{calls} LLM calls (previously {len(corpus)}, one per transcript)")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,61 @@
+"""
+Load test: concurrent requests overlap their LLM calls instead of queuing on the event loop.
+
+Drives the FastAPI app in-process (httpx ASGI transport) against the mock messages
+API with a fixed per-call latency. With blocking calls on the event loop, wall time
+grows as N x latency and the health check waits for all of them; with offloading it
+stays near one latency until LLM_MAX_IN_FLIGHT calls are in flight.
+
+Run from the project root:
+    python -m backend.benchmarks.load_test
+"""
+import asyncio
+import time
+
+import httpx
+
+from backend import main
+from backend.benchmarks.mock_anthropic import MockAnthropic
+from backend.utils.llm_client import set_client, set_governor
+from backend.utils.llm_governor import LLMGovernor
+
+
+LATENCY = 0.5  # seconds per mocked Claude call
+CONCURRENCY_LEVELS = (1, 4, 8, 16, 32)
+
+CHAT_BODY = {"messages": [{"role": "user", "content": "Ich brauche Arbeitshandschuhe"}]}
+
+
+async def run_level(client: httpx.AsyncClient, n: int) -> None:
+    async def health_check() -> float:
+        await asyncio.sleep(LATENCY / 5)  # while the LLM calls are in flight
+        start = time.perf_counter()
+        await client.get("/")
+        return time.perf_counter() - start
+
+    main._llm_stats["peak_in_flight"] = 0
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(client.post("/chat_request", json=CHAT_BODY) for _ in range(n)),
+        health_check(),
+    )
+    wall = time.perf_counter() - start
+    ok = sum(1 for r in results[:-1] if r.status_code == 200)
+
+    print(f"{n:>3} concurrent | wall {wall:6.2f} s (serial would be {n * LATENCY:5.1f} s) | "
+          f"{n / wall:5.1f} req/s | peak in flight {main._llm_stats['peak_in_flight']:>2} | "
+          f"health check {results[-1] * 1000:6.1f} ms | ok {ok}/{n}")
+
+
+async def run() -> None:
+    # the mock has no rate limit: don't let the default tier-1 governor throttle the test
+    set_governor(LLMGovernor(requests_per_minute=100000, input_tokens_per_minute=1e9))
+    set_client(MockAnthropic(["QUESTION: Welche Größe?"], latency=LATENCY))
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+        for n in CONCURRENCY_LEVELS:
+            await run_level(client, n)
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
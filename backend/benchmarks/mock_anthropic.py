@@ -0,0 +1,168 @@
+"""
+Local stand-in for the Anthropic messages API, for offline benchmarks and checks.
+
+It mimics the response shape the agent code reads (content[0].text, usage) and
+Anthropic's prompt-caching accounting: the prefix up to the last block marked
+with cache_control (system or message content) is "cached" on first use and read
+from cache afterwards. Images count IMAGE_TOKENS_EST tokens, not their base64 length.
+With `rate_limit` it also answers 429 (with retry-after) above a request rate.
+"""
+import hashlib
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+from backend.utils.llm_governor import IMAGE_TOKENS_EST
+from backend.utils.request_agent import estimate_tokens
+
+
+def _estimate(value, sort_keys: bool = False) -> int:
+    """estimate_tokens of the JSON of `value`, with image blocks at IMAGE_TOKENS_EST each."""
+    images = 0
+
+    def strip(v):
+        nonlocal images
+        if isinstance(v, dict):
+            if v.get('type') == 'image':
+                images += 1
+                return {'type': 'image'}
+            return {k: strip(x) for k, x in v.items()}
+        if isinstance(v, list):
+            return [strip(x) for x in v]
+        return v
+
+    text = json.dumps(strip(value), ensure_ascii=False, sort_keys=sort_keys)
+    return estimate_tokens(text) + images * IMAGE_TOKENS_EST
+
+
+class MockRateLimitError(Exception):
+    """Shaped like anthropic.RateLimitError: status_code 429 and response.headers['retry-after']."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"429 rate_limit_error (retry after {retry_after}s)")
+        self.status_code = 429
+        self.response = SimpleNamespace(headers={'retry-after': str(retry_after)})
+
+
+class MockStream:
+    """Context manager mimicking messages.stream(): text_stream and get_final_message()."""
+
+    def __init__(self, message, chunk_chars: int, chunk_delay: float):
+        self._message = message
+        self._chunk_chars = chunk_chars
+        self._chunk_delay = chunk_delay
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        text = self._message.content[0].text
+        for i in range(0, len(text), self._chunk_chars):
+            if self._chunk_delay:
+                time.sleep(self._chunk_delay)
+            yield text[i:i + self._chunk_chars]
+
+    def get_final_message(self):
+        return self._message
+
+
+class MockMessages:
+    def __init__(self, replies=None, latency: float = 0.0, chunk_chars: int = 8, chunk_delay: float = 0.0,
+                 rate_limit: tuple = None, retry_after: float = 1.0):
+        # replies: list of response texts (consumed in order) or callable(kwargs) -> text
+        self.replies = replies if replies is not None else ['QUESTION: Which size?']
+        # seconds each call blocks, like waiting on the real API (time to first token when
+        # streaming); a dict gives it per model
+        self.latency = latency
+        # streaming: text delta size and the delay before each delta (output generation speed)
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay
+        # (max requests, window seconds): a budget of max_requests, continuously refilled over
+        # the window like the API's limits; requests beyond it fail with MockRateLimitError
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.rejected = 0
+        self.calls = []
+        self.cached_prefixes = set()
+        self._budget = rate_limit[0] if rate_limit else 0
+        self._budget_updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _check_rate_limit(self) -> None:
+        if self.rate_limit is None:
+            return
+        max_requests, window = self.rate_limit
+        with self._lock:
+            now = time.monotonic()
+            self._budget = min(max_requests, self._budget + (now - self._budget_updated) * max_requests / window)
+            self._budget_updated = now
+            if self._budget < 1:
+                self.rejected += 1
+                raise MockRateLimitError(self.retry_after)
+            self._budget -= 1
+
+    def _reply(self, kwargs) -> str:
+        if callable(self.replies):
+            return self.replies(kwargs)
+        if len(self.calls) <= len(self.replies):
+            return self.replies[len(self.calls) - 1]
+        return self.replies[-1]
+
+    def _cache_usage(self, kwargs) -> tuple:
+        system = kwargs.get('system')
+        blocks = list(system) if isinstance(system, list) else []
+        for message in kwargs.get('messages') or []:
+            content = message.get('content')
+            blocks += content if isinstance(content, list) else [{'type': 'text', 'text': content}]
+        marked = [i for i, b in enumerate(blocks) if isinstance(b, dict) and b.get('cache_control')]
+        if not marked:
+            return 0, 0
+        prefix = json.dumps(blocks[:marked[-1] + 1], ensure_ascii=False, sort_keys=True)
+        tokens = _estimate(blocks[:marked[-1] + 1], sort_keys=True)
+        # the cache is per model: a prefix cached for Haiku is a miss for Sonnet
+        digest = hashlib.sha1(f"{kwargs.get('model')}\n{prefix}".encode('utf-8')).hexdigest()
+        if digest in self.cached_prefixes:
+            return tokens, 0
+        self.cached_prefixes.add(digest)
+        return 0, tokens
+
+    def create(self, **kwargs):
+        self._check_rate_limit()
+        self.calls.append(kwargs)
+        latency = self.latency.get(kwargs.get('model'), 0.0) if isinstance(self.latency, dict) else self.latency
+        if latency:
+            time.sleep(latency)
+        text = self._reply(kwargs)
+        cache_read, cache_write = self._cache_usage(kwargs)
+        total_in = _estimate({'system': kwargs.get('system'), 'messages': kwargs.get('messages')})
+        usage = SimpleNamespace(
+            input_tokens=max(0, total_in - cache_read - cache_write),
+            output_tokens=estimate_tokens(text),
+            cache_read_input_tokens=cache_read,
+            cache_creation_input_tokens=cache_write,
+        )
+        return SimpleNamespace(
+            content=[SimpleNamespace(type='text', text=text)],
+            usage=usage,
+            model=kwargs.get('model'),
+            stop_reason='end_turn',
+        )
+
+    def stream(self, **kwargs):
+        return MockStream(self.create(**kwargs), self.chunk_chars, self.chunk_delay)
+
+
+class MockAnthropic:
+    """Drop-in for anthropic.Anthropic(api_key=...) exposing .messages.create and .messages.stream."""
+
+    def __init__(self, replies=None, latency: float = 0.0, chunk_chars: int = 8, chunk_delay: float = 0.0,
+                 rate_limit: tuple = None, retry_after: float = 1.0, **_client_kwargs):
+        self.messages = MockMessages(replies, latency, chunk_chars, chunk_delay, rate_limit, retry_after)
+
+    def close(self):
+        pass
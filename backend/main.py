@@ -1,12 +1,34 @@
-from fastapi import FastAPI
-from fastapi.responses import FileResponse
+import asyncio
+import contextvars
+import functools
+import hashlib
+import json
+import time
+import anyio
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List
 from backend.utils.request_agent import process_procurement_request, clean_voice_transcript, chat_procurement_request, analyze_image_request
+from backend.utils.request_agent import stream_procurement_request, stream_chat_procurement_request, stream_analyze_image_request
+from backend.utils.request_agent import model_routing_stats, batch_image_prompt, merge_image_results
 from typing import Optional
+from backend.utils.catalog_index import PROMPT_EXCLUDED_FIELDS, CatalogIndex
+from backend.utils.llm_client import close_client, connection_stats, governor_stats
+from backend.utils.llm_governor import BATCH, LLMOverloaded, llm_priority
+from backend.utils.deadline import CallScope, DeadlineExceeded, RequestCancelled, cancellation_stats, current_scope, record_cancellation
+from backend.utils.response_cache import ResponseCache, normalize_prompt
+from backend.utils.session_store import SessionStore
+from backend.utils.image_store import ImageStore, ImageTooLarge, decode_base64_image, image_id_for
+from backend.utils.image_preprocess import ImagePreprocessor
+from backend.utils.image_cache import ImageAnalysisCache
+from backend.utils.singleflight import SingleFlight
+from backend.utils.fast_path import fast_path_stats
+from backend.utils.transcript_normalizer import normalizer_stats
 from backend.pdf_generator import generate_pdf_contract
 import csv
 import os
+import tempfile
 
 app = FastAPI()
 
@@ -35,6 +57,11 @@ MOCK_PARTS = [
 class PromptRequest(BaseModel):
     prompt: str
 
+class BatchPromptRequest(BaseModel):
+    prompts: List[str]
+    concurrency: Optional[int] = None  # capped at BATCH_MAX_CONCURRENCY
+    stream: bool = False  # NDJSON lines as results finish instead of one ordered response
+
 class OrderNumberRequest(BaseModel):
     order_number: str
     parts_list: list[dict]
@@ -54,9 +81,78 @@ SUPPLIER_LEAD_TIMES = {
     "default": 7  # Unknown suppliers
 }
 
-# data parsed once at startup
+# Number of retrieved catalog rows sent to the model per request (None = whole catalog)
+PROMPT_TOP_K = 40
+# Catalog encoding in prompts: json_pretty, json_min, tsv, grouped or auto (cheapest per request)
+PROMPT_CATALOG_FORMAT = "auto"
+
+# Resolve fully specified orders ("500 Schraube TX20 4x40", "C019 x 10") without Claude
+FAST_PATH_ENABLED = True
+
+# /clean_voice_input: clean transcripts with the local normalizer only (False), or let
+# Claude redo the ones it flags as long or messy (True); requests may override this
+VOICE_LLM_FALLBACK = False
+
+# Upper bound on blocking LLM calls running at once in worker threads
+# (keep at or below llm_client.MAX_CONNECTIONS so every call gets a pooled connection)
+LLM_MAX_IN_FLIGHT = 16
+
+# Cache of model selections for /receive_user_prompt (prices/stock are re-applied live)
+RESPONSE_CACHE_MAX_ENTRIES = 2048
+RESPONSE_CACHE_TTL_SECONDS = 6 * 3600
+RESPONSE_CACHE_DB = None  # e.g. "backend/data/response_cache.sqlite3" to survive restarts
+
+# Server-side chat sessions (/chat_request with session_id + message): idle lifetime,
+# capacity, and estimated tokens of history sent per turn before old exchanges are condensed
+CHAT_SESSION_TTL_SECONDS = 2 * 3600
+CHAT_SESSION_MAX = 4096
+CHAT_SESSION_DB = None  # e.g. "backend/data/chat_sessions.sqlite3" to survive restarts
+CHAT_HISTORY_TOKEN_BUDGET = 2000
+
+# Uploaded images (POST /images, referenced by image_id in /analyze_image): bytes kept in
+# memory, spill directory and its size bound, and the largest accepted image
+IMAGE_STORE_MAX_MEMORY_BYTES = 256 * 1024 * 1024
+IMAGE_STORE_SPILL_DIR = os.path.join(tempfile.gettempdir(), "hammertime-images")  # None = no disk spill
+IMAGE_STORE_MAX_DISK_BYTES = 2 * 1024 * 1024 * 1024
+IMAGE_MAX_BYTES = 20 * 1024 * 1024
+
+# Preprocessing of uploaded images before they are stored (needs Pillow, otherwise images
+# are kept as uploaded): worker processes, default mode ("auto", "photo", "document" or
+# "off"), long edge in pixels, byte budget and format of the re-encoded image
+IMAGE_PREPROCESS_WORKERS = 2
+IMAGE_PREPROCESS_MODE = "auto"
+IMAGE_MAX_LONG_EDGE = 1568
+IMAGE_TARGET_BYTES = 400 * 1024
+IMAGE_OUTPUT_FORMAT = "jpeg"  # or "webp"
+
+# Opening /analyze_image turns on a near-duplicate photo (perceptual hash within
+# IMAGE_CACHE_MAX_DISTANCE of 256 bits, thumbnail blocks within IMAGE_CACHE_MAX_BLOCK_DIFF
+# gray levels) reuse the earlier analysis: capacity and lifetime
+IMAGE_CACHE_MAX_ENTRIES = 2048
+IMAGE_CACHE_TTL_SECONDS = 24 * 3600
+IMAGE_CACHE_MAX_DISTANCE = 24
+IMAGE_CACHE_MAX_BLOCK_DIFF = 20
+
+# /analyze_images - images per request, and images identified at once (their vision
+# calls also count against LLM_MAX_IN_FLIGHT)
+IMAGE_BATCH_MAX_IMAGES = 20
+IMAGE_BATCH_MAX_CONCURRENCY = 8
+
+# /receive_user_prompts:batch - prompts of one batch processed at once (stays below
+# LLM_MAX_IN_FLIGHT so interactive requests still get LLM slots during nightly planning)
+BATCH_MAX_CONCURRENCY = 8
+BATCH_MAX_PROMPTS = 500
+
+# Deadline of an LLM request without an X-Request-Timeout header, and the longest a
+# client may ask for (seconds)
+DEFAULT_REQUEST_TIMEOUT = 120
+MAX_REQUEST_TIMEOUT = 300
+# How often a waiting request checks whether its client has disconnected (seconds)
+DISCONNECT_POLL_INTERVAL = 0.5
+
+# data parsed and indexed once at startup
 import random
-def parse_data():
+def parse_data() -> CatalogIndex:
     with open('backend/data/sample.csv', 'r', encoding='utf-8') as f:
         reader = csv.DictReader(f)
         c_materials = []
@@ -73,7 +169,7 @@ def parse_data():
             _ = True if g in ('true', '1', 'yes') else False
 
             # remove unwanted fields from the row
-            for _k in ('verbrauchsart', 'gefahrgut', 'gefahrengut', 'lagerort'):
+            for _k in PROMPT_EXCLUDED_FIELDS:
                 row.pop(_k, None)
             
             # Add mock inventory data (simulating warehouse stock)
@@ -86,19 +182,366 @@ def parse_data():
 
             c_materials.append(row)
     
-    return c_materials
+    # index once: normalized IDs, parsed prices, BM25 retriever and a version stamp shared by all endpoints
+    return CatalogIndex(c_materials)
 
 c_materials_catalog = parse_data()
 
+response_cache = ResponseCache(
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+    sqlite_path=RESPONSE_CACHE_DB,
+)
+
+chat_sessions = SessionStore(
+    max_sessions=CHAT_SESSION_MAX,
+    ttl_seconds=CHAT_SESSION_TTL_SECONDS,
+    sqlite_path=CHAT_SESSION_DB,
+    history_token_budget=CHAT_HISTORY_TOKEN_BUDGET,
+)
+
+image_store = ImageStore(
+    max_memory_bytes=IMAGE_STORE_MAX_MEMORY_BYTES,
+    spill_dir=IMAGE_STORE_SPILL_DIR,
+    max_disk_bytes=IMAGE_STORE_MAX_DISK_BYTES,
+    max_image_bytes=IMAGE_MAX_BYTES,
+)
+
+image_analysis_cache = ImageAnalysisCache(
+    max_entries=IMAGE_CACHE_MAX_ENTRIES,
+    ttl_seconds=IMAGE_CACHE_TTL_SECONDS,
+    max_distance=IMAGE_CACHE_MAX_DISTANCE,
+    max_block_diff=IMAGE_CACHE_MAX_BLOCK_DIFF,
+)
+
+image_preprocessor = ImagePreprocessor(
+    max_workers=IMAGE_PREPROCESS_WORKERS,
+    mode=IMAGE_PREPROCESS_MODE,
+    max_long_edge=IMAGE_MAX_LONG_EDGE,
+    max_bytes=IMAGE_TARGET_BYTES,
+    output_format=IMAGE_OUTPUT_FORMAT,
+)
+
+# identical concurrent prompts/transcripts (several tablets, Streamlit reruns) share one Claude call
+single_flight = SingleFlight()
+
+
+# --- Offloading blocking LLM calls ----------------------------------------------
+
+_llm_limiter = None  # anyio.CapacityLimiter, created inside the running event loop
+_llm_stats = {"in_flight": 0, "peak_in_flight": 0, "completed": 0}
+
+
+async def run_llm(func, *args, scope: CallScope = None, **kwargs):
+    """
+    Run a blocking agent function (one or more Claude calls) in a worker thread.
+
+    The event loop stays free to serve other foremen and health checks while the call
+    waits on the API; at most LLM_MAX_IN_FLIGHT calls run at once, the rest queue here.
+    The call runs under `scope` (the request's deadline); cancelling the awaiting task
+    cancels the scope, so the worker stops before its next Claude call or stream chunk.
+    Blocking messages.create calls are streamed internally by the governor, so a call
+    already running stops at its next chunk too and its HTTP response is closed.
+    """
+    scope = scope if scope is not None else CallScope()
+    async with _get_llm_limiter():
+        _llm_stats["in_flight"] += 1
+        _llm_stats["peak_in_flight"] = max(_llm_stats["peak_in_flight"], _llm_stats["in_flight"])
+        try:
+            return await _in_worker(scope, _scoped_context(scope), func, *args, **kwargs)
+        finally:
+            _llm_stats["in_flight"] -= 1
+            _llm_stats["completed"] += 1
+
+
+def _scoped_context(scope: CallScope) -> contextvars.Context:
+    # copy of the caller's context (keeps llm_priority) with the request's scope
+    context = contextvars.copy_context()
+    context.run(current_scope.set, scope)
+    return context
+
+
+async def _in_worker(scope: CallScope, context: contextvars.Context, func, /, *args, **kwargs):
+    """func(*args, **kwargs) in a worker thread, inside `context` (kwargs may use any name)."""
+    call = asyncio.ensure_future(anyio.to_thread.run_sync(functools.partial(context.run, func, *args, **kwargs)))
+    try:
+        return await asyncio.shield(call)
+    except asyncio.CancelledError:
+        # caller gone: stop the worker at its next check, keeping the slot until it has
+        scope.cancel()
+        record_cancellation("upstream_cancelled")
+        with anyio.CancelScope(shield=True):
+            await asyncio.gather(call, return_exceptions=True)
+        raise
+
+
+def _get_llm_limiter() -> anyio.CapacityLimiter:
+    global _llm_limiter
+    if _llm_limiter is None:
+        _llm_limiter = anyio.CapacityLimiter(LLM_MAX_IN_FLIGHT)
+    return _llm_limiter
+
+
+def call_scope(timeout: Optional[float]) -> CallScope:
+    """CallScope for one request: the client's X-Request-Timeout (capped) or the default."""
+    if timeout is None or timeout <= 0:
+        timeout = DEFAULT_REQUEST_TIMEOUT
+    return CallScope(min(timeout, MAX_REQUEST_TIMEOUT))
+
+
+async def _watch_disconnect(http_request: Request, scope: CallScope, task: asyncio.Task = None) -> None:
+    """Cancel `scope` (and `task`) once the client has disconnected."""
+    while True:
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+        if await http_request.is_disconnected():
+            record_cancellation("disconnected")
+            scope.cancel()
+            if task is not None:
+                task.cancel()
+            return
+
+
+async def guard_llm(http_request: Request, scope: CallScope, awaitable):
+    """
+    Await `awaitable` (LLM work for one client) within the request's deadline.
+
+    Raises DeadlineExceeded (504) when the deadline passes and RequestCancelled when
+    the client disconnects; either way the awaiting task is cancelled, which cancels
+    the worker's scope (or leaves the shared single-flight call).
+    """
+    task = asyncio.ensure_future(awaitable)
+    # nobody may await an abandoned task: mark its outcome as retrieved
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    watcher = asyncio.ensure_future(_watch_disconnect(http_request, scope, task))
+    try:
+        done, _ = await asyncio.wait({task}, timeout=scope.remaining())
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        watcher.cancel()
+
+    if not done:
+        record_cancellation("timed_out")
+        scope.cancel()
+        task.cancel()
+        raise DeadlineExceeded(f"No answer within the request deadline of {scope.timeout:g}s")
+    if task.cancelled():
+        raise RequestCancelled("Client disconnected")
+    if isinstance(task.exception(), DeadlineExceeded):
+        record_cancellation("timed_out")
+    return task.result()
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request, exc: DeadlineExceeded):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
+@app.exception_handler(RequestCancelled)
+async def request_cancelled_handler(request, exc: RequestCancelled):
+    # nobody reads this; 499 (client closed request) keeps it apart in access logs
+    return JSONResponse(status_code=499, content={"detail": str(exc)})
+
+
+@app.exception_handler(LLMOverloaded)
+async def llm_overloaded_handler(request, exc: LLMOverloaded):
+    """The LLM rate-limit queue is full: tell the client when to retry instead of a 500."""
+    headers = {"Retry-After": str(max(1, round(exc.retry_after)))} if exc.retry_after is not None else None
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers=headers)
+
+
+# --- Server-sent events -----------------------------------------------------------
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _sse_events(func, *args, scope: CallScope = None, http_request: Request = None, **kwargs):
+    """
+    SSE body for a streaming agent function (a blocking generator of (event, data) pairs).
+
+    Each step of the generator runs in a worker thread under the same limit as run_llm;
+    errors after the response has started are sent as an "error" event. A disconnected
+    client or passed deadline stops the generator and its upstream Claude stream.
+    """
+    scope = scope if scope is not None else CallScope()
+    context = _scoped_context(scope)
+    watcher = asyncio.ensure_future(_watch_disconnect(http_request, scope)) if http_request is not None else None
+    events = func(*args, **kwargs)
+    async with _get_llm_limiter():
+        _llm_stats["in_flight"] += 1
+        _llm_stats["peak_in_flight"] = max(_llm_stats["peak_in_flight"], _llm_stats["in_flight"])
+        try:
+            while True:
+                step = await _in_worker(scope, context, next, events, None)
+                if step is None:
+                    break
+                event, data = step
+                yield _sse(event, data)
+        except RequestCancelled:
+            return  # the client is gone, nobody reads the rest
+        except DeadlineExceeded as e:
+            record_cancellation("timed_out")
+            yield _sse("error", {"detail": str(e)})
+        except Exception as e:
+            print(f"Error while streaming: {e}")
+            yield _sse("error", {"detail": str(e)})
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            events.close()  # closes the upstream stream if the client left mid-answer
+            _llm_stats["in_flight"] -= 1
+            _llm_stats["completed"] += 1
+
+
+def stream_llm(func, *args, scope: CallScope = None, http_request: Request = None, **kwargs) -> StreamingResponse:
+    """text/event-stream response emitting "item" events as materials are priced, then "done"."""
+    return StreamingResponse(
+        _sse_events(func, *args, scope=scope, http_request=http_request, **kwargs),
+        media_type="text/event-stream",
+        # no proxy buffering: each event should reach the tablet as soon as it is written
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 @app.post("/receive_user_prompt")
-async def receive_user_prompt(request: PromptRequest):
+async def receive_user_prompt(request: PromptRequest, http_request: Request,
+                              x_request_timeout: Optional[float] = Header(None)):
     """Receives user prompt and returns list of parts with suppliers"""
-    suggested_materials = process_procurement_request(request.prompt, c_materials_catalog)
+    # the shared call has no deadline of its own: it runs until every waiter has given up
+    suggested_materials = await guard_llm(http_request, call_scope(x_request_timeout), single_flight.do(
+        ("receive_user_prompt", normalize_prompt(request.prompt)),
+        lambda: run_llm(
+            process_procurement_request,
+            request.prompt,
+            c_materials_catalog,
+            top_k=PROMPT_TOP_K,
+            catalog_format=PROMPT_CATALOG_FORMAT,
+            response_cache=response_cache,
+            fast_path=FAST_PATH_ENABLED
+        )
+    ))
     #TODO: validate IDs are legit
     return suggested_materials
 
 
+_batch_stats = {"batches": 0, "prompts": 0, "deduplicated": 0, "errors": 0}
+
+
+async def _batch_prompt_result(semaphore: asyncio.Semaphore, prompt: str) -> dict:
+    """One batch prompt through the same coalesced, cached path as /receive_user_prompt."""
+    llm_priority.set(BATCH)  # own task: interactive requests are admitted to the LLM first
+    async with semaphore:
+        try:
+            result = await single_flight.do(
+                ("receive_user_prompt", normalize_prompt(prompt)),
+                lambda: run_llm(
+                    process_procurement_request,
+                    prompt,
+                    c_materials_catalog,
+                    top_k=PROMPT_TOP_K,
+                    catalog_format=PROMPT_CATALOG_FORMAT,
+                    response_cache=response_cache,
+                    fast_path=FAST_PATH_ENABLED
+                )
+            )
+            return {"ok": True, "result": result}
+        except Exception as e:
+            print(f"Batch prompt failed: {e}")
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+
+@app.post("/receive_user_prompts:batch")
+async def receive_user_prompts_batch(request: BatchPromptRequest):
+    """
+    Processes many task descriptions (e.g. nightly pre-planning) with bounded concurrency.
+
+    Identical prompts (after normalization) are processed once. A failing prompt yields
+    {"ok": false, "error": ...} in its slot instead of failing the batch. Without `stream`
+    the results come back in request order; with `stream` as NDJSON lines in completion
+    order (each line carries its "index"), followed by a summary line.
+    """
+    if len(request.prompts) > BATCH_MAX_PROMPTS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_PROMPTS} prompts per batch")
+
+    started = time.perf_counter()
+    concurrency = max(1, min(request.concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    # dedupe: every distinct normalized prompt is processed once, for all its positions
+    positions = {}  # normalized prompt -> indices in the request
+    for i, prompt in enumerate(request.prompts):
+        positions.setdefault(normalize_prompt(prompt), []).append(i)
+    tasks = {
+        asyncio.ensure_future(_batch_prompt_result(semaphore, request.prompts[indices[0]])): indices
+        for indices in positions.values()
+    }
+
+    _batch_stats["batches"] += 1
+    _batch_stats["prompts"] += len(request.prompts)
+    _batch_stats["deduplicated"] += len(request.prompts) - len(tasks)
+
+    def entries_for(task) -> list:
+        indices = tasks[task]
+        outcome = task.result()
+        if not outcome["ok"]:
+            _batch_stats["errors"] += len(indices)
+        return [
+            {"index": i, "prompt": request.prompts[i], **outcome,
+             **({"duplicate_of": indices[0]} if i != indices[0] else {})}
+            for i in indices
+        ]
+
+    def summary() -> dict:
+        return {
+            "prompts": len(request.prompts),
+            "unique_prompts": len(tasks),
+            "concurrency": concurrency,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+    if not request.stream:
+        await asyncio.gather(*tasks)
+        results = sorted((e for task in tasks for e in entries_for(task)), key=lambda e: e["index"])
+        return {"results": results, "summary": dict(summary(), errors=sum(not e["ok"] for e in results))}
+
+    async def ndjson_lines():
+        errors = 0
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    for entry in entries_for(task):
+                        errors += not entry["ok"]
+                        yield json.dumps(entry, ensure_ascii=False) + "\n"
+            yield json.dumps({"summary": dict(summary(), errors=errors)}) + "\n"
+        finally:
+            # client went away: do not keep spending LLM calls on this batch
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
+@app.post("/receive_user_prompt/stream")
+async def receive_user_prompt_stream(request: PromptRequest, http_request: Request,
+                                     x_request_timeout: Optional[float] = Header(None)):
+    """Streaming /receive_user_prompt: SSE "item" event per priced part, then "done" with the full result."""
+    return stream_llm(
+        stream_procurement_request,
+        request.prompt,
+        c_materials_catalog,
+        top_k=PROMPT_TOP_K,
+        catalog_format=PROMPT_CATALOG_FORMAT,
+        response_cache=response_cache,
+        fast_path=FAST_PATH_ENABLED,
+        scope=call_scope(x_request_timeout),
+        http_request=http_request
+    )
+
+
 @app.post("/generate_contract")
 async def generate_contract(request: OrderNumberRequest):
     """Generates PDF contract for the approved parts and returns the PDF file."""
@@ -145,13 +588,52 @@ async def root():
     """Health check endpoint"""
     return {"message": "HammerTime API is running"}
 
+
+@app.get("/metrics")
+async def metrics():
+    """Runtime counters for the LLM path (in-flight calls, connection reuse, caching, coalescing, deadlines, model routing)."""
+    return {
+        "llm_calls": dict(_llm_stats, limit=LLM_MAX_IN_FLIGHT),
+        "llm_connections": connection_stats(),
+        "response_cache": response_cache.stats(),
+        "single_flight": single_flight.stats(),
+        "batch": dict(_batch_stats),
+        "fast_path": fast_path_stats(),
+        "llm_governor": governor_stats(),
+        "cancellation": cancellation_stats(),
+        "model_routing": model_routing_stats(),
+        "transcript_normalizer": normalizer_stats(),
+        "chat_sessions": chat_sessions.stats(),
+        "image_store": image_store.stats(),
+        "image_preprocess": image_preprocessor.stats(),
+        "image_cache": image_analysis_cache.stats(),
+    }
+
+
+@app.on_event("shutdown")
+def shutdown_llm_client():
+    """Close the shared Anthropic client and its connection pool, the stores and the image workers."""
+    close_client()
+    response_cache.close()
+    chat_sessions.close()
+    image_preprocessor.close()
+
 class CleanVoiceRequest(BaseModel):
     text: str
+    llm_fallback: Optional[bool] = None  # None = VOICE_LLM_FALLBACK
 
 @app.post("/clean_voice_input")
-async def clean_voice_input(request: CleanVoiceRequest):
-    """Refines raw voice text using Claude"""
-    cleaned_text = clean_voice_transcript(request.text)
+async def clean_voice_input(request: CleanVoiceRequest, http_request: Request,
+                            x_request_timeout: Optional[float] = Header(None)):
+    """Refines raw voice text with the local normalizer (Claude only for messy transcripts if enabled)"""
+    llm_fallback = VOICE_LLM_FALLBACK if request.llm_fallback is None else request.llm_fallback
+    if not llm_fallback:
+        # rule-based cleanup takes microseconds: no worker thread, no LLM slot
+        return {"cleaned": clean_voice_transcript(request.text)}
+    cleaned_text = await guard_llm(http_request, call_scope(x_request_timeout), single_flight.do(
+        ("clean_voice_input", request.text),
+        lambda: run_llm(clean_voice_transcript, request.text, llm_fallback=True)
+    ))
     return {"cleaned": cleaned_text}
 
 
@@ -160,40 +642,355 @@ class ChatMessage(BaseModel):
     content: str
 
 class ChatRequest(BaseModel):
-    messages: List[ChatMessage]
+    # stateless: the whole history; session: the new `message` (plus `session_id` after the
+    # first turn, or `messages` to seed a new session with an earlier conversation)
+    messages: Optional[List[ChatMessage]] = None
+    session_id: Optional[str] = None
+    message: Optional[str] = None
+
+
+def _open_chat_turn(request: ChatRequest) -> tuple:
+    """
+    (session_id, session, messages to send) for a chat turn.
+
+    session_id and session are None for a stateless request carrying the whole history.
+    """
+    history = [{"role": m.role, "content": m.content} for m in request.messages or []]
+    if request.message is None:
+        if not history:
+            raise HTTPException(status_code=422, detail="Send the conversation in messages, or a message")
+        return None, None, history
+
+    session = chat_sessions.get(request.session_id) if request.session_id else None
+    if session is not None:
+        session_id = request.session_id
+    elif request.session_id and request.messages is None:
+        # the client still shows the conversation: it can resend it to start over
+        raise HTTPException(status_code=410, detail="Chat session expired, resend the conversation in messages")
+    else:
+        session_id, session = chat_sessions.create(history)
+    return session_id, session, chat_sessions.start_turn(session, request.message)
+
+
+def _finish_chat_turn(session_id: str, session: dict, result: dict) -> dict:
+    chat_sessions.finish_turn(session, result)
+    chat_sessions.save(session_id, session)
+    return {**result, "session_id": session_id}
+
+
+def _chat_session_events(session_id: str, session: dict, *args, **kwargs):
+    """stream_chat_procurement_request that records the turn in its session before "done" is sent."""
+    for event, data in stream_chat_procurement_request(*args, context=session["context"], **kwargs):
+        if event == "done":
+            data = _finish_chat_turn(session_id, session, data)
+        yield event, data
+
 
 @app.post("/chat_request")
-async def chat_request(request: ChatRequest):
+async def chat_request(request: ChatRequest, http_request: Request,
+                       x_request_timeout: Optional[float] = Header(None)):
     """
     Conversational chat endpoint for procurement requests.
     AI will ask clarifying questions or return final recommendations.
+
+    With a session (`message`, then `session_id` from the previous answer) only the new
+    message is sent; history and catalog context are kept on the server.
     """
-    messages = [{"role": m.role, "content": m.content} for m in request.messages]
-    result = chat_procurement_request(messages, c_materials_catalog)
+    session_id, session, messages = _open_chat_turn(request)
+    context = session["context"] if session is not None else None
+    scope = call_scope(x_request_timeout)
+    result = await guard_llm(http_request, scope, run_llm(chat_procurement_request, messages, c_materials_catalog, top_k=PROMPT_TOP_K, catalog_format=PROMPT_CATALOG_FORMAT, fast_path=FAST_PATH_ENABLED, context=context, scope=scope))
+    if session is not None:
+        result = _finish_chat_turn(session_id, session, result)
     return result
 
 
-class ImageAnalysisRequest(BaseModel):
+@app.post("/chat_request/stream")
+async def chat_request_stream(request: ChatRequest, http_request: Request,
+                              x_request_timeout: Optional[float] = Header(None)):
+    """
+    Streaming /chat_request: SSE "item" event per recommended material as soon as it is
+    priced, then "done" with the same result /chat_request returns.
+    """
+    session_id, session, messages = _open_chat_turn(request)
+    if session is not None:
+        return stream_llm(_chat_session_events, session_id, session, messages, c_materials_catalog, top_k=PROMPT_TOP_K, catalog_format=PROMPT_CATALOG_FORMAT, fast_path=FAST_PATH_ENABLED,
+                          scope=call_scope(x_request_timeout), http_request=http_request)
+    return stream_llm(stream_chat_procurement_request, messages, c_materials_catalog, top_k=PROMPT_TOP_K, catalog_format=PROMPT_CATALOG_FORMAT, fast_path=FAST_PATH_ENABLED,
+                      scope=call_scope(x_request_timeout), http_request=http_request)
+
+
+@app.delete("/chat_request/{session_id}")
+async def end_chat_session(session_id: str):
+    """Forget a chat session (the client cleared the conversation)."""
+    chat_sessions.delete(session_id)
+    return {"deleted": session_id}
+
+
+class ImageUploadRequest(BaseModel):
     image_base64: str
     media_type: str  # e.g., "image/jpeg", "image/png"
+    image_mode: Optional[str] = None  # "auto", "photo", "document" or "off"; None = IMAGE_PREPROCESS_MODE
+
+
+async def _store_image(image_base64: str, media_type: str, image_mode: str = None) -> tuple:
+    """(image_id, deduplicated) for a base64 upload, see _store_image_bytes."""
+    try:
+        data = await anyio.to_thread.run_sync(decode_base64_image, image_base64)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return await _store_image_bytes(data, media_type, image_mode)
+
+
+async def _store_image_bytes(data: bytes, media_type: str, image_mode: str = None, image_id: str = None) -> tuple:
+    """
+    (image_id, deduplicated) for an uploaded image (`image_id`: its SHA-256 if already known),
+    preprocessed in the worker processes unless already stored; 413 above IMAGE_MAX_BYTES,
+    422 if unusable. Hashing and storing (which may spill to disk) run in a worker thread.
+    """
+    try:
+        media_type = image_store.validate(data, media_type)
+        image_id = image_id or await anyio.to_thread.run_sync(image_id_for, data)
+        if not image_store.has(image_id):
+            prepared = await asyncio.wrap_future(image_preprocessor.submit(data, media_type, image_mode))
+            data, media_type = prepared.data, prepared.media_type
+        return await anyio.to_thread.run_sync(functools.partial(image_store.put, data, media_type, image_id=image_id))
+    except ImageTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.post("/images")
+async def upload_image(request: ImageUploadRequest):
+    """
+    Store an image once; /analyze_image turns then reference it by the returned image_id
+    (its SHA-256) instead of resending it.
+    """
+    image_id, deduplicated = await _store_image(request.image_base64, request.media_type, request.image_mode)
+    return {"image_id": image_id, "deduplicated": deduplicated}
+
+
+@app.post("/images/raw")
+async def upload_image_raw(http_request: Request, content_type: Optional[str] = Header(None),
+                           content_length: Optional[int] = Header(None),
+                           x_image_mode: Optional[str] = Header(None)):
+    """
+    POST /images with the image itself as the request body (Content-Type: image/jpeg, ...;
+    X-Image-Mode: see ImageUploadRequest.image_mode) instead of base64 in JSON: a third
+    fewer bytes on the wire and no JSON string to parse and decode. The body is hashed
+    while it arrives, and refused with 413 as soon as it exceeds IMAGE_MAX_BYTES (which
+    bounds the buffer).
+    """
+    if content_length is not None and content_length > IMAGE_MAX_BYTES:
+        raise HTTPException(status_code=413,
+                            detail=f"Image of {content_length} bytes exceeds the limit of {IMAGE_MAX_BYTES} bytes")
+    media_type = (content_type or "").split(";")[0].strip().lower()
+
+    digest = hashlib.sha256()
+    body = bytearray()
+    async for chunk in http_request.stream():
+        if len(body) + len(chunk) > IMAGE_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"Image exceeds the limit of {IMAGE_MAX_BYTES} bytes")
+        digest.update(chunk)
+        body += chunk
+
+    # the buffer itself is stored (no bytes() copy of up to IMAGE_MAX_BYTES); nothing writes to it after this
+    image_id, deduplicated = await _store_image_bytes(body, media_type, x_image_mode, digest.hexdigest())
+    return {"image_id": image_id, "deduplicated": deduplicated}
+
+
+class ImageAnalysisRequest(BaseModel):
+    # either the image_id from POST /images, or the image itself (stored on the way)
+    image_id: Optional[str] = None
+    image_base64: Optional[str] = None
+    media_type: Optional[str] = None  # e.g., "image/jpeg", "image/png"
+    image_mode: Optional[str] = None  # preprocessing of an inline image, see ImageUploadRequest
     messages: List[ChatMessage]
 
+
+async def _analysis_image(request) -> tuple:
+    """
+    (image_id, media_type, image_base64) of the (preprocessed) image an /analyze_image request
+    (or an /analyze_images entry) refers to.
+    """
+    image_id = request.image_id
+    if not image_id:
+        if not request.image_base64 or not request.media_type:
+            raise HTTPException(status_code=422, detail="Send image_id, or image_base64 and media_type")
+        image_id, _ = await _store_image(request.image_base64, request.media_type, request.image_mode)
+    # a cold image is read back from disk, and encoding megabytes takes a while: off the event loop
+    stored = await anyio.to_thread.run_sync(image_store.get_base64, image_id)
+    if stored is None:
+        raise HTTPException(status_code=410, detail="Image no longer stored, upload it again")
+    media_type, image_base64 = stored
+    return image_id, media_type, image_base64
+
+
+def _image_events(image_id: str, *args, **kwargs):
+    """stream_analyze_image_request with the image_id in its "done" result."""
+    for event, data in stream_analyze_image_request(*args, **kwargs):
+        if event == "done":
+            data = {**data, "image_id": image_id}
+        yield event, data
+
+
 @app.post("/analyze_image")
-async def analyze_image(request: ImageAnalysisRequest):
+async def analyze_image(request: ImageAnalysisRequest, http_request: Request,
+                        x_request_timeout: Optional[float] = Header(None)):
     """
     Analyze an uploaded image (handwritten list or photo of parts).
     AI will describe what it sees and ask clarifying questions or provide recommendations.
+    The result carries the image_id to send on follow-up turns.
     """
+    image_id, media_type, image_base64 = await _analysis_image(request)
     messages = [{"role": m.role, "content": m.content} for m in request.messages]
-    result = analyze_image_request(
-        request.image_base64,
-        request.media_type,
+    scope = call_scope(x_request_timeout)
+    result = await guard_llm(http_request, scope, run_llm(
+        analyze_image_request,
+        image_base64,
+        media_type,
         messages,
-        c_materials_catalog
+        c_materials_catalog,
+        top_k=PROMPT_TOP_K,
+        catalog_format=PROMPT_CATALOG_FORMAT,
+        image_cache=image_analysis_cache,
+        scope=scope
+    ))
+    return {**result, "image_id": image_id}
+
+
+@app.post("/analyze_image/stream")
+async def analyze_image_stream(request: ImageAnalysisRequest, http_request: Request,
+                               x_request_timeout: Optional[float] = Header(None)):
+    """Streaming /analyze_image: SSE "item" events per recommended material, then "done"."""
+    image_id, media_type, image_base64 = await _analysis_image(request)
+    messages = [{"role": m.role, "content": m.content} for m in request.messages]
+    return stream_llm(
+        _image_events,
+        image_id,
+        image_base64,
+        media_type,
+        messages,
+        c_materials_catalog,
+        top_k=PROMPT_TOP_K,
+        catalog_format=PROMPT_CATALOG_FORMAT,
+        image_cache=image_analysis_cache,
+        scope=call_scope(x_request_timeout),
+        http_request=http_request
     )
-    return result
 
 
+class ImageBatchEntry(BaseModel):
+    # as in ImageAnalysisRequest: the image_id from POST /images, or the image itself
+    image_id: Optional[str] = None
+    image_base64: Optional[str] = None
+    media_type: Optional[str] = None
+    image_mode: Optional[str] = None
+
+
+class ImageBatchRequest(BaseModel):
+    images: List[ImageBatchEntry]
+    message: Optional[str] = None  # the foreman's note for all images, e.g. "Lager Nord, Regal 3-7"
+    concurrency: Optional[int] = None  # capped at IMAGE_BATCH_MAX_CONCURRENCY
+
+
+async def _batch_image(entry: ImageBatchEntry):
+    """_analysis_image for one /analyze_images entry, or its HTTPException (an unusable image fails alone)."""
+    try:
+        return await _analysis_image(entry)
+    except HTTPException as e:
+        return e
+
+
+@app.post("/analyze_images")
+async def analyze_images(request: ImageBatchRequest, http_request: Request,
+                         x_request_timeout: Optional[float] = Header(None)):
+    """
+    Analyze several photos of one job (shelves, pages of a list) into one order.
+
+    All images are preprocessed at once, then identified with bounded concurrency (no
+    clarifying questions), so the request takes about as long as its slowest image. Their
+    recommendations are merged, quantities summed per artikel_id and priced once. An image
+    sent twice (same image_id) is identified once; an image that needs clarification or
+    fails (including one that is too large, undecodable or no longer stored) shows up in
+    "images" instead of failing the batch. Only an empty or oversized batch is refused.
+    """
+    if not request.images:
+        raise HTTPException(status_code=422, detail="Send at least one image")
+    if len(request.images) > IMAGE_BATCH_MAX_IMAGES:
+        raise HTTPException(status_code=413, detail=f"At most {IMAGE_BATCH_MAX_IMAGES} images per request")
+
+    started = time.perf_counter()
+    images = await asyncio.gather(*(_batch_image(entry) for entry in request.images))
+    failed = {i: e for i, e in enumerate(images) if isinstance(e, HTTPException)}
+
+    concurrency = max(1, min(request.concurrency or IMAGE_BATCH_MAX_CONCURRENCY, IMAGE_BATCH_MAX_CONCURRENCY))
+    semaphore = asyncio.Semaphore(concurrency)
+    scope = call_scope(x_request_timeout)
+    messages = [{"role": "user", "content": batch_image_prompt(request.message)}]
+
+    async def identify(media_type: str, image_base64: str) -> tuple:
+        async with semaphore:
+            start = time.perf_counter()
+            result = await run_llm(
+                analyze_image_request,
+                image_base64,
+                media_type,
+                messages,
+                c_materials_catalog,
+                top_k=PROMPT_TOP_K,
+                catalog_format=PROMPT_CATALOG_FORMAT,
+                image_cache=image_analysis_cache,
+                scope=scope
+            )
+            return result, time.perf_counter() - start
+
+    # every distinct image is identified once, for all its positions
+    first_index = {}
+    for i, image in enumerate(images):
+        if i not in failed:
+            first_index.setdefault(image[0], i)
+    unique = list(first_index)
+    outcomes = await guard_llm(http_request, scope, asyncio.gather(
+        *(identify(*images[first_index[image_id]][1:]) for image_id in unique)
+    ))
+    results = dict(zip(unique, outcomes))
+
+    per_image = []
+    for i, image in enumerate(images):
+        if i in failed:
+            per_image.append({"index": i, "image_id": request.images[i].image_id, "type": "error",
+                              "status_code": image.status_code, "content": image.detail, "seconds": 0.0})
+            continue
+        image_id = image[0]
+        result, seconds = results[image_id]
+        entry = {"index": i, "image_id": image_id, **result, "seconds": round(seconds, 3)}
+        if first_index[image_id] != i:
+            entry["duplicate_of"] = first_index[image_id]
+        per_image.append(entry)
+
+    merged = merge_image_results([results[image_id][0] for image_id in unique], c_materials_catalog)
+    # merge_image_results counts positions among the distinct images: map them back to the request's
+    for item in merged["items"]:
+        item["images"] = [first_index[unique[i]] for i in item["images"]]
+
+    return {
+        "type": "recommendations",
+        "content": merged,
+        "images": per_image,
+        "summary": {
+            "images": len(images),
+            "unique_images": len(unique),
+            "concurrency": concurrency,
+            "seconds": round(time.perf_counter() - started, 3),
+            # one image after another would have taken about this long
+            "sequential_seconds": round(sum(seconds for _, seconds in outcomes), 3),
+            "needs_clarification": sum(r["type"] == "question" for r, _ in outcomes),
+            "errors": sum(r["type"] == "error" for r, _ in outcomes) + len(failed),
+        },
+    }
+
 if __name__ == "__main__":
     import uvicorn
     # Run with: python -m backend.main
@@ -0,0 +1,174 @@
+"""
+Catalog index - lookup structures over the C-materials catalog.
+
+The index is built once per catalog version (at startup in backend/main) and
+shared by every request, so matching and pricing never has to copy rows,
+re-parse prices or re-read the CSV.
+"""
+import csv
+import hashlib
+import json
+import os
+from backend.utils.ngram_index import TrigramIndex
+from backend.utils.name_index import NameIndex
+from backend.utils.retrieval import BM25Retriever
+
+
+def normalize_id(artikel_id) -> str:
+    """Normalize an article ID for lookups (trimmed, upper case)."""
+    return str(artikel_id if artikel_id is not None else '').strip().upper()
+
+
+# Fields that change without the assortment changing (mock stock is re-rolled per start)
+VOLATILE_FIELDS = ('lagerbestand',)
+# CSV columns never shown to the model (internal handling data)
+PROMPT_EXCLUDED_FIELDS = ('verbrauchsart', 'gefahrgut', 'gefahrengut', 'lagerort')
+# categories that go with most jobs (PPE, tools, consumables): retrieved prompt rows are
+# filled up with these after the hits' own categories
+STANDARD_CATEGORIES = ('PSA', 'Werkzeug', 'Handwerkzeug', 'Messwerkzeug', 'Kleinmaterial', 'Konsum', 'Reinigung')
+
+
+def catalog_version(rows: list, exclude: tuple = ()) -> str:
+    """Short content hash of the catalog rows; changes whenever any (non-excluded) field changes."""
+    if exclude:
+        rows = [{k: v for k, v in row.items() if k not in exclude} for row in rows]
+    payload = json.dumps(rows, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+
+class CatalogIndex:
+    """
+    Read-only index over a list of catalog rows (dicts as produced by parse_data).
+
+    Attributes:
+        rows: The catalog rows, in catalog order (used for prompts)
+        by_id: Normalized artikel_id -> row
+        prices: Normalized artikel_id -> unit price as float
+        keys: All normalized IDs, in catalog order
+        version: Content hash of the rows
+        assortment_version: Content hash ignoring VOLATILE_FIELDS (stock), for caching
+            model answers that only depend on what is sold, not on what is in stock
+        id_index: Fuzzy index over the IDs, for hallucinated/misspelled artikel_ids
+        name_index: Token index over artikelname/kategorie, for IDs that are not even close
+        retriever: BM25 over the descriptive fields, for picking prompt candidates
+    """
+
+    def __init__(self, rows: list):
+        self.rows = rows
+        self.by_id = {}
+        self.prices = {}
+
+        for row in rows:
+            key = normalize_id(row.get('artikel_id'))
+            if not key:
+                continue
+            try:
+                price = float(row.get('preis_eur') or 0)
+            except (TypeError, ValueError):
+                price = 0.0
+            self.by_id[key] = row
+            self.prices[key] = price
+
+        self.keys = list(self.by_id.keys())
+        self.version = catalog_version(rows)
+        self.assortment_version = catalog_version(rows, exclude=VOLATILE_FIELDS)
+        self.id_index = TrigramIndex(self.keys)
+        self.name_index = NameIndex(self.by_id, self.prices)
+        self.retriever = BM25Retriever(rows)
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def get(self, artikel_id):
+        """Return the row for `artikel_id` (exact, normalized match) or None."""
+        return self.by_id.get(normalize_id(artikel_id))
+
+    def closest_id(self, artikel_id, cutoff: float = 0.6):
+        """Normalized ID closest to `artikel_id` (difflib ratio >= cutoff) or None."""
+        return self.id_index.closest(normalize_id(artikel_id), cutoff=cutoff)
+
+    def match_name(self, name: str):
+        """Normalized ID of the best name match (token overlap, then cheapest) or None."""
+        return self.name_index.best(name)
+
+    def candidates(self, query: str, top_k: int = None) -> list:
+        """
+        Rows to show the model for `query`: the BM25 hits, filled up to `top_k` with the
+        other rows of the hits' categories, then STANDARD_CATEGORIES rows, then rows for
+        the hits' typical sites - a request names the product, not its sizes, nor the
+        PPE and tools that go with the job. Every row when `top_k` is unset/covers the
+        catalog or nothing matches lexically (e.g. English wording for a German catalog),
+        so retrieval never hides the whole catalog.
+        """
+        if not top_k or top_k >= len(self.rows):
+            return self.rows
+        hits = self.retriever.top_k(query, top_k)
+        if not hits:
+            return self.rows
+        if len(hits) == top_k:
+            return hits
+
+        rows, seen = list(hits), {id(row) for row in hits}
+        categories = {row.get('kategorie') for row in hits}
+        sites = {row.get('typische_baustelle') for row in hits}
+        fills = (
+            lambda row: row.get('kategorie') in categories,
+            lambda row: row.get('kategorie') in STANDARD_CATEGORIES,
+            lambda row: row.get('typische_baustelle') in sites,
+        )
+        for fits in fills:
+            for row in self.rows:
+                if len(rows) == top_k:
+                    return rows
+                if id(row) not in seen and fits(row):
+                    rows.append(row)
+                    seen.add(id(row))
+        return rows
+
+    @classmethod
+    def from_catalog(cls, catalog) -> "CatalogIndex":
+        """Return `catalog` unchanged if it already is an index, otherwise index the row list."""
+        if isinstance(catalog, cls):
+            return catalog
+        return cls(list(catalog or []))
+
+
+# (CSV path, dropped fields) -> (mtime, CatalogIndex); only re-read when the file changes
+_csv_index_cache = {}
+
+
+def load_catalog_csv(csv_path: str, drop_fields: tuple = ()) -> CatalogIndex:
+    """
+    Load and index a catalog CSV, memoized per file modification time.
+
+    Args:
+        csv_path: Catalog CSV
+        drop_fields: Columns removed from every row (e.g. PROMPT_EXCLUDED_FIELDS)
+
+    A missing file yields an empty index.
+    """
+    try:
+        mtime = os.path.getmtime(csv_path)
+    except OSError:
+        return CatalogIndex([])
+
+    cache_key = (csv_path, tuple(drop_fields))
+    cached = _csv_index_cache.get(cache_key)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    rows = []
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            try:
+                row['preis_eur'] = float(row.get('preis_eur') or 0)
+            except ValueError:
+                row['preis_eur'] = 0.0
+            for field in drop_fields:
+                row.pop(field, None)
+            rows.append(row)
+
+    index = CatalogIndex(rows)
+    _csv_index_cache[cache_key] = (mtime, index)
+    return index
@@ -0,0 +1,91 @@
+"""
+Per-request deadlines and cancellation of LLM work.
+
+An endpoint opens a CallScope (deadline from the client's X-Request-Timeout header)
+and cancels it when the client disconnects or the deadline passes. The scope travels
+with the call into its worker thread as a context variable; the governor and the
+streaming loop check it before and while talking to Claude, so abandoned requests
+stop holding queue slots, rate limit and connections.
+"""
+import contextvars
+import threading
+import time
+
+
+class RequestCancelled(Exception):
+    """The client went away; nobody is waiting for the result anymore."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's deadline passed before the LLM work finished."""
+
+
+class CallScope:
+    """
+    Deadline and cancellation flag of one request (thread-safe).
+
+    Args:
+        timeout: Seconds from now until the deadline (None = no deadline)
+    """
+
+    def __init__(self, timeout: float = None):
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def remaining(self):
+        """Seconds until the deadline (0 once passed), or None without a deadline."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self) -> None:
+        """Raise RequestCancelled / DeadlineExceeded if the work should stop."""
+        if self.cancelled:
+            raise RequestCancelled("Client disconnected")
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise DeadlineExceeded(f"Request deadline of {self.timeout:g}s exceeded")
+
+
+# Scope of the request the current LLM work belongs to; set by backend/main
+current_scope = contextvars.ContextVar('llm_call_scope', default=None)
+
+_stats_lock = threading.Lock()
+_stats = {"timed_out": 0, "disconnected": 0, "upstream_cancelled": 0, "aborted": 0}
+
+
+def record_cancellation(event: str) -> None:
+    """Count a timed_out / disconnected request or upstream_cancelled / aborted LLM work."""
+    with _stats_lock:
+        _stats[event] += 1
+
+
+def check_scope() -> None:
+    """CallScope.check() of the current scope, if any; counts the work it stops."""
+    scope = current_scope.get()
+    if scope is None:
+        return
+    try:
+        scope.check()
+    except (RequestCancelled, DeadlineExceeded):
+        record_cancellation("aborted")
+        raise
+
+
+def time_left():
+    """Seconds until the current scope's deadline, or None."""
+    scope = current_scope.get()
+    return scope.remaining() if scope is not None else None
+
+
+def cancellation_stats() -> dict:
+    """Timed-out and disconnected requests and the LLM work they stopped, for /metrics."""
+    with _stats_lock:
+        return dict(_stats)
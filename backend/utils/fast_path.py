@@ -0,0 +1,196 @@
+"""
+Deterministic no-LLM path for fully specified orders.
+
+Requests like "500 Schraube TX20 4x40", "2x Arbeitshandschuhe Gr.9" or
+"C019 x 10, zwei Rollen Malervlies" name every product unambiguously and say how
+many. They are resolved against the catalog index directly; anything vague,
+ambiguous or partly unparsed returns None and goes to Claude as before.
+"""
+import re
+import threading
+import time
+
+from backend.utils.catalog_index import CatalogIndex, normalize_id
+from backend.utils.name_index import tokenize
+from backend.utils.number_words import parse_number_words
+
+
+# unit word -> catalog einheit it implies (None: plain count, fits every einheit)
+UNITS = {
+    'x': None, '×': None, 'stk': None, 'stück': None, 'stueck': None, 'st': None,
+    'pcs': None, 'pc': None, 'piece': None, 'pieces': None, 'mal': None,
+    'paar': 'Paar', 'pair': 'Paar', 'pairs': 'Paar',
+    'rolle': 'Rolle', 'rollen': 'Rolle', 'roll': 'Rolle', 'rolls': 'Rolle',
+    'dose': 'Dose', 'dosen': 'Dose', 'can': 'Dose', 'cans': 'Dose',
+    'eimer': 'Eimer', 'bucket': 'Eimer', 'buckets': 'Eimer',
+    'flasche': 'Flasche', 'flaschen': 'Flasche', 'bottle': 'Flasche', 'bottles': 'Flasche',
+    'm': 'm', 'meter': 'm', 'metre': 'm', 'metres': 'm', 'meters': 'm',
+    'box': 'Box', 'boxen': 'Box', 'boxes': 'Box', 'packung': 'Box', 'packungen': 'Box',
+    'pack': 'Box', 'packs': 'Box', 'karton': 'Box', 'kartons': 'Box',
+}
+
+# words around an order line that carry no product information
+FILLER_WORDS = {
+    'ich', 'wir', 'brauche', 'brauchen', 'benötige', 'benötigen', 'bestelle', 'bestellen',
+    'bitte', 'noch', 'mal', 'gerne', 'danke', 'hätte', 'gern', 'von', 'der', 'die', 'das', 'den',
+    'i', 'we', 'need', 'want', 'order', 'please', 'thanks', 'of', 'the', 'some',
+}
+# articles that mean "one" at the start of a line ("ein Zollstock", "a Zollstock")
+ONE_WORDS = {'a', 'an', 'ein', 'eine', 'einen'}
+
+_SEGMENT_SPLIT_RE = re.compile(r"\s*(?:;|\n|,(?!\d)|(?<!\d),|\s\+\s|\s&\s|\bund\b|\band\b|\bsowie\b|\bplus\b)\s*", re.I)
+_QTY = r"\d{1,3}(?:\.\d{3})+|\d+|[a-zäöüß\-]+(?:\s+(?:hundert|hundred|tausend|thousand|dutzend|dozen))?"
+_UNIT = "|".join(sorted((re.escape(u) for u in UNITS), key=len, reverse=True))
+# "500 Schraube TX20 4x40", "2x Arbeitshandschuhe Gr.9", "zwei Rollen Malervlies"
+_QTY_FIRST_RE = re.compile(rf"^(?P<qty>{_QTY})\s*(?:(?P<unit>{_UNIT})\.?(?=\s)\s*)?(?P<ref>\S.*)$", re.I)
+# "C019 x 10", "Dübel 6mm: 200", "Malervlies 3 Rollen", "Bit TX20 5x"
+_QTY_LAST_RE = re.compile(
+    rf"^(?P<ref>.*?\S)(?:\s*[x×:]\s*(?P<qty1>{_QTY})(?:\s+(?P<unit1>{_UNIT}))?"
+    rf"|\s+(?P<qty2>{_QTY})\s*(?P<unit2>{_UNIT})\.?)$",
+    re.I,
+)
+_EDGE_PUNCT = " .!?-–:\"'()"
+
+_stats_lock = threading.Lock()
+_stats = {"attempts": 0, "hits": 0, "total_ms": 0.0, "hit_ms": 0.0, "max_ms": 0.0}
+
+
+def _strip_fillers(text: str) -> str:
+    words = text.strip(_EDGE_PUNCT).split()
+    while words and words[0].lower().strip(_EDGE_PUNCT) in FILLER_WORDS:
+        words.pop(0)
+    while words and words[-1].lower().strip(_EDGE_PUNCT) in FILLER_WORDS:
+        words.pop()
+    return " ".join(words).strip(_EDGE_PUNCT)
+
+
+def _quantity(text: str):
+    if text is None:
+        return None
+    text = text.strip()
+    if text.lower() in ONE_WORDS:
+        return 1
+    if re.fullmatch(r"\d{1,3}(?:\.\d{3})+|\d+", text):
+        return int(text.replace(".", ""))
+    return parse_number_words(text)
+
+
+def _split_line(line: str) -> list:
+    """Candidate (quantity, unit word, product reference) readings of one order line."""
+    readings = []
+    match = _QTY_FIRST_RE.match(line)
+    if match:
+        readings.append((_quantity(match.group('qty')), match.group('unit'), match.group('ref')))
+    match = _QTY_LAST_RE.match(line)
+    if match:
+        qty = match.group('qty1') or match.group('qty2')
+        unit = match.group('unit1') or match.group('unit2')
+        readings.append((_quantity(qty), unit, match.group('ref')))
+    return [(q, u, _strip_fillers(r)) for q, u, r in readings if q and q > 0]
+
+
+def _resolve(ref: str, index: CatalogIndex):
+    """Normalized artikel_id `ref` unambiguously names, or None."""
+    words = ref.split()
+    if not words:
+        return None
+
+    # by ID: "C019" or "C019 Arbeitshandschuhe Gr.9" (name must agree)
+    key = normalize_id(words[0])
+    if key in index.by_id:
+        rest = " ".join(words[1:])
+        if not rest or index.name_index.shares_tokens(rest, key):
+            return key
+        return None
+
+    # by name: exactly one product contains every token of the reference
+    name = " ".join(w for w in words if w.lower() not in FILLER_WORDS)
+    query = set(tokenize(name))
+    if not query:
+        return None
+    hits = index.name_index.search(name, limit=2, min_share=1.0)
+    full = [key for key, overlap in hits if overlap == len(query)]
+    if len(full) != 1:
+        return None  # nothing, or e.g. "Arbeitshandschuhe" without size: let Claude ask
+    return full[0]
+
+
+def match_order(text: str, catalog) -> dict:
+    """
+    Resolve a fully specified order without the LLM.
+
+    Every line/segment of `text` ("500 Schraube TX20 4x40, 2x Arbeitshandschuhe Gr.9")
+    must name exactly one catalog product (by artikel_id or unambiguous name) and a
+    quantity in a unit compatible with the product's einheit.
+
+    Returns:
+        {"materials": [[artikel_id, anzahl, artikelname], ...], "explanation": str},
+        or None if any part is missing, ambiguous or unparsed (low confidence)
+    """
+    index = CatalogIndex.from_catalog(catalog)
+    segments = [s for s in (_strip_fillers(p) for p in _SEGMENT_SPLIT_RE.split(str(text or ''))) if s]
+    if not segments:
+        return None
+
+    quantities = {}  # artikel_id -> anzahl, in order of first mention
+    for segment in segments:
+        resolved = None
+        for qty, unit, ref in _split_line(segment):
+            key = _resolve(ref, index)
+            if key is None:
+                continue
+            einheit = UNITS.get(unit.lower()) if unit else None
+            if einheit is not None and einheit.lower() != str(index.by_id[key].get('einheit', '')).lower():
+                # e.g. "2 Box Schrauben": pack size unknown, "3 Rollen" of a Stk item
+                continue
+            resolved = (key, qty)
+            break
+        if resolved is None:
+            return None
+        key, qty = resolved
+        quantities[key] = quantities.get(key, 0) + qty
+
+    materials = [[index.by_id[k].get('artikel_id', k), q, index.by_id[k].get('artikelname', '')]
+                 for k, q in quantities.items()]
+    listed = ", ".join(f"{q} × {name} ({artikel_id})" for artikel_id, q, name in materials)
+    return {
+        "materials": materials,
+        "explanation": f"Fully specified request, taken directly from the catalog: {listed}",
+    }
+
+
+def try_fast_path(text: str, catalog) -> tuple:
+    """
+    match_order() with hit-rate and latency accounting.
+
+    Returns:
+        (selection or None, {"fast_path": "hit" | "miss", "fast_path_ms": float})
+    """
+    start = time.perf_counter()
+    selection = match_order(text, catalog)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    with _stats_lock:
+        _stats["attempts"] += 1
+        _stats["total_ms"] += elapsed_ms
+        _stats["max_ms"] = max(_stats["max_ms"], elapsed_ms)
+        if selection is not None:
+            _stats["hits"] += 1
+            _stats["hit_ms"] += elapsed_ms
+
+    return selection, {"fast_path": "hit" if selection is not None else "miss",
+                       "fast_path_ms": round(elapsed_ms, 3)}
+
+
+def fast_path_stats() -> dict:
+    """Fast-path hit rate and parse latency for /metrics."""
+    with _stats_lock:
+        attempts, hits = _stats["attempts"], _stats["hits"]
+        return {
+            "attempts": attempts,
+            "hits": hits,
+            "hit_rate": round(hits / attempts, 3) if attempts else 0.0,
+            "avg_ms": round(_stats["total_ms"] / attempts, 3) if attempts else 0.0,
+            "avg_hit_ms": round(_stats["hit_ms"] / hits, 3) if hits else 0.0,
+            "max_ms": round(_stats["max_ms"], 3),
+        }
@@ -0,0 +1,197 @@
+"""
+Perceptual-hash cache of first-turn image analyses.
+
+Foremen photograph the same handwritten list or bin of parts twice: a retry, a second
+device, a slightly different angle. The bytes differ, so the content-addressed
+image_store does not recognise the photo, but its dHash barely changes: the signs of
+horizontal brightness gradients on a 17x16 grayscale thumbnail (256 bits) of the
+image trimmed to its dark content, so framing a sheet of paper a little differently
+does not shift the grid. Re-encoding, exposure and preprocessing flip a few bits, small
+crops and tilts up to about 50; different handwritten lists of the same layout differ in
+70 or more. But the same list with one quantity or one line rewritten differs in as few
+bits as a re-encoded photo (see bench_image_cache), and reusing its analysis would order
+the wrong thing. So a hash match is confirmed on a 128x128 thumbnail of the same trimmed
+image: no 8x8 block of it may differ by more than `max_block_diff` gray levels on
+average. Re-encoded and re-exposed photos pass; crops and tilts, which shift every
+block like a rewritten line does, are analysed again.
+
+An opening /analyze_image turn whose image passes both checks against an earlier one
+(same opening text and catalog assortment) reuses that analysis - the transcription or
+identification, or the selection, re-priced from the live catalog - instead of a vision
+call.
+
+Lookups scan the entries (an XOR and a popcount each): about half a millisecond per
+thousand entries, plus a couple of milliseconds per hash match for the thumbnails, next
+to the seconds of a vision call. The thumbnails take 16 KB per entry.
+"""
+import io
+import threading
+import time
+from collections import OrderedDict
+
+from backend.utils.response_cache import make_key
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional dependency (pip install Pillow): no hashes, no hits
+    Image = ImageOps = None
+
+
+HASH_SIZE = 16
+# side of the thumbnail a hash match is confirmed on, and of the blocks compared
+DETAIL_SIZE = 128
+DETAIL_BLOCK = 8
+# thumbnail pixels darker than this (after stretching the contrast) are content for trimming
+CONTENT_THRESHOLD = 128
+# images whose aspect ratios differ by more than this are never the same photo
+MAX_ASPECT_DIFF = 0.1
+
+
+def perceptual_hash(data: bytes):
+    """
+    (256-bit dHash, aspect ratio, DETAIL_SIZE² grayscale thumbnail) of an image, or None
+    without Pillow or if it cannot be read.
+    """
+    if Image is None:
+        return None
+    try:
+        img = Image.open(io.BytesIO(data))
+        # a JPEG decodes at 1/8 scale: the thumbnail needs no more
+        img.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+        img = ImageOps.exif_transpose(img)
+        aspect = img.width / img.height
+        img = ImageOps.autocontrast(img.convert("L"), cutoff=1)
+        content = img.point(lambda p: 255 if p < CONTENT_THRESHOLD else 0).getbbox()
+        if content:
+            img = img.crop(content)
+        pixels = img.resize((HASH_SIZE + 1, HASH_SIZE), Image.BOX).tobytes()
+        detail = img.resize((DETAIL_SIZE, DETAIL_SIZE), Image.BOX).tobytes()
+    except Exception:
+        return None  # not an image Pillow reads: no reuse, the vision call decides
+    bits = 0
+    for row in range(HASH_SIZE):
+        start = row * (HASH_SIZE + 1)
+        for col in range(start, start + HASH_SIZE):
+            bits = (bits << 1) | (pixels[col] > pixels[col + 1])
+    return bits, aspect, detail
+
+
+_popcount = getattr(int, "bit_count", None) or (lambda value: bin(value).count("1"))  # int.bit_count: 3.10+
+
+
+def hamming(a: int, b: int) -> int:
+    return _popcount(a ^ b)
+
+
+def block_diff(a: bytes, b: bytes) -> float:
+    """Largest mean absolute difference of a DETAIL_BLOCK² block between two thumbnails."""
+    worst = 0
+    for top in range(0, DETAIL_SIZE, DETAIL_BLOCK):
+        for left in range(0, DETAIL_SIZE, DETAIL_BLOCK):
+            total = 0
+            for row in range(top * DETAIL_SIZE + left, (top + DETAIL_BLOCK) * DETAIL_SIZE + left, DETAIL_SIZE):
+                total += sum(abs(x - y) for x, y in zip(a[row:row + DETAIL_BLOCK], b[row:row + DETAIL_BLOCK]))
+            worst = max(worst, total)
+    return worst / (DETAIL_BLOCK * DETAIL_BLOCK)
+
+
+class ImageAnalysisCache:
+    """
+    LRU + TTL cache of first-turn image analyses, looked up by perceptual hash.
+
+    Thread-safe: agent functions run in worker threads.
+
+    Args:
+        max_entries: Capacity (least recently used analyses are evicted)
+        ttl_seconds: Lifetime of an analysis
+        max_distance: Largest Hamming distance (of 256 bits) still treated as the same image
+        max_block_diff: Largest block difference (see block_diff) of the thumbnails of a
+            hash match still treated as the same image
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 24 * 3600, max_distance: int = 24,
+                 max_block_diff: float = 20):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_distance = max_distance
+        self.max_block_diff = max_block_diff
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (prompt key, hash) -> (expires_at, aspect, thumbnail, value)
+        self._stats = {"hits": 0, "exact_hits": 0, "near_hits": 0, "misses": 0, "unhashable": 0,
+                       "rejected": 0, "stores": 0, "evictions": 0, "distance_total": 0}
+
+    @staticmethod
+    def prompt_key(prompt: str, catalog_version: str, *variant) -> str:
+        """What besides the image an analysis depends on: the opening text, catalog assortment and options."""
+        return make_key(prompt, catalog_version, *variant)
+
+    def get(self, image_hash, prompt_key: str):
+        """
+        (value, distance) of the closest cached analysis within max_distance whose thumbnail
+        is within max_block_diff, or None.
+
+        Args:
+            image_hash: perceptual_hash() of the image (None counts as unhashable)
+            prompt_key: See prompt_key()
+        """
+        if image_hash is None:
+            with self._lock:
+                self._stats["unhashable"] += 1
+            return None
+        bits, aspect, detail = image_hash
+        now = time.time()
+        with self._lock:
+            best, best_distance = None, self.max_distance + 1
+            expired, rejected = [], False
+            for key, (expires_at, cached_aspect, cached_detail, _) in self._entries.items():
+                if expires_at <= now:
+                    expired.append(key)
+                    continue
+                if key[0] != prompt_key or abs(cached_aspect - aspect) > MAX_ASPECT_DIFF * aspect:
+                    continue
+                distance = hamming(key[1], bits)
+                if distance < best_distance:
+                    if block_diff(cached_detail, detail) > self.max_block_diff:
+                        rejected = True  # same layout, different content: a near miss
+                        continue
+                    best, best_distance = key, distance
+                    if distance == 0:
+                        break
+            for key in expired:
+                del self._entries[key]
+
+            if best is None:
+                self._stats["misses"] += 1
+                self._stats["rejected"] += rejected
+                return None
+            self._entries.move_to_end(best)
+            self._stats["hits"] += 1
+            self._stats["exact_hits" if best_distance == 0 else "near_hits"] += 1
+            self._stats["distance_total"] += best_distance
+            return self._entries[best][3], best_distance
+
+    def set(self, image_hash, prompt_key: str, value) -> None:
+        if image_hash is None:
+            return
+        bits, aspect, detail = image_hash
+        with self._lock:
+            key = (prompt_key, bits)
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + self.ttl_seconds, aspect, detail, value)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def stats(self) -> dict:
+        """Hit/miss counts, hit ratio and size for /metrics."""
+        with self._lock:
+            hits = self._stats["hits"]
+            lookups = hits + self._stats["misses"]
+            return {
+                **{k: v for k, v in self._stats.items() if k != "distance_total"},
+                "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+                "avg_hit_distance": round(self._stats["distance_total"] / hits, 2) if hits else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
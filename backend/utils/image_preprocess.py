@@ -0,0 +1,260 @@
+"""
+Preprocessing of uploaded images before they are stored and sent to Claude.
+
+Phone photos arrive as 12 MP JPEGs of several MB, yet Claude downscales any image
+whose long edge exceeds 1568 px before looking at it: the extra pixels only cost
+upload time, request size and latency. prepare_image() therefore
+- applies the EXIF orientation (phones store portrait shots rotated plus a tag),
+- resizes to a long edge of `max_long_edge`,
+- re-encodes as JPEG (or WebP), lowering the quality and then the size until the
+  result fits `max_bytes`,
+- for handwritten lists and printed documents ("document" mode, detected in "auto"
+  mode from low colour saturation on a light background) converts to grayscale and
+  stretches the contrast, which keeps faint pencil legible at a fraction of the bytes.
+
+Images that already fit (small, upright, within budget, not documents) are kept as
+uploaded. Decoding and encoding are CPU-bound and hold the GIL, so ImagePreprocessor
+runs them in a process pool. Pillow is optional: without it images are kept as uploaded.
+"""
+import io
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    from PIL import Image, ImageOps, ImageStat
+except ImportError:  # optional dependency (pip install Pillow)
+    Image = ImageOps = ImageStat = None
+
+
+# Claude downscales images above this long edge anyway
+MAX_LONG_EDGE = 1568
+# byte budget of a re-encoded image
+MAX_BYTES = 400 * 1024
+# qualities tried in order until the image fits the byte budget; then it is scaled down
+QUALITIES = (85, 75, 65, 55)
+DOWNSCALE_STEP = 0.75
+MIN_LONG_EDGE = 512
+# "auto" treats an image as a document below this mean saturation and above this mean
+# brightness (0-255, measured on a thumbnail)
+DOCUMENT_MAX_SATURATION = 40
+DOCUMENT_MIN_BRIGHTNESS = 140
+
+MODES = ("auto", "photo", "document", "off")
+OUTPUT_FORMATS = {"jpeg": "image/jpeg", "webp": "image/webp"}
+_EXIF_ORIENTATION = 0x0112
+
+PreparedImage = namedtuple("PreparedImage", ["data", "media_type", "width", "height", "mode", "changed"])
+
+
+def _looks_like_document(img) -> bool:
+    thumb = img.convert("RGB").resize((64, 64)).convert("HSV")
+    saturation, brightness = ImageStat.Stat(thumb).mean[1:]
+    return saturation < DOCUMENT_MAX_SATURATION and brightness > DOCUMENT_MIN_BRIGHTNESS
+
+
+def _flatten(img):
+    """RGB (or L) image without transparency, composited on white."""
+    if img.mode in ("RGB", "L"):
+        return img
+    if img.mode in ("RGBA", "LA", "P", "PA") or "transparency" in img.info:
+        rgba = img.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def _scaled(img, long_edge: int):
+    if max(img.size) <= long_edge:
+        return img
+    ratio = long_edge / max(img.size)
+    size = (max(1, round(img.width * ratio)), max(1, round(img.height * ratio)))
+    return img.resize(size, Image.LANCZOS)
+
+
+def _encode(img, output_format: str, max_bytes: int):
+    """(bytes, image) of `img` re-encoded within `max_bytes`, or as small as MIN_LONG_EDGE allows."""
+    while True:
+        for quality in QUALITIES:
+            buffer = io.BytesIO()
+            if output_format == "webp":
+                img.save(buffer, "WEBP", quality=quality, method=4)
+            else:
+                img.save(buffer, "JPEG", quality=quality, optimize=True)
+            if buffer.tell() <= max_bytes:
+                return buffer.getvalue(), img
+        long_edge = int(max(img.size) * DOWNSCALE_STEP)
+        if long_edge < MIN_LONG_EDGE:
+            return buffer.getvalue(), img
+        img = _scaled(img, long_edge)
+
+
+def prepare_image(data: bytes, media_type: str, mode: str = "auto", max_long_edge: int = MAX_LONG_EDGE,
+                  max_bytes: int = MAX_BYTES, output_format: str = "jpeg") -> PreparedImage:
+    """
+    Orient, downscale and re-encode an image for a vision call.
+
+    Args:
+        data: The uploaded image
+        media_type: Its media type
+        mode: "auto", "photo", "document" (grayscale, stretched contrast) or "off"
+        max_long_edge: Long edge in pixels of the result
+        max_bytes: Byte budget of a re-encoded result
+        output_format: "jpeg" or "webp"
+
+    Returns:
+        PreparedImage (the upload itself with changed=False if it needed nothing)
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown image mode {mode!r} (use one of {', '.join(MODES)})")
+    if Image is None or mode == "off":
+        return PreparedImage(data, media_type, None, None, "off", False)
+
+    img = Image.open(io.BytesIO(data))
+    if img.format == "JPEG":
+        # decode at a reduced scale (DCT scaling) instead of the full 12 MP
+        ratio = min(1.0, max_long_edge / max(img.size))
+        img.draft("RGB", (round(img.width * ratio), round(img.height * ratio)))
+    rotated = img.getexif().get(_EXIF_ORIENTATION, 1) != 1
+    if mode == "auto":
+        mode = "document" if _looks_like_document(img) else "photo"
+
+    fits = not rotated and max(img.size) <= max_long_edge and len(data) <= max_bytes
+    if fits and mode == "photo":
+        return PreparedImage(data, media_type, img.width, img.height, mode, False)
+
+    img = _scaled(ImageOps.exif_transpose(img), max_long_edge)
+    if mode == "document":
+        img = ImageOps.autocontrast(ImageOps.grayscale(_flatten(img)), cutoff=1)
+    else:
+        img = _flatten(img)
+    encoded, img = _encode(img, output_format, max_bytes)
+    if fits and len(encoded) >= len(data):
+        # e.g. a small scan already stored as a compact PNG
+        return PreparedImage(data, media_type, img.width, img.height, mode, False)
+    return PreparedImage(encoded, OUTPUT_FORMATS[output_format], img.width, img.height, mode, True)
+
+
+class ImagePreprocessor:
+    """
+    Runs prepare_image() in a process pool, keeping the event loop and the GIL free.
+
+    A failing image is kept as uploaded (and counted), so preprocessing never fails a
+    request; Claude still rejects what is not an image.
+
+    Args:
+        max_workers: Worker processes (0 = prepare in the calling thread)
+        mode: Default mode for submit()
+        max_long_edge, max_bytes, output_format: See prepare_image()
+    """
+
+    def __init__(self, max_workers: int = 2, mode: str = "auto", max_long_edge: int = MAX_LONG_EDGE,
+                 max_bytes: int = MAX_BYTES, output_format: str = "jpeg"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown image mode {mode!r} (use one of {', '.join(MODES)})")
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format {output_format!r} (use one of {', '.join(OUTPUT_FORMATS)})")
+        self.max_workers = max_workers
+        self.mode = mode
+        self.max_long_edge = max_long_edge
+        self.max_bytes = max_bytes
+        self.output_format = output_format
+        self._lock = threading.Lock()
+        self._pool = None
+        self._stats = {"images": 0, "changed": 0, "documents": 0, "failed": 0, "bytes_in": 0, "bytes_out": 0,
+                       "total_ms": 0.0, "max_ms": 0.0}
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    def _reset_pool(self, pool: ProcessPoolExecutor) -> None:
+        # a worker died (e.g. killed for memory): the next image starts a fresh pool
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
+
+    def submit(self, data: bytes, media_type: str, mode: str = None) -> Future:
+        """
+        Prepare an image in the pool.
+
+        Returns:
+            concurrent.futures.Future of a PreparedImage (asyncio.wrap_future() to await it)
+        """
+        mode = mode or self.mode
+        if mode not in MODES:
+            raise ValueError(f"Unknown image mode {mode!r} (use one of {', '.join(MODES)})")
+        start = time.perf_counter()
+        args = (data, media_type, mode, self.max_long_edge, self.max_bytes, self.output_format)
+        result = Future()
+        pool = None
+
+        if Image is None or mode == "off" or self.max_workers <= 0:
+            work = Future()
+            try:
+                work.set_result(prepare_image(*args))
+            except Exception as e:
+                work.set_exception(e)
+        else:
+            pool = self._get_pool()
+            try:
+                work = pool.submit(prepare_image, *args)
+            except BrokenProcessPool:
+                self._reset_pool(pool)
+                work = self._get_pool().submit(prepare_image, *args)
+
+        def finish(work: Future) -> None:
+            try:
+                prepared = work.result()
+                failed = False
+            except Exception as e:
+                print(f"Image preprocessing failed, keeping the upload: {type(e).__name__}: {e}")
+                if isinstance(e, BrokenProcessPool) and pool is not None:
+                    self._reset_pool(pool)
+                prepared = PreparedImage(data, media_type, None, None, mode, False)
+                failed = True
+            self._record(len(data), prepared, (time.perf_counter() - start) * 1000, failed)
+            result.set_result(prepared)
+
+        work.add_done_callback(finish)
+        return result
+
+    def prepare(self, data: bytes, media_type: str, mode: str = None) -> PreparedImage:
+        """Blocking submit()."""
+        return self.submit(data, media_type, mode).result()
+
+    def _record(self, bytes_in: int, prepared: PreparedImage, elapsed_ms: float, failed: bool) -> None:
+        with self._lock:
+            self._stats["images"] += 1
+            self._stats["changed"] += prepared.changed
+            self._stats["documents"] += prepared.mode == "document"
+            self._stats["failed"] += failed
+            self._stats["bytes_in"] += bytes_in
+            self._stats["bytes_out"] += len(prepared.data)
+            self._stats["total_ms"] += elapsed_ms
+            self._stats["max_ms"] = max(self._stats["max_ms"], elapsed_ms)
+
+    def stats(self) -> dict:
+        """Images processed, bytes saved and processing time for /metrics."""
+        with self._lock:
+            images, bytes_in = self._stats["images"], self._stats["bytes_in"]
+            return {
+                **{k: v for k, v in self._stats.items() if k not in ("total_ms", "max_ms")},
+                "bytes_saved": bytes_in - self._stats["bytes_out"],
+                "saved_ratio": round(1 - self._stats["bytes_out"] / bytes_in, 3) if bytes_in else 0.0,
+                "avg_ms": round(self._stats["total_ms"] / images, 2) if images else 0.0,
+                "max_ms": round(self._stats["max_ms"], 2),
+                "pillow": Image is not None,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
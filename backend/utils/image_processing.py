@@ -1,14 +1,44 @@
 import json
 import base64
+import time
 from pathlib import Path
-import anthropic
-import csv
-import yaml
-import request_agent as ra 
+from backend.utils import request_agent as ra
+from backend.utils.catalog_index import PROMPT_EXCLUDED_FIELDS, CatalogIndex, load_catalog_csv
+from backend.utils.llm_client import get_client
+from backend.utils.image_preprocess import prepare_image
 
 
-with open("secrets.yaml", "r", encoding="utf-8") as f:
-    secrets = yaml.safe_load(f)
+# "fused": one vision call sees the image and the catalog rows and answers with the materials;
+# "two_stage": a catalog-blind description of the image, then a procurement call on that text
+IMAGE_ORDER_MODES = ("fused", "two_stage")
+# catalog rows retrieved for the site context in fused mode (as PROMPT_TOP_K in main)
+FUSED_TOP_K = 40
+
+# opening message of a fused call: the result goes straight into an order, nobody answers questions
+FUSED_IMAGE_PROMPT = """Identify the construction site items in the FOCUS of this photo that need to be ordered.
+Respond with ONLY the JSON object of catalog materials and quantities: order only what is depicted
+or clearly needed for it, LESS is MORE. Do not ask questions: make reasonable choices."""
+
+
+def _read_image(image_path: str) -> tuple:
+    """(media type, base64) of an image file, oriented, downscaled and re-encoded for a vision call."""
+    with open(image_path, "rb") as image_file:
+        raw_image = image_file.read()
+
+    # Determine media type from file extension
+    extension = Path(image_path).suffix.lower()
+    media_types = {
+        '.jpg': 'image/jpeg',
+        '.jpeg': 'image/jpeg',
+        '.png': 'image/png',
+        '.gif': 'image/gif',
+        '.webp': 'image/webp'
+    }
+    media_type = media_types.get(extension, 'image/jpeg')
+
+    # Orient, downscale and re-encode before sending (kept as is without Pillow)
+    prepared = prepare_image(raw_image, media_type)
+    return prepared.media_type, base64.standard_b64encode(prepared.data).decode("utf-8")
 
 
 def describe_construction_site_image(image_path: str, additional_context: str = "") -> dict:
@@ -24,24 +54,11 @@ def describe_construction_site_image(image_path: str, additional_context: str =
         dict with 'description', 'tasks_identified', 'materials_needed', 'safety_concerns'
     """
     
-    # Resolve Anthropic API key
-    api_key = secrets.get('API_KEY')
-    client = anthropic.Anthropic(api_key=api_key)
+    # Shared, pooled client (API key from secrets.yaml)
+    client = get_client()
     
-    # Read and encode the image
-    with open(image_path, "rb") as image_file:
-        image_data = base64.standard_b64encode(image_file.read()).decode("utf-8")
-    
-    # Determine media type from file extension
-    extension = Path(image_path).suffix.lower()
-    media_types = {
-        '.jpg': 'image/jpeg',
-        '.jpeg': 'image/jpeg',
-        '.png': 'image/png',
-        '.gif': 'image/gif',
-        '.webp': 'image/webp'
-    }
-    media_type = media_types.get(extension, 'image/jpeg')
+    # Read the image
+    media_type, image_data = _read_image(image_path)
     
     # Build context string
     context_part = f"\n\nAdditional site context: {additional_context}" if additional_context else ""
@@ -102,49 +119,86 @@ def describe_construction_site_image(image_path: str, additional_context: str =
     return response_text.strip()
 
 
-def send_description_to_request_agent(description: str, catalog_path: str = 'backend/data/sample.csv') -> dict:
+def prompt_catalog(catalog_path: str = 'backend/data/sample.csv') -> CatalogIndex:
+    """The catalog both modes show the model: the CSV without PROMPT_EXCLUDED_FIELDS, read once per file version."""
+    return load_catalog_csv(catalog_path, drop_fields=PROMPT_EXCLUDED_FIELDS)
+
+
+def send_description_to_request_agent(description: str, catalog_path: str = 'backend/data/sample.csv',
+                                      catalog_format: str = 'json_pretty') -> dict:
     """
     Send a plain description string into the request agent and return the detailed JSON result.
 
-    - Loads the catalog from `catalog_path` (CSV) if present and strips unwanted fields.
+    - Uses prompt_catalog(catalog_path) (empty if the CSV is missing).
     - Calls `process_procurement_request` from `backend.utils.request_agent`.
 
     Returns the dict result returned by the request agent (detailed JSON).
     """
+    return ra.process_procurement_request(foreman_message=description, c_materials_data=prompt_catalog(catalog_path),
+                                          catalog_format=catalog_format)
 
-    # load catalog
-    catalog = []
-    try:
-        with open(catalog_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row.get('preis_eur'):
-                    try:
-                        row['preis_eur'] = float(row['preis_eur'])
-                    except Exception:
-                        pass
-                for _k in ('verbrauchsart', 'gefahrgut', 'gefahrengut', 'lagerort'):
-                    row.pop(_k, None)
-                catalog.append(row)
-    except FileNotFoundError:
-        catalog = []
-
-    # import process function from request agent (relative if possible
-
-    return ra.process_procurement_request(foreman_message=description, c_materials_data=catalog)
-
-
-# Example usage
+
+def image_to_order(image_path: str, additional_context: str = "", mode: str = "fused",
+                   catalog_path: str = 'backend/data/sample.csv', top_k: int = FUSED_TOP_K,
+                   catalog_format: str = 'auto') -> dict:
+    """
+    Materials to order for a construction site photo.
+
+    - "fused": one vision call with the image and the catalog rows retrieved for
+      `additional_context` (the whole catalog without context, or when nothing matches);
+      the model answers with the materials JSON directly.
+    - "two_stage": describe_construction_site_image, then send_description_to_request_agent
+      (two calls, the second with the whole catalog), kept for comparison.
+
+    Both modes show the model the same prompt_catalog() rows in the same catalog_format.
+
+    Args:
+        image_path: Path to the image file
+        additional_context: Optional context about the site/task, also the retrieval query
+        mode: One of IMAGE_ORDER_MODES
+        catalog_path: Catalog CSV
+        top_k: Catalog rows retrieved in fused mode (None = whole catalog)
+        catalog_format: Prompt serialization of the catalog (see PROMPT_SERIALIZERS)
+
+    Returns:
+        dict with 'explanation', 'total', 'requireApproval', 'items' and 'meta' (with 'mode',
+        'calls' and 'seconds'; two_stage adds the 'description')
+    """
+    if mode not in IMAGE_ORDER_MODES:
+        raise ValueError(f"Unknown mode {mode!r} (use one of {', '.join(IMAGE_ORDER_MODES)})")
+    start = time.perf_counter()
+
+    if mode == "two_stage":
+        description = describe_construction_site_image(image_path, additional_context)
+        result = send_description_to_request_agent(description, catalog_path, catalog_format)
+        result['meta'] = dict(result.get('meta') or {}, mode=mode, calls=2, description=description,
+                              seconds=round(time.perf_counter() - start, 3))
+        return result
+
+    media_type, image_data = _read_image(image_path)
+    prompt = f"{FUSED_IMAGE_PROMPT}\n\nAdditional site context: {additional_context}" if additional_context else FUSED_IMAGE_PROMPT
+    result = ra.analyze_image_request(
+        image_data,
+        media_type,
+        [{"role": "user", "content": prompt}],
+        prompt_catalog(catalog_path),
+        top_k=top_k,
+        catalog_format=catalog_format
+    )
+    if result['type'] != 'recommendations':
+        # the prompt has no question channel: a question or an error is no order
+        raise ValueError(f"Expected materials, image analysis returned {result['type']}: {str(result['content'])[:200]!r}")
+    return {**result['content'], 'meta': dict(result['meta'], mode=mode, calls=1,
+                                             seconds=round(time.perf_counter() - start, 3))}
+
+
+# Example usage (run from the project root: python -m backend.utils.image_processing)
 if __name__ == "__main__":
     # Analyze a construction site image
     image_path = "testFiles/image3.png"
     
-    # Get a simple foreman-style description string
-    description = describe_construction_site_image(
-        image_path=image_path,
-        additional_context=""
-    )
+    # One call: the image and the catalog, materials back
+    print(image_to_order(image_path, mode="fused"))
 
-    # Output only a simple string
-    print(description)
-    print(send_description_to_request_agent(description))
\ No newline at end of file
+    # For comparison: a foreman-style description string, then a procurement call on it
+    print(image_to_order(image_path, mode="two_stage"))
\ No newline at end of file
@@ -0,0 +1,255 @@
+"""
+Content-addressed store for uploaded images.
+
+A photo is uploaded once (POST /images) and referenced by its SHA-256 afterwards,
+so follow-up /analyze_image turns carry only text. Images live in a byte-bounded
+in-memory LRU; the least recently used ones spill to a directory on disk (itself
+bounded) and are promoted back into memory on their next use. Files are written,
+read and removed outside the store's lock, so one cold image does not hold up
+other lookups and uploads.
+
+The image_id is the hash of the upload; what is stored under it may be the
+preprocessed version (see image_preprocess), so re-uploading the same photo is
+recognised without preprocessing it again.
+"""
+import base64
+import binascii
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+
+# media types Claude accepts for images, and the file extension used when spilled
+MEDIA_TYPES = {'image/jpeg': 'jpg', 'image/png': 'png', 'image/gif': 'gif', 'image/webp': 'webp'}
+_EXTENSIONS = {ext: media_type for media_type, ext in MEDIA_TYPES.items()}
+# media types browsers and upload widgets send for the same formats
+_MEDIA_TYPE_ALIASES = {'image/jpg': 'image/jpeg', 'image/pjpeg': 'image/jpeg', 'image/x-png': 'image/png'}
+_IMAGE_ID_RE = re.compile(r"[0-9a-f]{64}")
+
+
+class ImageTooLarge(ValueError):
+    """An upload above the store's per-image limit."""
+
+
+def image_id_for(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def decode_base64_image(image_base64: str) -> bytes:
+    """Raw bytes of a base64 upload (a data: URL prefix is accepted); ValueError if not base64."""
+    text = image_base64 or ""
+    if text.startswith("data:") and "," in text:
+        text = text.split(",", 1)[1]
+    try:
+        return base64.b64decode(text, validate=True)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"image_base64 is not valid base64: {e}")
+
+
+class ImageStore:
+    """
+    Byte-bounded LRU of images keyed by SHA-256, spilling evicted images to disk.
+
+    Thread-safe: analysis runs in worker threads.
+
+    Args:
+        max_memory_bytes: Bytes of image data kept in memory
+        spill_dir: Directory for images evicted from memory, or None to drop them
+        max_disk_bytes: Bytes of image data kept in spill_dir (oldest files removed first)
+        max_image_bytes: Largest accepted image (ImageTooLarge above it)
+    """
+
+    def __init__(self, max_memory_bytes: int = 256 * 1024 * 1024, spill_dir: str = None,
+                 max_disk_bytes: int = 2 * 1024 * 1024 * 1024, max_image_bytes: int = 20 * 1024 * 1024):
+        self.max_memory_bytes = max_memory_bytes
+        self.spill_dir = spill_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.max_image_bytes = max_image_bytes
+        self._lock = threading.Lock()
+        self._images = OrderedDict()  # image_id -> (media_type, bytes)
+        self._memory_bytes = 0
+        self._spilling = {}           # image_id -> (media_type, bytes), evicted and being written
+        self._disk = OrderedDict()    # image_id -> (path, size), oldest spill first
+        self._disk_bytes = 0
+        self._stats = {"uploads": 0, "deduplicated": 0, "hits": 0, "disk_hits": 0, "misses": 0,
+                       "spilled": 0, "dropped": 0}
+
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            # spilled images of a previous run are still valid: content-addressed
+            files = sorted((e for e in os.scandir(spill_dir) if e.is_file()), key=lambda e: e.stat().st_mtime)
+            for entry in files:
+                image_id, _, ext = entry.name.partition('.')
+                if _IMAGE_ID_RE.fullmatch(image_id) and ext in _EXTENSIONS:
+                    self._disk[image_id] = (entry.path, entry.stat().st_size)
+                    self._disk_bytes += entry.stat().st_size
+            self._remove_files(self._trim_disk())
+
+    def validate(self, data: bytes, media_type: str) -> str:
+        """Canonical media type of an upload; ImageTooLarge or ValueError if it cannot be stored."""
+        if len(data) > self.max_image_bytes:
+            raise ImageTooLarge(f"Image of {len(data)} bytes exceeds the limit of {self.max_image_bytes} bytes")
+        media_type = _MEDIA_TYPE_ALIASES.get(media_type, media_type)
+        if media_type not in MEDIA_TYPES:
+            raise ValueError(f"Unsupported media type {media_type!r} (use one of {', '.join(MEDIA_TYPES)})")
+        return media_type
+
+    def has(self, image_id: str) -> bool:
+        with self._lock:
+            return self._stored(image_id)
+
+    def _stored(self, image_id: str) -> bool:
+        return image_id in self._images or image_id in self._spilling or image_id in self._disk
+
+    def put(self, data: bytes, media_type: str, image_id: str = None) -> tuple:
+        """
+        Store an image.
+
+        Args:
+            data: The image
+            media_type: Its media type
+            image_id: Hash of the upload `data` was prepared from (default: hash of `data`)
+
+        Returns:
+            (image_id, deduplicated): the SHA-256 hex digest, and whether it was stored already
+        """
+        media_type = self.validate(data, media_type)
+        image_id = image_id or image_id_for(data)
+        with self._lock:
+            self._stats["uploads"] += 1
+            if self._stored(image_id):
+                self._stats["deduplicated"] += 1
+                if image_id in self._images:
+                    self._images.move_to_end(image_id)
+                return image_id, True
+            evicted = self._store_memory(image_id, media_type, data)
+        self._spill(evicted)
+        return image_id, False
+
+    def get(self, image_id: str):
+        """(media_type, bytes) of a stored image, or None if unknown or dropped."""
+        with self._lock:
+            entry = self._images.get(image_id)
+            if entry is not None:
+                self._images.move_to_end(image_id)
+            else:
+                entry = self._spilling.get(image_id)
+            if entry is not None:
+                self._stats["hits"] += 1
+                return entry
+            spilled = self._disk.get(image_id)
+            if spilled is None:
+                self._stats["misses"] += 1
+                return None
+
+        path, size = spilled
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            data = None
+
+        with self._lock:
+            entry = self._images.get(image_id) or self._spilling.get(image_id)
+            if entry is not None:
+                # promoted by a concurrent lookup meanwhile
+                self._stats["hits"] += 1
+                return entry
+            if data is None or len(data) != size:
+                self._stats["misses"] += 1
+                return None
+            removed = []
+            if self._disk.get(image_id) == spilled:
+                del self._disk[image_id]
+                self._disk_bytes -= size
+                removed.append(path)
+            media_type = _EXTENSIONS[path.rsplit('.', 1)[1]]
+            # promote: the image is in use again (a follow-up turn)
+            evicted = self._store_memory(image_id, media_type, data)
+            self._stats["hits"] += 1
+            self._stats["disk_hits"] += 1
+        self._remove_files(removed)
+        self._spill(evicted)
+        return media_type, data
+
+    def get_base64(self, image_id: str):
+        """(media_type, base64 text) of a stored image for the messages API, or None."""
+        entry = self.get(image_id)
+        if entry is None:
+            return None
+        media_type, data = entry
+        return media_type, base64.b64encode(data).decode('ascii')
+
+    def _store_memory(self, image_id: str, media_type: str, data: bytes) -> list:
+        """Add an image to memory (under the lock); returns the evicted image_ids for _spill()."""
+        self._images[image_id] = (media_type, data)
+        self._memory_bytes += len(data)
+        evicted = []
+        while self._memory_bytes > self.max_memory_bytes and len(self._images) > 1:
+            evicted_id, entry = self._images.popitem(last=False)
+            self._memory_bytes -= len(entry[1])
+            if self.spill_dir:
+                # still served from memory until its file is written
+                self._spilling[evicted_id] = entry
+                evicted.append(evicted_id)
+            else:
+                self._stats["dropped"] += 1
+        return evicted
+
+    def _spill(self, image_ids: list) -> None:
+        """Write evicted images to spill_dir (outside the lock)."""
+        for image_id in image_ids:
+            media_type, data = self._spilling[image_id]
+            path = os.path.join(self.spill_dir, f"{image_id}.{MEDIA_TYPES[media_type]}")
+            try:
+                # written under a temporary name, so a crash never leaves a truncated image
+                with open(path + '.part', 'wb') as f:
+                    f.write(data)
+                os.replace(path + '.part', path)
+            except OSError as e:
+                print(f"Image store: could not spill {image_id[:12]}: {e}")
+                path = None
+
+            with self._lock:
+                del self._spilling[image_id]
+                if path is None:
+                    self._stats["dropped"] += 1
+                    continue
+                self._disk[image_id] = (path, len(data))
+                self._disk_bytes += len(data)
+                self._stats["spilled"] += 1
+                removed = self._trim_disk()
+            self._remove_files(removed)
+
+    def _trim_disk(self) -> list:
+        """Forget the oldest spilled images beyond max_disk_bytes (under the lock); returns their paths."""
+        removed = []
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            _, (path, size) = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self._stats["dropped"] += 1
+            removed.append(path)
+        return removed
+
+    @staticmethod
+    def _remove_files(paths: list) -> None:
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        """Upload/dedup/hit counts and memory and disk footprint for /metrics."""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_ratio": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                "images_in_memory": len(self._images),
+                "memory_bytes": self._memory_bytes,
+                "images_on_disk": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+            }
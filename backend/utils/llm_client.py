@@ -0,0 +1,152 @@
+"""
+Process-wide Anthropic client.
+
+One client (and therefore one HTTP connection pool with keep-alive) is created
+lazily on first use and shared by every agent function, instead of a new
+client, connection and TLS handshake per foreman message. backend/main closes
+it on shutdown. Its messages calls go through the rate-limit governor
+(llm_governor), which also owns retries.
+"""
+import threading
+
+import anthropic
+import httpx
+import yaml
+
+from backend.utils.llm_governor import GovernedClient, LLMGovernor
+
+
+# Connection pool and timeout settings
+MAX_CONNECTIONS = 20            # concurrent connections to the API
+MAX_KEEPALIVE_CONNECTIONS = 10  # idle connections kept open for reuse
+KEEPALIVE_EXPIRY = 60.0         # seconds an idle connection is kept
+CONNECT_TIMEOUT = 10.0          # seconds
+REQUEST_TIMEOUT = 120.0         # seconds, read/write/pool
+
+# Rate limits of the organization's API tier (Sonnet, tier 1) - raise with the tier
+RATE_LIMIT_REQUESTS_PER_MINUTE = 50
+RATE_LIMIT_INPUT_TOKENS_PER_MINUTE = 30000
+LLM_QUEUE_MAX = 64          # calls waiting for admission; more are rejected (503)
+LLM_QUEUE_MAX_WAIT = 60.0   # seconds a call may wait for admission
+LLM_MAX_RETRIES = 4         # 429/529 retries (retry-after aware exponential backoff)
+
+SECRETS_PATH = "secrets.yaml"
+
+# How many recently seen connections keep an individual request count
+_TRACKED_CONNECTIONS = 100
+
+_client = None  # GovernedClient around the Anthropic client (or a mock)
+_client_lock = threading.Lock()
+
+_governor = LLMGovernor(
+    requests_per_minute=RATE_LIMIT_REQUESTS_PER_MINUTE,
+    input_tokens_per_minute=RATE_LIMIT_INPUT_TOKENS_PER_MINUTE,
+    max_queue=LLM_QUEUE_MAX,
+    max_wait=LLM_QUEUE_MAX_WAIT,
+    max_retries=LLM_MAX_RETRIES,
+)
+
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "connections": 0}
+_per_connection = {}  # id(network stream) -> requests served on that connection
+
+
+def _api_key() -> str:
+    with open(SECRETS_PATH, "r", encoding="utf-8") as f:
+        secrets = yaml.safe_load(f) or {}
+    return secrets.get('API_KEY')
+
+
+def _count_connection_use(response: httpx.Response) -> None:
+    # the underlying network stream identifies the pooled connection that served the request
+    stream = response.extensions.get("network_stream")
+    conn_id = id(stream) if stream is not None else None
+    with _stats_lock:
+        _stats["requests"] += 1
+        if conn_id is None:
+            return
+        if conn_id not in _per_connection:
+            _stats["connections"] += 1
+            if len(_per_connection) >= _TRACKED_CONNECTIONS:
+                _per_connection.pop(next(iter(_per_connection)))
+            _per_connection[conn_id] = 0
+        _per_connection[conn_id] += 1
+
+
+def _build_client() -> anthropic.Anthropic:
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT),
+        event_hooks={"response": [_count_connection_use]},
+    )
+    return anthropic.Anthropic(
+        api_key=_api_key(),
+        http_client=http_client,
+        timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT),
+        max_retries=0,  # the governor retries, with a shared view of the rate limit
+    )
+
+
+def get_client():
+    """Return the shared client, creating it on first use (thread-safe)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GovernedClient(_build_client(), _governor)
+    return _client
+
+
+def set_client(client) -> None:
+    """Install a specific client (e.g. a local mock for benchmarks); closes the previous one."""
+    global _client
+    with _client_lock:
+        previous, _client = _client, GovernedClient(client, _governor)
+    if previous is not None and previous.client is not client:
+        previous.close()
+
+
+def get_governor() -> LLMGovernor:
+    return _governor
+
+
+def set_governor(governor: LLMGovernor) -> None:
+    """Replace the rate-limit governor (e.g. other limits for a benchmark)."""
+    global _governor, _client
+    with _client_lock:
+        _governor = governor
+        if _client is not None:
+            _client = GovernedClient(_client.client, governor)
+
+
+def governor_stats() -> dict:
+    """Rate-limit governor queue depth, wait times and 429 counters."""
+    return _governor.stats()
+
+
+def close_client() -> None:
+    """Close the shared client and its connection pool; the next get_client() starts fresh."""
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
+
+
+def connection_stats() -> dict:
+    """Request/connection counters: how many requests reused an already open connection."""
+    with _stats_lock:
+        requests = _stats["requests"]
+        connections = _stats["connections"]
+        per_connection = sorted(_per_connection.values(), reverse=True)
+    return {
+        "requests": requests,
+        "connections_opened": connections,
+        "reused_requests": max(0, requests - connections),
+        "reuse_ratio": round((requests - connections) / requests, 3) if requests else 0.0,
+        "requests_per_connection": per_connection,
+    }
@@ -0,0 +1,331 @@
+"""
+Central governor for calls to the Anthropic messages API.
+
+Every messages.create / messages.stream call of the shared client goes through
+one LLMGovernor (llm_client wraps the client), which
+
+- admits calls through token buckets for requests/min and input tokens/min,
+  so bursts are smoothed below the organization's rate limits,
+- queues waiting calls in a bounded priority queue (interactive chat before
+  batch work; a full queue or too long a wait raises LLMOverloaded),
+- retries 429 (rate limited) and 529 (overloaded) responses with exponential
+  backoff that honours retry-after, pausing all callers meanwhile instead of
+  letting each one hammer the API,
+- stops waiting as soon as the request's CallScope (deadline) is cancelled or
+  expires, and caps each API request's timeout at the time left,
+- runs messages.create under a CallScope as a stream, so a call already talking
+  to Claude stops (and closes its HTTP response) when the scope is cancelled.
+"""
+import contextvars
+import heapq
+import itertools
+import random
+import threading
+import time
+
+from backend.utils.deadline import check_scope, current_scope, time_left
+
+
+INTERACTIVE = 0
+BATCH = 1
+
+# Priority of the LLM calls made in the current context; copied into worker threads
+llm_priority = contextvars.ContextVar('llm_priority', default=INTERACTIVE)
+
+RETRY_STATUSES = (429, 529)
+# How often a queued call re-checks whether its request was cancelled (seconds)
+SCOPE_POLL_INTERVAL = 0.25
+# Rough input tokens per image block (Anthropic bills about width*height/750, capped ~1600)
+IMAGE_TOKENS_EST = 1600
+
+
+class LLMOverloaded(RuntimeError):
+    """The governor's queue is full or a call waited longer than allowed."""
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Refilling budget of `per_minute` units, holding at most `capacity` (default one minute)."""
+
+    def __init__(self, per_minute: float, capacity: float = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 if they are now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)  # larger requests would never fit
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, delta: float) -> None:
+        """Refund (positive) or charge (negative) units once the real cost is known."""
+        self.level = min(self.capacity, self.level + delta)
+
+
+def estimate_request_tokens(kwargs: dict) -> int:
+    """Cheap input-token estimate of a messages API request (about 4 characters per token)."""
+    chars = 0
+    images = 0
+
+    def walk(value):
+        nonlocal chars, images
+        if isinstance(value, str):
+            chars += len(value)
+        elif isinstance(value, dict):
+            if value.get('type') == 'image':
+                images += 1
+                return
+            for v in value.values():
+                walk(v)
+        elif isinstance(value, (list, tuple)):
+            for v in value:
+                walk(v)
+
+    walk(kwargs.get('system'))
+    walk(kwargs.get('messages'))
+    return chars // 4 + images * IMAGE_TOKENS_EST
+
+
+def _retry_after(error) -> float:
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMGovernor:
+    """
+    Rate-limit aware admission, queueing and retry for blocking LLM calls (thread-safe).
+
+    Args:
+        requests_per_minute: Request budget (token bucket)
+        input_tokens_per_minute: Input-token budget (token bucket, estimated per request)
+        max_queue: Calls allowed to wait at once; more raise LLMOverloaded
+        max_wait: Seconds a call may wait for admission before LLMOverloaded
+        max_retries: Retries of a 429/529 response before the error is raised
+        backoff_base, backoff_max: Exponential backoff (seconds) when no retry-after is given
+        burst: Requests admitted back to back (default: a full minute's budget)
+    """
+
+    def __init__(self, requests_per_minute: float, input_tokens_per_minute: float, max_queue: int = 64,
+                 max_wait: float = 60.0, max_retries: int = 4, backoff_base: float = 1.0, backoff_max: float = 30.0,
+                 burst: float = None):
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._requests = TokenBucket(requests_per_minute, burst)
+        self._tokens = TokenBucket(input_tokens_per_minute)
+        self._cond = threading.Condition()
+        self._queue = []  # heap of (priority, sequence number)
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+
+        self._stats = {
+            "admitted": 0, "rejected": 0, "retries": 0, "rate_limited": 0, "failed_after_retries": 0,
+            "peak_queue_depth": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0,
+        }
+        self._admitted_by_priority = {}
+
+    def _acquire(self, priority: int, tokens: int) -> None:
+        ticket = (priority, next(self._seq))
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise LLMOverloaded(f"LLM queue full ({self.max_queue} waiting)", retry_after=self._suggested_retry())
+            heapq.heappush(self._queue, ticket)
+            self._stats["peak_queue_depth"] = max(self._stats["peak_queue_depth"], len(self._queue))
+
+            start = time.monotonic()
+            try:
+                while True:
+                    check_scope()  # client gone or deadline passed: leave the queue
+                    now = time.monotonic()
+                    timeout = start + self.max_wait - now
+                    if current_scope.get() is not None:
+                        timeout = min(timeout, SCOPE_POLL_INTERVAL)  # notice a cancelled request
+                    if self._queue[0] == ticket:
+                        # head of the queue: wait only for budget (and any 429 pause)
+                        wait = max(self._paused_until - now,
+                                   self._requests.wait_time(1, now),
+                                   self._tokens.wait_time(tokens, now))
+                        if wait <= 0:
+                            self._requests.take(1, now)
+                            self._tokens.take(tokens, now)
+                            heapq.heappop(self._queue)
+                            self._record_admission(priority, now - start)
+                            self._cond.notify_all()
+                            return
+                        timeout = min(timeout, wait)
+                    if start + self.max_wait - now <= 0:
+                        self._stats["rejected"] += 1
+                        raise LLMOverloaded(f"Waited over {self.max_wait:.0f}s for the LLM rate limit",
+                                            retry_after=self._suggested_retry())
+                    self._cond.wait(timeout=timeout)
+            except BaseException:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+                raise
+
+    def _record_admission(self, priority: int, waited: float) -> None:
+        waited_ms = waited * 1000
+        self._stats["admitted"] += 1
+        self._stats["wait_ms_total"] += waited_ms
+        self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], waited_ms)
+        self._admitted_by_priority[priority] = self._admitted_by_priority.get(priority, 0) + 1
+
+    def _suggested_retry(self) -> float:
+        # rough time until the current queue drains at the request rate
+        return round(max(self._paused_until - time.monotonic(), 0.0) + len(self._queue) / self._requests.rate, 1)
+
+    def _backoff(self, attempt: int, retry_after: float) -> float:
+        if retry_after is not None:
+            return retry_after + random.uniform(0, 0.25)
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)  # jitter: callers do not retry in lockstep
+
+    def call(self, fn, tokens: int = 0, priority: int = None):
+        """
+        Run `fn()` (one messages API request) once admitted, retrying rate-limit responses.
+
+        Args:
+            fn: Zero-argument callable performing the request
+            tokens: Estimated input tokens of the request
+            priority: INTERACTIVE or BATCH; defaults to the llm_priority context variable
+        """
+        priority = llm_priority.get() if priority is None else priority
+        attempt = 0
+        while True:
+            self._acquire(priority, tokens)
+            try:
+                result = fn()
+            except Exception as e:
+                if getattr(e, 'status_code', None) not in RETRY_STATUSES:
+                    raise
+                with self._cond:
+                    self._stats["rate_limited"] += 1
+                    if attempt >= self.max_retries:
+                        self._stats["failed_after_retries"] += 1
+                        raise
+                    delay = self._backoff(attempt, _retry_after(e))
+                    # everyone waits out the limit, not only this caller
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                    self._stats["retries"] += 1
+                    self._cond.notify_all()
+                attempt += 1
+                continue
+
+            usage = getattr(result, 'usage', None)
+            if usage is not None:
+                actual = (getattr(usage, 'input_tokens', 0) or 0) + (getattr(usage, 'cache_creation_input_tokens', 0) or 0)
+                with self._cond:
+                    self._tokens.adjust(tokens - actual)
+            return result
+
+    def stats(self) -> dict:
+        """Queue depth, admission wait times and rate-limit counters for /metrics."""
+        with self._cond:
+            admitted = self._stats["admitted"]
+            now = time.monotonic()
+            return {
+                **{k: v for k, v in self._stats.items() if k != "wait_ms_total"},
+                "wait_ms_max": round(self._stats["wait_ms_max"], 1),
+                "wait_ms_avg": round(self._stats["wait_ms_total"] / admitted, 1) if admitted else 0.0,
+                "queue_depth": len(self._queue),
+                "queued_batch": sum(1 for p, _ in self._queue if p >= BATCH),
+                "admitted_interactive": self._admitted_by_priority.get(INTERACTIVE, 0),
+                "admitted_batch": self._admitted_by_priority.get(BATCH, 0),
+                "paused_for_s": round(max(0.0, self._paused_until - now), 2),
+                "requests_available": round(self._requests.level, 1),
+                "input_tokens_available": round(self._tokens.level),
+            }
+
+
+def _with_deadline(kwargs: dict) -> dict:
+    """Request kwargs whose timeout ends at the current request's deadline."""
+    left = time_left()
+    if left is None or 'timeout' in kwargs:
+        return kwargs
+    return {**kwargs, 'timeout': max(left, 0.001)}
+
+
+class _GovernedStream:
+    """messages.stream() context manager whose opening request is governed."""
+
+    def __init__(self, governor: LLMGovernor, messages, kwargs: dict):
+        self._governor = governor
+        self._messages = messages
+        self._kwargs = kwargs
+        self._manager = None
+
+    def __enter__(self):
+        def open_stream():
+            manager = self._messages.stream(**_with_deadline(self._kwargs))
+            stream = manager.__enter__()  # sends the request; raises on 429
+            self._manager = manager
+            return stream
+        return self._governor.call(open_stream, estimate_request_tokens(self._kwargs))
+
+    def __exit__(self, *exc):
+        return self._manager.__exit__(*exc) if self._manager is not None else False
+
+
+class _GovernedMessages:
+    def __init__(self, messages, governor: LLMGovernor):
+        self._messages = messages
+        self._governor = governor
+
+    def create(self, **kwargs):
+        """
+        messages.create, governed. Under a CallScope the reply is streamed internally and
+        the same final message returned: the scope is checked at every chunk, and leaving
+        the stream closes the HTTP response, so a cancelled request does not keep the call
+        running until Claude has finished. A stream that sends nothing at all is only
+        stopped by the request timeout (capped at the deadline).
+        """
+        if current_scope.get() is None:
+            return self._governor.call(lambda: self._messages.create(**_with_deadline(kwargs)),
+                                       estimate_request_tokens(kwargs))
+        with self.stream(**kwargs) as stream:
+            for _ in stream.text_stream:
+                check_scope()
+            return stream.get_final_message()
+
+    def stream(self, **kwargs):
+        return _GovernedStream(self._governor, self._messages, kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._messages, name)
+
+
+class GovernedClient:
+    """Wraps an Anthropic client so its messages calls go through `governor`."""
+
+    def __init__(self, client, governor: LLMGovernor):
+        self.client = client
+        self.messages = _GovernedMessages(client.messages, governor)
+
+    def close(self):
+        self.client.close()
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
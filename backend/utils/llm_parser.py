@@ -0,0 +1,244 @@
+"""
+Parsing of Claude's procurement responses.
+
+One parser for every agent function, blocking or streaming. A reply is one of
+
+    QUESTION: <text>                 -> {"type": "question", "content": text}
+    {...json...}  (bare, fenced or   -> {"type": "json", "content": dict}
+                   inside prose)
+    anything else                    -> {"type": "text", "content": text}
+
+ResponseParser scans the text once, left to right, jumping between structural
+characters, so it can consume a token stream and hand out every "materials"
+entry the moment its closing bracket arrives. parse_response() classifies a
+complete reply; when it holds valid JSON that is decoded by the C JSON scanner
+directly.
+"""
+import json
+import re
+
+
+_QUESTION_PREFIX = "QUESTION:"
+# markdown decoration models sometimes put in front of QUESTION: (bold, heading)
+_LEAD_DECORATION = " \t\r\n*_#>"
+# characters that change the scanner state inside a JSON object
+_STRUCTURAL_RE = re.compile(r'["{}\[\]:,]')
+_STRING_END_RE = re.compile(r'["\\]')
+_TRAILING_COMMA_RE = re.compile(r',(\s*[}\]])')
+_DECODER = json.JSONDecoder()
+
+
+class ResponseParser:
+    """
+    Incremental single-pass parser for model replies.
+
+    Feed text deltas with feed(); each call returns the [artikel_id, anzahl(, artikelname)]
+    entries of the "materials" array completed by that delta. result() classifies the
+    whole reply.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.materials = []       # entries completed so far (of the current JSON candidate)
+        self._mode = "start"      # start -> question | scan <-> object -> done
+        self._pos = 0
+        self._depth = 0
+        self._object_start = None
+        self._string_start = None
+        self._last_string = None  # last string closed at object depth 1
+        self._key = None          # current key at object depth 1
+        self._in_materials = False
+        self._entry_start = None
+        self._data = None
+        self._recovered = None
+        # balanced {...} candidates that turned out not to be JSON; entries streamed
+        # from those are not part of the final result
+        self.discarded = 0
+
+    def feed(self, chunk: str) -> list:
+        """Add a text delta; return the materials entries completed by it."""
+        self.text += chunk
+        done_before = len(self.materials)
+
+        if self._mode == "start":
+            self._classify()
+        while self._mode in ("scan", "object") and self._pos < len(self.text):
+            if self._mode == "scan":
+                self._scan_for_object()
+            else:
+                self._scan_object()
+
+        return self.materials[done_before:]
+
+    @property
+    def is_question(self):
+        """True/False once the start of the reply shows whether it is a QUESTION:, None before."""
+        if self._mode == "start":
+            return None
+        return self._mode == "question"
+
+    def _classify(self) -> None:
+        head = self.text.lstrip(_LEAD_DECORATION)
+        probe = head[:len(_QUESTION_PREFIX)].upper()
+        if probe == _QUESTION_PREFIX:
+            self._mode = "question"
+        elif not _QUESTION_PREFIX.startswith(probe):
+            # cannot become a question any more: look for JSON
+            self._mode = "scan"
+
+    def _scan_for_object(self) -> None:
+        start = self.text.find("{", self._pos)
+        if start == -1:
+            self._pos = len(self.text)
+            return
+        self._mode = "object"
+        self._object_start = start
+        self._pos = start + 1
+        self._depth = 1
+        self._key = self._last_string = None
+        self._in_materials = False
+        self._entry_start = None
+        self.materials = []
+
+    def _scan_object(self) -> None:
+        text = self.text
+        while self._pos < len(text):
+            if self._string_start is not None:
+                match = _STRING_END_RE.search(text, self._pos)
+                if match is None:
+                    self._pos = len(text)
+                    return
+                if match.group() == "\\":
+                    # skip the escaped character (it may not have arrived yet)
+                    self._pos = match.end() + 1
+                    continue
+                if self._depth == 1:
+                    self._last_string = text[self._string_start + 1:match.start()]
+                self._string_start = None
+                self._pos = match.end()
+                continue
+
+            match = _STRUCTURAL_RE.search(text, self._pos)
+            if match is None:
+                self._pos = len(text)
+                return
+            ch, at = match.group(), match.start()
+            self._pos = match.end()
+
+            if ch == '"':
+                self._string_start = at
+            elif ch == ":":
+                if self._depth == 1:
+                    self._key = self._last_string
+            elif ch == ",":
+                if self._depth == 1:
+                    self._key = None
+            elif ch in "{[":
+                self._depth += 1
+                if ch == "[" and self._depth == 2 and self._key == "materials":
+                    self._in_materials = True
+                elif ch == "[" and self._depth == 3 and self._in_materials:
+                    self._entry_start = at
+            else:  # } or ]
+                if self._depth == 3 and self._entry_start is not None:
+                    self._add_entry(text[self._entry_start:at + 1])
+                    self._entry_start = None
+                elif self._depth == 2:
+                    self._in_materials = False
+                self._depth -= 1
+                if self._depth == 0:
+                    self._close_object(text[self._object_start:at + 1])
+                    return
+
+    def _add_entry(self, entry_text: str) -> None:
+        try:
+            entry = json.loads(entry_text)
+        except json.JSONDecodeError:
+            return  # malformed entry; the final parse decides
+        if isinstance(entry, list):
+            self.materials.append(entry)
+
+    def _close_object(self, candidate: str) -> None:
+        data, recovered = _loads_object(candidate)
+        if data is not None:
+            self._data, self._recovered = data, recovered
+            self._mode = "done"
+        else:
+            # not JSON after all (e.g. "{size}" in prose): keep looking after it
+            self.discarded += 1
+            self._mode = "scan"
+
+    def result(self) -> dict:
+        """
+        Classification of everything fed so far.
+
+        Returns:
+            {"type": "question" | "json" | "text", "content": ...}; JSON that had to be
+            repaired carries "recovered": "trailing_commas" | "truncated"
+        """
+        if self._mode == "start":
+            self._classify()
+            if self._mode == "start":
+                # only (a prefix of) the QUESTION: marker or nothing at all
+                self._mode = "scan"
+
+        if self._mode == "question":
+            return _question(self.text.lstrip(_LEAD_DECORATION))
+
+        if self._data is not None:
+            parsed = {"type": "json", "content": self._data}
+            if self._recovered:
+                parsed["recovered"] = self._recovered
+            return parsed
+
+        if self._mode == "object" and self.materials:
+            # reply cut off (e.g. max_tokens) after some complete entries: keep those
+            return {"type": "json", "content": {"materials": list(self.materials), "explanation": ""},
+                    "recovered": "truncated"}
+
+        return {"type": "text", "content": self.text.strip()}
+
+
+def _question(head: str) -> dict:
+    content = head[len(_QUESTION_PREFIX):].strip().lstrip("*_").strip()
+    return {"type": "question", "content": content}
+
+
+def _loads_object(candidate: str) -> tuple:
+    """(dict, recovery note) for a balanced {...} candidate, or (None, None)."""
+    try:
+        data = json.loads(candidate)
+        recovered = None
+    except json.JSONDecodeError:
+        repaired = _TRAILING_COMMA_RE.sub(r"\1", candidate)
+        if repaired == candidate:
+            return None, None
+        try:
+            data = json.loads(repaired)
+        except json.JSONDecodeError:
+            return None, None
+        recovered = "trailing_commas"
+    return (data, recovered) if isinstance(data, dict) else (None, None)
+
+
+def parse_response(text: str) -> dict:
+    """Classify a complete model reply (same result as feeding it to a ResponseParser)."""
+    text = text or ""
+    head = text.lstrip(_LEAD_DECORATION)
+    if head[:len(_QUESTION_PREFIX)].upper() == _QUESTION_PREFIX:
+        return _question(head)
+
+    # fast path: the first "{" starts a valid object (the usual reply), decoded by the C scanner
+    start = text.find("{")
+    if start != -1:
+        try:
+            data, _ = _DECODER.raw_decode(text, start)
+        except json.JSONDecodeError:
+            data = None
+        if isinstance(data, dict):
+            return {"type": "json", "content": data}
+
+    # malformed or prose-wrapped reply: full scan with recovery
+    parser = ResponseParser()
+    parser.feed(text)
+    return parser.result()
@@ -0,0 +1,80 @@
+"""
+Token inverted index over product names, for resolving a product the model
+named correctly but gave a made-up artikel_id.
+"""
+import re
+
+
+_TOKEN_RE = re.compile(r"\w+")
+_FOLD = str.maketrans({'ä': 'a', 'ö': 'o', 'ü': 'u', 'ß': 'ss'})
+_SUFFIXES = ('en', 'er', 'e', 'n', 's')
+
+
+def _stem(token: str) -> str:
+    # light German/English plural stripping: Schrauben/Schraube -> schraub
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> list:
+    """Lower-cased, umlaut-folded, lightly stemmed word tokens of `text`."""
+    text = str(text or '').lower().translate(_FOLD)
+    return [_stem(t) for t in _TOKEN_RE.findall(text)]
+
+
+class NameIndex:
+    """
+    Inverted index token -> article IDs over `artikelname` and `kategorie`.
+
+    Args:
+        by_id: Normalized artikel_id -> catalog row (CatalogIndex.by_id)
+        prices: Normalized artikel_id -> unit price (CatalogIndex.prices)
+    """
+
+    FIELDS = ('artikelname', 'kategorie')
+
+    def __init__(self, by_id: dict, prices: dict):
+        self.prices = prices
+        self.tokens = {}
+        self.postings = {}
+
+        for key, row in by_id.items():
+            tokens = set()
+            for field in self.FIELDS:
+                tokens.update(tokenize(row.get(field, '')))
+            self.tokens[key] = tokens
+            for token in tokens:
+                self.postings.setdefault(token, []).append(key)
+
+    def search(self, name: str, limit: int = 5, min_share: float = 0.5) -> list:
+        """
+        Rank article IDs by how many distinct tokens of `name` they contain, then by price.
+
+        Only IDs covering at least `min_share` of the query tokens are returned.
+
+        Returns list of (artikel_id, overlap) tuples, best first.
+        """
+        query = set(tokenize(name))
+        if not query:
+            return []
+
+        overlap = {}
+        for token in query:
+            for key in self.postings.get(token, ()):
+                overlap[key] = overlap.get(key, 0) + 1
+
+        needed = max(1, int(len(query) * min_share + 0.5))
+        hits = [(key, n) for key, n in overlap.items() if n >= needed]
+        hits.sort(key=lambda kv: (-kv[1], self.prices.get(kv[0], 0.0)))
+        return hits[:limit]
+
+    def best(self, name: str):
+        """Best matching artikel_id for `name` or None."""
+        hits = self.search(name, limit=1)
+        return hits[0][0] if hits else None
+
+    def shares_tokens(self, name: str, artikel_id: str) -> bool:
+        """True if the indexed name/category of `artikel_id` shares any token with `name`."""
+        return bool(set(tokenize(name)) & self.tokens.get(artikel_id, set()))
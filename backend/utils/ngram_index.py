@@ -0,0 +1,127 @@
+"""
+Fuzzy article-ID index, replacing a linear difflib.get_close_matches scan.
+
+Two precomputed structures narrow the search to a handful of keys, and only
+those are scored with SequenceMatcher, so scores and the cutoff mean exactly
+what they mean for difflib:
+
+- a deletion neighbourhood (every key with one character removed) finds keys
+  within one typo, swap or dropped/extra character in a few dict lookups
+- a character-trigram inverted index covers larger distortions
+
+Both candidate sets are always scored together: a key one edit away is not
+necessarily the best ratio ("C019X" is closer to "C019XYZ" than to "C018X").
+"""
+import heapq
+from difflib import SequenceMatcher
+
+
+PAD = "\x00"
+
+
+def trigrams(text: str) -> set:
+    """Padded character trigrams, so short IDs and ID prefixes/suffixes still produce grams."""
+    padded = PAD * 2 + text + PAD
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def deletions(text: str) -> set:
+    """The text itself plus every variant with exactly one character removed."""
+    return {text} | {text[:i] + text[i + 1:] for i in range(len(text))}
+
+
+class TrigramIndex:
+    """
+    Fuzzy key index built once per catalog version.
+
+    Args:
+        keys: Normalized keys to index (e.g. CatalogIndex.keys)
+        max_candidates: How many top trigram-overlap keys are scored with SequenceMatcher
+        count_slack: Candidates sharing fewer than (best overlap - slack) trigrams are not scored
+    """
+
+    def __init__(self, keys: list, max_candidates: int = 32, count_slack: int = 2):
+        self.keys = list(keys)
+        self.max_candidates = max_candidates
+        self.count_slack = count_slack
+        self.postings = {}
+        # hash(variant) -> key position, or list of positions on collision/shared variant
+        self.neighbours = {}
+
+        for pos, key in enumerate(self.keys):
+            for gram in trigrams(key):
+                self.postings.setdefault(gram, []).append(pos)
+            for variant in deletions(key):
+                h = hash(variant)
+                prev = self.neighbours.get(h)
+                if prev is None:
+                    self.neighbours[h] = pos
+                elif isinstance(prev, list):
+                    prev.append(pos)
+                elif prev != pos:
+                    self.neighbours[h] = [prev, pos]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _neighbour_candidates(self, query: str) -> list:
+        found = set()
+        for variant in deletions(query):
+            hit = self.neighbours.get(hash(variant))
+            if hit is None:
+                continue
+            if isinstance(hit, list):
+                found.update(hit)
+            else:
+                found.add(hit)
+        return [self.keys[pos] for pos in found]
+
+    def _trigram_candidates(self, query: str) -> list:
+        counts = {}
+        for gram in trigrams(query):
+            for pos in self.postings.get(gram, ()):
+                counts[pos] = counts.get(pos, 0) + 1
+        if not counts:
+            return []
+
+        top = heapq.nlargest(self.max_candidates, counts.items(), key=lambda kv: kv[1])
+        # keys sharing far fewer grams than the best one cannot win; skip scoring them
+        floor = top[0][1] - self.count_slack
+        return [self.keys[pos] for pos, count in top if count >= floor]
+
+    @staticmethod
+    def _score(query: str, candidates: list, cutoff: float) -> list:
+        matcher = SequenceMatcher()
+        matcher.set_seq2(query)
+        scored = []
+        for key in candidates:
+            matcher.set_seq1(key)
+            if (matcher.real_quick_ratio() >= cutoff
+                    and matcher.quick_ratio() >= cutoff
+                    and matcher.ratio() >= cutoff):
+                scored.append((matcher.ratio(), key))
+        return scored
+
+    def close_matches(self, query: str, n: int = 1, cutoff: float = 0.6) -> list:
+        """
+        Drop-in for difflib.get_close_matches(query, keys, n, cutoff) over the indexed keys.
+
+        Returns up to `n` keys with SequenceMatcher ratio >= cutoff, best first.
+        """
+        if not query or not self.keys:
+            return []
+
+        scored = self._score(query, self._neighbour_candidates(query), cutoff)
+        # only exact matches cannot be beaten by a trigram candidate
+        if sum(score == 1.0 for score, _ in scored) < n:
+            seen = {key for _, key in scored}
+            extra = [k for k in self._trigram_candidates(query) if k not in seen]
+            scored.extend(self._score(query, extra, cutoff))
+
+        # same ordering as difflib: highest score first, ties by key
+        return [key for _, key in heapq.nlargest(n, scored)]
+
+    def closest(self, query: str, cutoff: float = 0.6):
+        """Best matching key or None."""
+        matches = self.close_matches(query, n=1, cutoff=cutoff)
+        return matches[0] if matches else None
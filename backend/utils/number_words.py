@@ -0,0 +1,87 @@
+"""
+German and English number words -> integers ("zweihundertfünfzig", "twenty-five",
+"two hundred", "ein Dutzend").
+"""
+import re
+
+
+_GERMAN = {
+    'null': 0, 'ein': 1, 'eins': 1, 'eine': 1, 'einen': 1, 'einem': 1, 'einer': 1,
+    'zwei': 2, 'drei': 3, 'vier': 4, 'fünf': 5, 'sechs': 6, 'sieben': 7, 'acht': 8,
+    'neun': 9, 'zehn': 10, 'elf': 11, 'zwölf': 12, 'dreizehn': 13, 'vierzehn': 14,
+    'fünfzehn': 15, 'sechzehn': 16, 'siebzehn': 17, 'achtzehn': 18, 'neunzehn': 19,
+    'zwanzig': 20, 'dreißig': 30, 'vierzig': 40, 'fünfzig': 50, 'sechzig': 60,
+    'siebzig': 70, 'achtzig': 80, 'neunzig': 90, 'dutzend': 12,
+    # German without umlauts/ß, as typed on phones or produced by speech-to-text
+    'fuenf': 5, 'zwoelf': 12, 'fuenfzehn': 15, 'dreissig': 30, 'fuenfzig': 50,
+}
+_ENGLISH = {
+    'zero': 0, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6,
+    'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12,
+    'thirteen': 13, 'fourteen': 14, 'fifteen': 15, 'sixteen': 16, 'seventeen': 17,
+    'eighteen': 18, 'nineteen': 19, 'twenty': 20, 'thirty': 30, 'forty': 40,
+    'fifty': 50, 'sixty': 60, 'seventy': 70, 'eighty': 80, 'ninety': 90, 'dozen': 12,
+}
+_VALUES = {**_GERMAN, **_ENGLISH}
+_MULTIPLIERS = {'hundert': 100, 'hundred': 100, 'tausend': 1000, 'thousand': 1000}
+_JOINERS = {'und', 'and'}
+
+# German compounds are written as one word: split them into German parts (English
+# ones would read "zweiten" as zwei + ten)
+_PARTS = sorted(list(_GERMAN) + ['hundert', 'tausend', 'und'], key=len, reverse=True)
+_COMPOUND_RE = re.compile('(?:' + '|'.join(_PARTS) + ')')
+_WORD_SPLIT_RE = re.compile(r"[\s\-]+")
+
+
+def _parts(word: str) -> list:
+    """Number parts of one word ("fünfundzwanzig" -> [fünf, und, zwanzig]) or None."""
+    word = word.lower()
+    if word in _VALUES or word in _MULTIPLIERS or word in _JOINERS:
+        return [word]
+    parts = []
+    pos = 0
+    while pos < len(word):
+        match = _COMPOUND_RE.match(word, pos)
+        if match is None:
+            return None
+        parts.append(match.group())
+        pos = match.end()
+    return parts
+
+
+def parse_number_words(text: str):
+    """
+    Integer value of `text` if it consists only of number words, else None.
+
+    "zwei" -> 2, "fünfundzwanzig" -> 25, "zweihundertfünfzig" -> 250,
+    "two hundred fifty" -> 250, "twenty-five" -> 25, "ein dutzend" -> 12.
+    """
+    parts = []
+    for word in _WORD_SPLIT_RE.split(str(text or '').strip()):
+        if not word:
+            continue
+        word_parts = _parts(word)
+        if not word_parts:
+            return None
+        parts.extend(word_parts)
+    if not parts or all(p in _JOINERS for p in parts):
+        return None
+
+    total, current = 0, 0
+    for part in parts:
+        if part in _JOINERS:
+            continue
+        if part in _MULTIPLIERS:
+            multiplier = _MULTIPLIERS[part]
+            if multiplier == 1000:
+                total += (current or 1) * 1000
+                current = 0
+            else:
+                current = (current or 1) * multiplier
+        elif part in ('dutzend', 'dozen'):
+            # "ein Dutzend" / "two dozen"
+            current = (current or 1) * 12
+        else:
+            current += _VALUES[part]
+    return total + current
+
@@ -1,31 +1,421 @@
+import base64
 import json
 import csv
-import difflib
-import anthropic
-import yaml
+import hashlib
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+from backend.utils.catalog_index import CatalogIndex, load_catalog_csv, normalize_id
+from backend.utils.llm_client import get_client
+from backend.utils.llm_governor import estimate_request_tokens
+from backend.utils.deadline import DeadlineExceeded, RequestCancelled, check_scope
+from backend.utils.llm_parser import ResponseParser, parse_response
+from backend.utils.fast_path import try_fast_path
+from backend.utils.transcript_normalizer import normalize_transcript
+from backend.utils.response_cache import make_key
+from backend.utils.image_cache import perceptual_hash
+
+
+# --- Prompt catalog serialization ---------------------------------------------
+
+_TOKEN_PIECE_RE = re.compile(r"\w+|[^\w\s]|\n[ \t]*")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token estimate without a tokenizer: words cost ~1 token per 4 characters,
+    every punctuation character and every line break (with its indentation) about one token.
+    """
+    return sum(math.ceil(len(piece) / 4) for piece in _TOKEN_PIECE_RE.findall(text))
+
+
+def _columns(rows: list) -> list:
+    columns = []
+    for row in rows:
+        for k in row:
+            if k not in columns:
+                columns.append(k)
+    return columns
+
+
+def _cell(value) -> str:
+    return str(value if value is not None else '').replace('\t', ' ').replace('\n', ' ')
+
+
+def _serialize_json_pretty(rows: list) -> str:
+    return json.dumps(rows, ensure_ascii=False, indent=2)
+
+
+def _serialize_json_min(rows: list) -> str:
+    return json.dumps(rows, ensure_ascii=False, separators=(',', ':'))
+
+
+def _serialize_tsv(rows: list) -> str:
+    columns = _columns(rows)
+    lines = ['\t'.join(columns)]
+    lines.extend('\t'.join(_cell(row.get(c)) for c in columns) for row in rows)
+    return '\n'.join(lines)
+
+
+def _serialize_grouped(rows: list) -> str:
+    # kategorie/lieferant are written once per group instead of once per row
+    group_cols = ['kategorie', 'lieferant']
+    columns = [c for c in _columns(rows) if c not in group_cols]
+    groups = OrderedDict()
+    for row in rows:
+        groups.setdefault(tuple(_cell(row.get(c)) for c in group_cols), []).append(row)
+
+    lines = ['\t'.join(columns) + '   (rows grouped under "## kategorie | lieferant")']
+    for (kategorie, lieferant), members in groups.items():
+        lines.append(f"## {kategorie} | {lieferant}")
+        lines.extend('\t'.join(_cell(row.get(c)) for c in columns) for row in members)
+    return '\n'.join(lines)
+
+
+# Pluggable: add a mode by registering a rows -> str function here
+PROMPT_SERIALIZERS = {
+    'json_pretty': _serialize_json_pretty,
+    'json_min': _serialize_json_min,
+    'tsv': _serialize_tsv,
+    'grouped': _serialize_grouped,
+}
+
+# (catalog version, mode, row IDs) -> (text, estimated tokens, block hash); bounded LRU
+_serialized_cache = OrderedDict()
+_SERIALIZED_CACHE_SIZE = 256
+
+
+def serialize_catalog(catalog: CatalogIndex, rows: list, mode: str = 'json_pretty') -> tuple:
+    """
+    Serialize catalog `rows` for a prompt, memoized per catalog version and row set.
+
+    Args:
+        catalog: The CatalogIndex the rows come from (provides the version stamp)
+        rows: Rows to serialize (the whole catalog or a retrieved subset)
+        mode: One of PROMPT_SERIALIZERS, or 'auto' to pick the cheapest by estimated tokens
+
+    Returns:
+        (text, meta) with meta = {"catalog_format", "catalog_rows", "catalog_tokens_est",
+        "catalog_block"}; catalog_block hashes catalog version, format and row set, so it
+        only changes when the serialized text does
+    """
+    modes = list(PROMPT_SERIALIZERS) if mode == 'auto' else [mode]
+    row_ids = None if rows is catalog.rows else tuple(r.get('artikel_id') for r in rows)
+
+    best = None
+    for m in modes:
+        if m not in PROMPT_SERIALIZERS:
+            raise ValueError(f"Unknown catalog format: {m}")
+        key = (catalog.version, m, row_ids)
+        entry = _serialized_cache.get(key)
+        if entry is None:
+            text = PROMPT_SERIALIZERS[m](rows)
+            block_hash = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:12]
+            entry = (text, estimate_tokens(text), block_hash)
+            _serialized_cache[key] = entry
+            if len(_serialized_cache) > _SERIALIZED_CACHE_SIZE:
+                _serialized_cache.popitem(last=False)
+        else:
+            _serialized_cache.move_to_end(key)
+        if best is None or entry[1] < best[1][1]:
+            best = (m, entry)
+
+    m, (text, tokens, block_hash) = best
+    return text, {'catalog_format': m, 'catalog_rows': len(rows), 'catalog_tokens_est': tokens,
+                  'catalog_block': block_hash}
+
+
+# --- Prompt caching -------------------------------------------------------------
+
+def cached_catalog_block(preamble: str, catalog_text: str, prompt_meta: dict) -> dict:
+    """
+    System block holding the static catalog, marked for Anthropic prompt caching.
+
+    The block text carries the catalog block hash, so it is byte-identical exactly as
+    long as catalog version, format and row set are unchanged, and the cached prefix
+    is reused for every turn in between.
+    """
+    return {
+        "type": "text",
+        "text": f"{preamble}\n\nC-materials catalog (version {prompt_meta['catalog_block']}):\n{catalog_text}",
+        "cache_control": {"type": "ephemeral"},
+    }
+
+
+def prompt_cache_meta(response) -> dict:
+    """Cache hit/miss and cached-token counts from a messages API response's usage."""
+    usage = getattr(response, 'usage', None)
+    read = getattr(usage, 'cache_read_input_tokens', None) or 0
+    written = getattr(usage, 'cache_creation_input_tokens', None) or 0
+    if read:
+        status = 'hit'
+    elif written:
+        status = 'miss'
+    else:
+        # prefix below the model's minimum cacheable length, or caching unsupported
+        status = 'uncached'
+    return {
+        'status': status,
+        'cached_tokens': read,
+        'cache_write_tokens': written,
+        'input_tokens': getattr(usage, 'input_tokens', None) or 0,
+    }
+
+
+# --- Model routing ----------------------------------------------------------------
+
+SMALL_MODEL = "claude-3-5-haiku-20241022"
+LARGE_MODEL = "claude-sonnet-4-20250514"
+
+# USD per million tokens (input, output); cache writes bill 1.25x input, cache reads 0.1x
+MODEL_PRICES = {
+    "claude-3-5-haiku-20241022": (0.80, 4.00),
+    "claude-3-5-sonnet-20241022": (3.00, 15.00),
+    "claude-sonnet-4-20250514": (3.00, 15.00),
+}
+
+# task -> model and output budget. "escalate" redoes the task on that model when the
+# output fails the task's validation. Tune with model_routing_stats() (/metrics)
+MODEL_ROUTES = {
+    # strip filler words from a voice transcript
+    "clean_transcript": {"model": SMALL_MODEL, "max_tokens": 1000, "escalate": LARGE_MODEL},
+    # open a chat turn: ask one clarifying question, or hand over to chat_selection.
+    # Sees the candidates' names only: the catalog is cached on chat_selection's model
+    "chat_decision": {"model": SMALL_MODEL, "max_tokens": 300, "escalate": LARGE_MODEL},
+    # final catalog selections
+    "chat_selection": {"model": LARGE_MODEL, "max_tokens": 2000},
+    "selection": {"model": LARGE_MODEL, "max_tokens": 4000},
+    "image": {"model": LARGE_MODEL, "max_tokens": 2000},
+}
+
+_routing_lock = threading.Lock()
+_routing_stats = {}  # task -> counters, per model
+
+
+def routed_request(task: str, request: dict, model: str = None) -> dict:
+    """`request` with the model (default: the routed one) and output budget of `task`."""
+    route = MODEL_ROUTES[task]
+    return {**request, "model": model or route["model"], "max_tokens": route["max_tokens"]}
+
+
+def _usage_cost(model: str, usage) -> float:
+    price_in, price_out = MODEL_PRICES.get(model, MODEL_PRICES[LARGE_MODEL])
+    tokens_in = (getattr(usage, 'input_tokens', 0) or 0) \
+        + 1.25 * (getattr(usage, 'cache_creation_input_tokens', 0) or 0) \
+        + 0.1 * (getattr(usage, 'cache_read_input_tokens', 0) or 0)
+    return (tokens_in * price_in + (getattr(usage, 'output_tokens', 0) or 0) * price_out) / 1e6
+
+
+def _task_stats(task: str) -> dict:
+    return _routing_stats.setdefault(task, {"escalations": 0, "handoffs": 0, "early_stops": 0, "models": {}})
+
+
+def _record_model_call(task: str, model: str, seconds: float, usage, stopped_early: bool = False) -> None:
+    with _routing_lock:
+        stats = _task_stats(task)
+        per_model = stats["models"].setdefault(model, {
+            "calls": 0, "latency_ms_total": 0.0, "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0,
+        })
+        per_model["calls"] += 1
+        per_model["latency_ms_total"] += seconds * 1000
+        per_model["input_tokens"] += (getattr(usage, 'input_tokens', 0) or 0) \
+            + (getattr(usage, 'cache_creation_input_tokens', 0) or 0) \
+            + (getattr(usage, 'cache_read_input_tokens', 0) or 0)
+        per_model["output_tokens"] += getattr(usage, 'output_tokens', 0) or 0
+        per_model["cost_usd"] += _usage_cost(model, usage)
+        stats["early_stops"] += stopped_early
+
+
+def _record_routing(task: str, event: str) -> None:
+    with _routing_lock:
+        _task_stats(task)[event] += 1
+
+
+def model_routing_stats() -> dict:
+    """Per task: calls, average latency and cost per model, escalations and hand-overs."""
+    with _routing_lock:
+        out = {}
+        for task, stats in _routing_stats.items():
+            models = {}
+            for model, m in stats["models"].items():
+                calls = m["calls"]
+                models[model] = {
+                    "calls": calls,
+                    "avg_latency_ms": round(m["latency_ms_total"] / calls, 1),
+                    "input_tokens": m["input_tokens"],
+                    "output_tokens": m["output_tokens"],
+                    "cost_usd": round(m["cost_usd"], 6),
+                    "avg_cost_usd": round(m["cost_usd"] / calls, 6),
+                }
+            out[task] = {"escalations": stats["escalations"], "handoffs": stats["handoffs"],
+                         "early_stops": stats["early_stops"], "models": models}
+        return out
+
+
+def _routed_create(task: str, request: dict, validate) -> tuple:
+    """
+    messages.create on `task`'s model; if `validate(message)` raises ValueError and the
+    route has an escalation model, the task is redone there once.
+
+    Returns:
+        (validate's return value, message, model used)
+    """
+    route = MODEL_ROUTES[task]
+    model = route["model"]
+    while True:
+        start = time.perf_counter()
+        message = get_client().messages.create(**routed_request(task, request, model))
+        _record_model_call(task, model, time.perf_counter() - start, getattr(message, 'usage', None))
+        try:
+            return validate(message), message, model
+        except ValueError as e:
+            escalate = route.get("escalate")
+            if not escalate or escalate == model:
+                raise
+            print(f"{task}: {model} output failed validation ({e}), escalating to {escalate}")
+            _record_routing(task, "escalations")
+            model = escalate
+
 
+def _reply_text(message) -> str:
+    block = message.content[0]
+    return (block.text if hasattr(block, 'text') else str(block)).strip()
 
-with open("secrets.yaml", "r", encoding="utf-8") as f:
-    secrets = yaml.safe_load(f)
 
-def process_procurement_request(foreman_message: str, c_materials_data: list) -> dict:
+def process_procurement_request(foreman_message: str, c_materials_data, top_k: int = None, catalog_format: str = 'json_pretty', response_cache=None, fast_path: bool = False) -> dict:
     """
     Process a foreman's procurement request and return necessary C-materials.
     
     Args:
         foreman_message: The foreman's task description
-        c_materials_data: List of available C-materials (JSON data)
+        c_materials_data: CatalogIndex (or list) of available C-materials
+        top_k: Only send the top-K retrieved catalog rows (None = whole catalog)
+        catalog_format: Prompt serialization of the catalog (see PROMPT_SERIALIZERS, or 'auto')
+        response_cache: Optional ResponseCache for the model's selection, keyed on the
+            normalized message and catalog assortment; prices/stock are always re-applied live
+        fast_path: Resolve fully specified orders ("500 Schraube TX20 4x40") locally,
+            without calling Claude (see fast_path.match_order)
     
     Returns:
         dict with 'materials' (list of [artikel_id, anzahl]) and 'explanation'
     """
-    
-    # Resolve Anthropic API key from secrets.yaml or environment
-    api_key = secrets.get('API_KEY')
+    catalog = CatalogIndex.from_catalog(c_materials_data)
 
-    client = anthropic.Anthropic(api_key=api_key)
-    
-    materials_json = json.dumps(c_materials_data, ensure_ascii=False, indent=2)
+    fast_meta = {}
+    if fast_path:
+        selection, fast_meta = try_fast_path(foreman_message, catalog)
+        if selection is not None:
+            return _priced_selection(selection, catalog, fast_meta)
+
+    cache_key, result, prompt_meta = _cached_selection(response_cache, foreman_message, catalog, top_k, catalog_format)
+    if result is None:
+        result, prompt_meta = _select_materials(foreman_message, catalog, top_k, catalog_format)
+        _store_selection(response_cache, cache_key, result, prompt_meta)
+
+    return _priced_selection(result, catalog, {**prompt_meta, **fast_meta})
+
+
+def stream_procurement_request(foreman_message: str, c_materials_data, top_k: int = None, catalog_format: str = 'json_pretty', response_cache=None, fast_path: bool = False):
+    """
+    Streaming variant of process_procurement_request.
+
+    Yields (event, data) pairs: ("item", priced item) for every material as soon as the
+    model has written its entry, then ("done", <the process_procurement_request result>).
+    On a fast-path or response cache hit all items are yielded at once.
+    """
+    catalog = CatalogIndex.from_catalog(c_materials_data)
+
+    fast_meta = {}
+    if fast_path:
+        selection, fast_meta = try_fast_path(foreman_message, catalog)
+        if selection is not None:
+            detailed_output = _priced_selection(selection, catalog, fast_meta)
+            for item in detailed_output['items']:
+                yield 'item', item
+            yield 'done', detailed_output
+            return
+
+    cache_key, result, prompt_meta = _cached_selection(response_cache, foreman_message, catalog, top_k, catalog_format)
+    if result is None:
+        request, prompt_meta = _procurement_request(foreman_message, catalog, top_k, catalog_format)
+        print("prompting (stream)...")
+        parser, _ = yield from _stream_reply("selection", request, catalog)
+        result = _selection(parser.result(), prompt_meta)
+        _store_selection(response_cache, cache_key, result, prompt_meta)
+        detailed_output = _priced_selection(result, catalog, {**prompt_meta, **fast_meta})
+    else:
+        detailed_output = _priced_selection(result, catalog, {**prompt_meta, **fast_meta})
+        for item in detailed_output['items']:
+            yield 'item', item
+
+    yield 'done', detailed_output
+
+
+def _cached_selection(response_cache, foreman_message: str, catalog: CatalogIndex, top_k: int, catalog_format: str) -> tuple:
+    """(cache key, cached selection or None, prompt metadata or None); the key is None without a cache."""
+    if response_cache is None:
+        return None, None, None
+    cache_key = make_key(foreman_message, catalog.assortment_version, top_k, catalog_format)
+    cached = response_cache.get(cache_key)
+    if cached is None:
+        return cache_key, None, None
+    return cache_key, cached['result'], dict(cached['meta'], response_cache='hit')
+
+
+def _store_selection(response_cache, cache_key: str, result: dict, prompt_meta: dict) -> None:
+    if response_cache is None:
+        return
+    selection = {'materials': result.get('materials', []), 'explanation': result.get('explanation', '')}
+    response_cache.set(cache_key, {'result': selection, 'meta': prompt_meta})
+    prompt_meta['response_cache'] = 'miss'
+
+
+def _priced_selection(result: dict, catalog: CatalogIndex, prompt_meta: dict) -> dict:
+    # Enrich/match and price using the shared catalog index (avoid re-reading CSV)
+    detailed = match_and_price(result, catalog=catalog, approval_threshold=500.0)
+    return {
+        'explanation': result.get('explanation', ''),
+        **detailed,
+        'meta': prompt_meta,
+    }
+
+
+def _stream_reply(task: str, request: dict, catalog: CatalogIndex):
+    """
+    Stream a Claude reply from `task`'s routed model, yielding ("item", priced item) for
+    every "materials" entry the moment it is complete. Stops (closing the upstream stream)
+    once the request is cancelled or past its deadline. Streams are not escalated: their
+    items are already out.
+
+    Returns (generator return value):
+        (ResponseParser holding the full reply, final message with usage)
+    """
+    parser = ResponseParser()
+    request = routed_request(task, request)
+    start = time.perf_counter()
+    with get_client().messages.stream(**request) as stream:
+        for delta in stream.text_stream:
+            check_scope()
+            for entry in parser.feed(delta):
+                for item in match_and_price({'materials': [entry]}, catalog=catalog)['items']:
+                    yield 'item', item
+        final = stream.get_final_message()
+    _record_model_call(task, request["model"], time.perf_counter() - start, getattr(final, 'usage', None))
+    return parser, final
+
+
+def _procurement_request(foreman_message: str, catalog: CatalogIndex, top_k: int, catalog_format: str) -> tuple:
+    """
+    Messages API arguments asking which catalog materials the foreman's task needs.
+
+    Returns:
+        (request kwargs for messages.create / messages.stream without model and
+        max_tokens - see routed_request, prompt metadata)
+    """
+    materials_json, prompt_meta = serialize_catalog(catalog, catalog.candidates(foreman_message, top_k), catalog_format)
     
     prompt = f"""You are a procurement helper tool for onsite C material procurement. 
 
@@ -41,12 +431,13 @@ def process_procurement_request(foreman_message: str, c_materials_data: list) ->
     RETURN: ONLY JSON object with EXACTLY this structure:
     {{
     "materials": [
-        ["artikel_id", anzahl],
-        ["artikel_id", anzahl],
+        ["artikel_id", anzahl, "artikelname"],
+        ["artikel_id", anzahl, "artikelname"],
         ...
     ],
     "explanation": "Brief explanation of what was ordered and why"
     }}
+    (artikelname is copied from the catalog so the item can still be found if the ID is off)
 
     Consider:
     - Typical quantities needed for the task
@@ -55,108 +446,69 @@ def process_procurement_request(foreman_message: str, c_materials_data: list) ->
     - Cleaning and preparation materials
     - Consider the task type and select appropriate materials"""
 
-    # Call Claude API
-    print("prompting...")
-    message = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=4000,
-        messages=[
+    request = {
+        "messages": [
             {"role": "user", "content": prompt}
-        ]
+        ],
+    }
+    return request, prompt_meta
+
+
+def _select_materials(foreman_message: str, catalog: CatalogIndex, top_k: int, catalog_format: str) -> tuple:
+    """
+    Ask Claude which catalog materials the foreman's task needs.
+
+    Returns:
+        (parsed model JSON with 'materials' and 'explanation', prompt metadata)
+    """
+    request, prompt_meta = _procurement_request(foreman_message, catalog, top_k, catalog_format)
+
+    # Call Claude API (shared, pooled client; the "selection" route picks the model)
+    print("prompting...")
+    selection, message, model = _routed_create(
+        "selection", request, lambda message: _selection(parse_response(_reply_text(message)), prompt_meta)
     )
+    prompt_meta['model'] = model
 
     print("Raw Response: ", message)
-    
-    # Extract response
-    response_text = message.content[0].text
-    
-    # Parse JSON response (handle potential markdown code blocks or surrounding text)
-    response_text = response_text.strip()
-
-    # Prefer an explicit ```json block, then any ``` block
-    start = None
-    idx_json = response_text.find("```json")
-    idx_code = response_text.find("```")
-    if idx_json != -1:
-        start = idx_json + len("```json")
-    elif idx_code != -1:
-        start = idx_code + 3
-
-    if start is not None:
-        # look for a closing fence after the start
-        end = response_text.find("```", start)
-        if end != -1:
-            response_text = response_text[start:end].strip()
-        else:
-            # no closing fence, take the rest
-            response_text = response_text[start:].strip()
-    else:
-        # no code fences found — try to extract a JSON object from the text
-        first_brace = response_text.find("{")
-        last_brace = response_text.rfind("}")
-        if first_brace != -1 and last_brace != -1 and last_brace > first_brace:
-            response_text = response_text[first_brace:last_brace+1].strip()
-
-    # final cleanup of any remaining backticks or surrounding whitespace
-    if response_text.startswith("```"):
-        response_text = response_text[3:].strip()
-    if response_text.endswith("```"):
-        response_text = response_text[:-3].strip()
-    
-    result = json.loads(response_text)
 
-    # Enrich/match and price using the provided c_materials_data (avoid re-reading CSV)
-    detailed = match_and_price(result, catalog=c_materials_data, approval_threshold=500.0)
-    detailed_output = {
-        'explanation': result.get('explanation', ''),
-        **detailed,
-    }
+    return selection, prompt_meta
+
 
-    return detailed_output
+def _selection(parsed: dict, prompt_meta: dict) -> dict:
+    """
+    The model's JSON selection from a parsed reply (see llm_parser.parse_response).
+
+    The procurement prompt has no question channel, so anything but JSON is an error.
+    """
+    if parsed['type'] != 'json':
+        raise ValueError(f"Expected a JSON selection, model replied with {parsed['type']}: {parsed['content'][:200]!r}")
+    if parsed.get('recovered'):
+        prompt_meta['response_recovered'] = parsed['recovered']
+    return parsed['content']
 
 
-def match_and_price(result_json: dict, csv_path: str = 'backend/data/sample.csv', approval_threshold: float = 500.0, catalog: list = None) -> dict:
+def match_and_price(result_json: dict, csv_path: str = 'backend/data/sample.csv', approval_threshold: float = 500.0, catalog=None) -> dict:
     """
-    Match product IDs from `result_json` to the CSV data, calculate per-item and total prices,
+    Match product IDs from `result_json` to the catalog, calculate per-item and total prices,
     and set `requireApproval` if total exceeds `approval_threshold`.
 
-    - tolerant matching using exact match (normalized) then fuzzy matching via difflib.
+    - `catalog` may be a prebuilt CatalogIndex (preferred, no per-call work) or a list of rows;
+      without it the CSV at `csv_path` is loaded once per file version.
+    - tolerant matching using exact match (normalized) then fuzzy matching via the
+      catalog's precomputed ID index (same 0.6 cutoff as difflib, without a linear scan).
+    - entries may carry the product name as a third element ([id, anzahl, name]); when the
+      ID matches nothing plausible, the name is resolved through the catalog's token index
+      (most shared tokens first, then cheapest).
     - missing products tolerated: included with price 0 and matched=False.
 
     Returns a dict: {"total": float, "requireApproval": bool, "items": [ ... ]}
     """
 
-    # build map from provided catalog (list of dicts) or from CSV file
-    material_map = {}
-    if catalog:
-        for row in catalog:
-            key = str(row.get('artikel_id', '')).strip().upper()
-            if not key:
-                continue
-            try:
-                row_price = float(row.get('preis_eur') or 0)
-            except Exception:
-                row_price = 0.0
-            # copy row to avoid mutating original
-            r = dict(row)
-            r['preis_eur'] = row_price
-            material_map[key] = r
+    if catalog is not None:
+        index = CatalogIndex.from_catalog(catalog)
     else:
-        try:
-            with open(csv_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    key = row.get('artikel_id', '').strip().upper()
-                    if not key:
-                        continue
-                    # normalize numeric price
-                    try:
-                        row['preis_eur'] = float(row.get('preis_eur') or 0)
-                    except Exception:
-                        row['preis_eur'] = 0.0
-                    material_map[key] = row
-        except FileNotFoundError:
-            material_map = {}
+        index = load_catalog_csv(csv_path)
 
     items_out = []
     total = 0.0
@@ -165,8 +517,6 @@ def match_and_price(result_json: dict, csv_path: str = 'backend/data/sample.csv'
     if not materials:
         return {"total": 0.0, "requireApproval": False, "items": []}
 
-    available_keys = list(material_map.keys())
-
     for entry in materials:
         try:
             artikel_id_raw, anzahl_raw = entry[0], entry[1]
@@ -176,6 +526,8 @@ def match_and_price(result_json: dict, csv_path: str = 'backend/data/sample.csv'
 
         artikel_id = str(artikel_id_raw).strip()
         key = artikel_id.upper()
+        # optional third element: the product name as the model saw it in the catalog
+        name = str(entry[2]).strip() if len(entry) > 2 and entry[2] else ''
 
         # parse amount
         try:
@@ -186,18 +538,28 @@ def match_and_price(result_json: dict, csv_path: str = 'backend/data/sample.csv'
             except Exception:
                 anzahl = 0
 
-        matched = False
-        product = material_map.get(key)
+        product = index.by_id.get(key)
+        match_type = 'exact' if product else None
+        fuzzy_key = None
 
-        if not product and available_keys:
-            # try fuzzy match
-            close = difflib.get_close_matches(key, available_keys, n=1, cutoff=0.6)
-            if close:
-                product = material_map.get(close[0])
-                matched = True
+        if not product:
+            # try fuzzy match; trust it unless the given name clearly points elsewhere
+            fuzzy_key = index.closest_id(key, cutoff=0.6)
+            if fuzzy_key and (not name or index.name_index.shares_tokens(name, fuzzy_key)):
+                key, product, match_type = fuzzy_key, index.by_id[fuzzy_key], 'fuzzy_id'
+                fuzzy_key = None
+
+        if not product and name:
+            # ID is made up: resolve the product by name instead of another LLM round trip
+            name_key = index.match_name(name)
+            if name_key:
+                key, product, match_type = name_key, index.by_id[name_key], 'name'
+
+        if not product and fuzzy_key:
+            key, product, match_type = fuzzy_key, index.by_id[fuzzy_key], 'fuzzy_id'
 
         if product:
-            preis_stk = float(product.get('preis_eur') or 0.0)
+            preis_stk = index.prices[key]
             preis_gesamt = round(anzahl * preis_stk, 2)
             total += preis_gesamt
             lagerbestand = int(product.get('lagerbestand', 0))
@@ -217,6 +579,7 @@ def match_and_price(result_json: dict, csv_path: str = 'backend/data/sample.csv'
                 'is_preferred': product.get('is_preferred', False),  # Preferred supplier
                 'lead_time_days': product.get('lead_time_days', 7),  # Delivery lead time
                 'matched': True,
+                'match_type': match_type,  # exact | fuzzy_id | name
             }
         else:
             # unknown product, include minimal info
@@ -235,6 +598,7 @@ def match_and_price(result_json: dict, csv_path: str = 'backend/data/sample.csv'
                 'is_preferred': False,
                 'lead_time_days': 7,
                 'matched': False,
+                'match_type': None,
             }
 
         items_out.append(item)
@@ -244,13 +608,18 @@ def match_and_price(result_json: dict, csv_path: str = 'backend/data/sample.csv'
 
     return {"total": total, "requireApproval": require_approval, "items": items_out}
 
-def clean_voice_transcript(raw_text: str) -> str:
+def clean_voice_transcript(raw_text: str, llm_fallback: bool = False) -> str:
     """
-    Uses Claude to clean up raw voice-to-text input, removing filler words
-    and extracting the core intent.
+    Clean up raw voice-to-text input, removing filler words and extracting the core intent.
+
+    The rule-based transcript_normalizer handles it locally. Only with llm_fallback and a
+    transcript it flags as long or messy (self-corrections) is Claude asked instead, on
+    the small model ("clean_transcript" route); an empty, cut-off or rambling result is
+    redone on the large one.
     """
-    api_key = secrets.get('API_KEY')
-    client = anthropic.Anthropic(api_key=api_key)
+    local = normalize_transcript(raw_text)
+    if not (llm_fallback and local.flags):
+        return local.text or raw_text
 
     prompt = f"""You are a helpful assistant. Clean up this raw voice transcription for a construction procurement app. 
     Remove filler words (um, uh, like), greetings, and politeness markers. 
@@ -260,48 +629,237 @@ def clean_voice_transcript(raw_text: str) -> str:
     
     RETURN: ONLY the cleaned text string. Do not add quotes."""
 
+    def validate(message) -> str:
+        cleaned_text = _reply_text(message)
+        if not cleaned_text:
+            raise ValueError("empty transcript")
+        if getattr(message, 'stop_reason', None) == 'max_tokens':
+            raise ValueError("transcript cut off")
+        if len(cleaned_text) > 2 * len(raw_text) + 40:
+            # cleaning only removes words: a much longer reply is commentary, not the transcript
+            raise ValueError("transcript longer than the input")
+        return cleaned_text
+
     try:
-        message = client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=1000,
-            messages=[{"role": "user", "content": prompt}]
+        cleaned_text, _, _ = _routed_create(
+            "clean_transcript", {"messages": [{"role": "user", "content": prompt}]}, validate
         )
-        # Extract text safely
-        if hasattr(message.content[0], 'text'):
-            cleaned_text = message.content[0].text.strip()
-        else:
-            cleaned_text = str(message.content[0]).strip()
         return cleaned_text
+    except (RequestCancelled, DeadlineExceeded):
+        raise
     except Exception as e:
         print(f"Error cleaning text: {e}")
-        return raw_text
+        return local.text or raw_text
 
 
-def chat_procurement_request(messages: list, c_materials_data: list) -> dict:
+def chat_procurement_request(messages: list, c_materials_data, top_k: int = None, catalog_format: str = 'json_pretty', fast_path: bool = False, context: dict = None) -> dict:
     """
     Process a conversational procurement request. AI will either ask clarifying 
     questions or return final recommendations.
+
+    The small "chat_decision" model opens the turn (seeing only the candidates' names, see
+    _decision_request); only when it moves on to recommendations does the large
+    "chat_selection" model write the selection with the catalog.
     
     Args:
         messages: List of {"role": "user"|"assistant", "content": "..."} 
-        c_materials_data: List of available C-materials (JSON data)
+        c_materials_data: CatalogIndex (or list) of available C-materials
+        top_k: Only send the top-K catalog rows retrieved for the user's turns (None = whole catalog)
+        catalog_format: Prompt serialization of the catalog (see PROMPT_SERIALIZERS, or 'auto')
+        fast_path: Answer a fully specified opening request locally, without calling Claude
+        context: Catalog context of a server-side chat session (see session_store), reused
+            and filled in across turns; None for a stateless request
     
     Returns:
         dict with either:
         - {"type": "question", "content": "clarifying question text"}
         - {"type": "recommendations", "content": {...materials data...}}
     """
-    api_key = secrets.get('API_KEY')
-    client = anthropic.Anthropic(api_key=api_key)
-    
-    materials_json = json.dumps(c_materials_data, ensure_ascii=False, indent=2)
+    catalog = CatalogIndex.from_catalog(c_materials_data)
+    fast_result = _chat_fast_path(messages, catalog) if fast_path else None
+    if fast_result is not None:
+        return fast_result
+
+    request, prompt_meta = _chat_request(messages, catalog, top_k, catalog_format, context)
     
-    system_prompt = f"""You are a helpful construction procurement assistant. Your job is to help workers order the right materials.
+    try:
+        question = _chat_decision(_decision_request(request, messages, catalog, top_k, context), catalog, prompt_meta)
+        if question is not None:
+            return question
+
+        parsed, response, model = _routed_create(
+            "chat_selection", request, lambda message: parse_response(_reply_text(message))
+        )
+        prompt_meta['prompt_cache'] = prompt_cache_meta(response)
+        prompt_meta['model'] = model
+        
+        print(f"Chat response: {_reply_text(response)}")
+        return _chat_result(parsed, catalog, prompt_meta)
+            
+    except (RequestCancelled, DeadlineExceeded):
+        raise  # the request is over: no answer to send
+    except Exception as e:
+        print(f"Error in chat: {e}")
+        return {"type": "error", "content": str(e)}
+
+
+def stream_chat_procurement_request(messages: list, c_materials_data, top_k: int = None, catalog_format: str = 'json_pretty', fast_path: bool = False, context: dict = None):
+    """
+    Streaming variant of chat_procurement_request.
+
+    Yields (event, data) pairs: ("item", priced item) for every recommended material as soon
+    as the model has written its entry, then ("done", <the chat_procurement_request result>).
+    """
+    catalog = CatalogIndex.from_catalog(c_materials_data)
+    fast_result = _chat_fast_path(messages, catalog) if fast_path else None
+    if fast_result is not None:
+        for item in fast_result['content']['items']:
+            yield 'item', item
+        yield 'done', fast_result
+        return
+
+    request, prompt_meta = _chat_request(messages, catalog, top_k, catalog_format, context)
 
-Here is the available C-materials catalog:
-{materials_json}
+    try:
+        question = _chat_decision(_decision_request(request, messages, catalog, top_k, context), catalog, prompt_meta)
+        if question is not None:
+            yield 'done', question
+            return
+
+        parser, final = yield from _stream_reply("chat_selection", request, catalog)
+        prompt_meta['prompt_cache'] = prompt_cache_meta(final)
+        prompt_meta['model'] = MODEL_ROUTES["chat_selection"]["model"]
+
+        print(f"Chat response: {parser.text.strip()}")
+        result = _chat_result(parser.result(), catalog, prompt_meta)
+    except (RequestCancelled, DeadlineExceeded):
+        raise  # the request is over: no answer to send
+    except Exception as e:
+        print(f"Error in chat: {e}")
+        result = {"type": "error", "content": str(e)}
+    yield 'done', result
+
+
+def _decision_request(request: dict, messages: list, catalog: CatalogIndex, top_k: int, context: dict = None) -> dict:
+    """
+    Request for the "chat_decision" model: the conversation of the chat `request`, with the
+    candidates' names instead of the catalog block. The prompt cache is per model, so the
+    catalog sent to both models would be paid for twice; the names are enough to decide
+    whether to ask.
+    """
+    rows = _chat_candidates(messages, catalog, top_k, context)
+    names = "\n".join(f"- {row.get('artikelname', '')}" for row in rows)
+    system = f"""You open a turn of a construction procurement chat: decide whether the worker's request needs a clarifying question.
 
-WORKFLOW:
+Products available for this request:
+{names}
+
+If the request is ambiguous (e.g. "screws" without size, "gloves" without size) and the products differ in what is missing, respond with ONLY:
+QUESTION: <ONE brief question, e.g. "What screw size: M4x20 or M4x25?">
+
+If the request is clear enough, only one product fits, or 2 questions were asked already, respond with ONLY:
+READY"""
+    if context and context.get('summary'):
+        system += f"\n\nEarlier in this conversation (condensed):\n{context['summary']}"
+    return {"system": system, "messages": request["messages"]}
+
+
+def _chat_decision(request: dict, catalog: CatalogIndex, prompt_meta: dict):
+    """
+    Let the "chat_decision" model open a chat turn (`request`: see _decision_request).
+
+    Returns its clarifying question as the turn's result, or None when the turn needs a
+    catalog selection. The reply is streamed and closed as soon as it cannot be a
+    QUESTION any more, so the small model's own selection is never generated in full.
+    A question that fails validation (empty, cut off) is escalated: the selection
+    model then answers the whole turn.
+    """
+    route = MODEL_ROUTES["chat_decision"]
+    if route["model"] == MODEL_ROUTES["chat_selection"]["model"]:
+        return None  # one model for both: a single call answers the turn
+
+    request = routed_request("chat_decision", request)
+    parser = ResponseParser()
+    final = None
+    start = time.perf_counter()
+    with get_client().messages.stream(**request) as stream:
+        for delta in stream.text_stream:
+            check_scope()
+            parser.feed(delta)
+            if parser.is_question is False:
+                break  # recommendations: the selection model writes those
+        else:
+            final = stream.get_final_message()
+
+    if final is None:
+        # stopped early: no final usage, estimate what was sent and generated
+        usage = SimpleNamespace(input_tokens=estimate_request_tokens(request), output_tokens=estimate_tokens(parser.text))
+        _record_model_call("chat_decision", request["model"], time.perf_counter() - start, usage, stopped_early=True)
+        _record_routing("chat_decision", "handoffs")
+        return None
+    _record_model_call("chat_decision", request["model"], time.perf_counter() - start, final.usage)
+
+    parsed = parser.result()
+    if parsed['type'] != 'question' or not parsed['content'] or getattr(final, 'stop_reason', None) == 'max_tokens':
+        print(f"chat_decision: {request['model']} reply failed validation, escalating to {route['escalate']}")
+        _record_routing("chat_decision", "escalations")
+        return None
+
+    print(f"Chat response: {parser.text.strip()}")
+    prompt_meta['prompt_cache'] = prompt_cache_meta(final)
+    prompt_meta['model'] = request["model"]
+    return _chat_result(parsed, catalog, prompt_meta)
+
+
+def _chat_fast_path(messages: list, catalog: CatalogIndex):
+    """Recommendations for a fully specified opening request, or None (ask Claude)."""
+    user_turns = [m["content"] for m in messages if m["role"] == "user"]
+    # later turns answer Claude's questions ("Gr.10", "10 Paar") and need the conversation
+    if len(user_turns) != 1:
+        return None
+    selection, fast_meta = try_fast_path(user_turns[0], catalog)
+    if selection is None:
+        return None
+    return _chat_result({'type': 'json', 'content': selection}, catalog, fast_meta)
+
+
+def _chat_candidates(messages: list, catalog: CatalogIndex, top_k: int, context: dict = None) -> list:
+    """
+    Catalog rows for a chat: retrieved over all user turns, or the session's stored set
+    plus the rows the latest user turn adds.
+    """
+    user_turns = [m["content"] for m in messages if m["role"] == "user"]
+    if context is not None and context.get('catalog_version') == catalog.version and 'candidate_ids' in context:
+        ids = context['candidate_ids']
+        if ids is None:
+            return catalog.rows
+        rows = [catalog.by_id[k] for k in ids if k in catalog.by_id]
+        # products first named in this turn ("4x40 und 10 Paar Arbeitshandschuhe") join the set
+        # at its end: the rows before keep their place, so the catalog block's prefix is unchanged
+        known = set(ids)
+        latest = user_turns[-1] if user_turns else ""
+        rows += [row for row in catalog.retriever.top_k(latest, top_k)
+                 if normalize_id(row.get('artikel_id')) not in known]
+    else:
+        rows = catalog.candidates(" ".join(user_turns), top_k)
+    if context is not None:
+        context['catalog_version'] = catalog.version
+        context['candidate_ids'] = None if rows is catalog.rows else [normalize_id(r.get('artikel_id')) for r in rows]
+    return rows
+
+
+def _chat_request(messages: list, catalog: CatalogIndex, top_k: int, catalog_format: str, context: dict = None) -> tuple:
+    """(request kwargs without model and max_tokens - see routed_request, prompt metadata) for a chat turn."""
+    rows = _chat_candidates(messages, catalog, top_k, context)
+    materials_text, prompt_meta = serialize_catalog(catalog, rows, catalog_format)
+    
+    catalog_block = cached_catalog_block(
+        "You are a helpful construction procurement assistant. Your job is to help workers order the right materials.",
+        materials_text,
+        prompt_meta
+    )
+    
+    workflow_prompt = f"""WORKFLOW:
 1. When a user requests materials, check if the request is specific enough
 2. If the request is ambiguous (e.g. "screws" without size, "gloves" without size), ask ONE brief clarifying question
 3. If the request is clear enough, provide the final material recommendations
@@ -319,7 +877,7 @@ QUESTION: <your brief question>
 If ready to recommend, respond with ONLY a JSON object:
 {{
     "materials": [
-        ["artikel_id", quantity],
+        ["artikel_id", quantity, "artikelname"],
         ...
     ],
     "explanation": "Brief explanation"
@@ -335,61 +893,39 @@ Remember: Be conversational but efficient. Construction workers are busy!"""
             "content": msg["content"]
         })
     
-    try:
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=2000,
-            system=system_prompt,
-            messages=claude_messages
-        )
-        
-        response_text = response.content[0].text.strip()
-        print(f"Chat response: {response_text}")
+    system = [catalog_block, {"type": "text", "text": workflow_prompt}]
+    if context and context.get('summary'):
+        # exchanges the session dropped from the history to stay within its token budget
+        system.append({"type": "text", "text": f"Earlier in this conversation (condensed):\n{context['summary']}"})
+
+    request = {
+        "system": system,
+        "messages": claude_messages,
+    }
+    return request, prompt_meta
+
+
+def _chat_result(parsed: dict, catalog: CatalogIndex, prompt_meta: dict) -> dict:
+    """Turn a parsed chat/image reply (see llm_parser.parse_response) into a question or priced recommendations."""
+    if parsed['type'] == 'json':
+        result = parsed['content']
+        if parsed.get('recovered'):
+            prompt_meta['response_recovered'] = parsed['recovered']
         
-        # Check if it's a question
-        if response_text.upper().startswith("QUESTION:"):
-            question = response_text[9:].strip()
-            return {"type": "question", "content": question}
+        # Enrich with pricing
+        detailed = match_and_price(result, catalog=catalog, approval_threshold=500.0)
+        detailed_output = {
+            'explanation': result.get('explanation', ''),
+            **detailed,
+        }
         
-        # Try to parse as JSON (final recommendations)
-        try:
-            # Extract JSON from response
-            json_text = response_text
-            if "```json" in json_text:
-                start = json_text.find("```json") + 7
-                end = json_text.find("```", start)
-                json_text = json_text[start:end].strip()
-            elif "```" in json_text:
-                start = json_text.find("```") + 3
-                end = json_text.find("```", start)
-                json_text = json_text[start:end].strip()
-            elif "{" in json_text:
-                first = json_text.find("{")
-                last = json_text.rfind("}")
-                if first != -1 and last != -1:
-                    json_text = json_text[first:last+1]
-            
-            result = json.loads(json_text)
-            
-            # Enrich with pricing
-            detailed = match_and_price(result, catalog=c_materials_data, approval_threshold=500.0)
-            detailed_output = {
-                'explanation': result.get('explanation', ''),
-                **detailed,
-            }
-            
-            return {"type": "recommendations", "content": detailed_output}
-            
-        except json.JSONDecodeError:
-            # If it's not valid JSON, treat it as a question/response
-            return {"type": "question", "content": response_text}
-            
-    except Exception as e:
-        print(f"Error in chat: {e}")
-        return {"type": "error", "content": str(e)}
+        return {"type": "recommendations", "content": detailed_output, "meta": prompt_meta}
+    
+    # A clarifying question, or a reply that is not JSON: show it as the assistant's answer
+    return {"type": "question", "content": parsed['content'], "meta": prompt_meta}
 
 
-def analyze_image_request(image_base64: str, media_type: str, messages: list, c_materials_data: list) -> dict:
+def analyze_image_request(image_base64: str, media_type: str, messages: list, c_materials_data, top_k: int = None, catalog_format: str = 'json_pretty', image_cache=None) -> dict:
     """
     Analyze an uploaded image (handwritten list or photo of parts) and have a conversation
     to clarify and recommend products.
@@ -398,28 +934,172 @@ def analyze_image_request(image_base64: str, media_type: str, messages: list, c_
         image_base64: Base64 encoded image data
         media_type: MIME type (e.g., "image/jpeg", "image/png")
         messages: Conversation history
-        c_materials_data: Available products catalog
+        c_materials_data: CatalogIndex (or list) of available products
+        top_k: Only send the top-K catalog rows retrieved for the conversation so far (None = whole catalog)
+        catalog_format: Prompt serialization of the catalog (see PROMPT_SERIALIZERS, or 'auto')
+        image_cache: Optional ImageAnalysisCache: an opening turn on a near-duplicate of an
+            earlier image reuses that analysis (a selection is re-priced from the live catalog)
     
     Returns:
         dict with either:
         - {"type": "question", "content": "clarifying question"}
         - {"type": "recommendations", "content": {...}}
     """
-    api_key = secrets.get('API_KEY')
-    client = anthropic.Anthropic(api_key=api_key)
+    catalog = CatalogIndex.from_catalog(c_materials_data)
+    image_hash, prompt_key, cached = _cached_analysis(image_cache, image_base64, messages, catalog, top_k, catalog_format)
+    if cached is not None:
+        return cached
+    request, prompt_meta = _image_request(image_base64, media_type, messages, catalog, top_k, catalog_format)
     
-    materials_json = json.dumps(c_materials_data, ensure_ascii=False, indent=2)
+    try:
+        parsed, response, model = _routed_create(
+            "image", request, lambda message: parse_response(_reply_text(message))
+        )
+        _store_analysis(image_cache, image_hash, prompt_key, parsed, prompt_meta)
+        
+        prompt_meta['prompt_cache'] = prompt_cache_meta(response)
+        prompt_meta['model'] = model
+        
+        print(f"Image analysis response: {_reply_text(response)}")
+        return _chat_result(parsed, catalog, prompt_meta)
+            
+    except (RequestCancelled, DeadlineExceeded):
+        raise  # the request is over: no answer to send
+    except Exception as e:
+        print(f"Error in image analysis: {e}")
+        return {"type": "error", "content": str(e)}
+
+
+def stream_analyze_image_request(image_base64: str, media_type: str, messages: list, c_materials_data, top_k: int = None, catalog_format: str = 'json_pretty', image_cache=None):
+    """
+    Streaming variant of analyze_image_request.
+
+    Yields (event, data) pairs: ("item", priced item) for every recommended material as soon
+    as the model has written its entry, then ("done", <the analyze_image_request result>).
+    On an image cache hit all items are yielded at once.
+    """
+    catalog = CatalogIndex.from_catalog(c_materials_data)
+    image_hash, prompt_key, cached = _cached_analysis(image_cache, image_base64, messages, catalog, top_k, catalog_format)
+    if cached is not None:
+        if cached['type'] == 'recommendations':
+            for item in cached['content']['items']:
+                yield 'item', item
+        yield 'done', cached
+        return
+    request, prompt_meta = _image_request(image_base64, media_type, messages, catalog, top_k, catalog_format)
+
+    try:
+        parser, final = yield from _stream_reply("image", request, catalog)
+        parsed = parser.result()
+        _store_analysis(image_cache, image_hash, prompt_key, parsed, prompt_meta)
+        prompt_meta['prompt_cache'] = prompt_cache_meta(final)
+        prompt_meta['model'] = MODEL_ROUTES["image"]["model"]
+
+        print(f"Image analysis response: {parser.text.strip()}")
+        result = _chat_result(parsed, catalog, prompt_meta)
+    except (RequestCancelled, DeadlineExceeded):
+        raise  # the request is over: no answer to send
+    except Exception as e:
+        print(f"Error in image analysis: {e}")
+        result = {"type": "error", "content": str(e)}
+    yield 'done', result
+
+
+# opening message of every image of an /analyze_images batch: its materials go into one
+# merged order, so there is nobody to answer a clarifying question per photo
+BATCH_IMAGE_PROMPT = """This photo is one of several taken for the same job (shelves, pages of a list).
+Identify the materials it shows and respond with ONLY the JSON object of catalog materials and quantities.
+Do not ask questions: make reasonable choices."""
+
+
+def batch_image_prompt(note: str = None) -> str:
+    """Opening message for each image of a batch, with the foreman's note for all of them."""
+    return f"{BATCH_IMAGE_PROMPT}\nForeman's note: {note}" if note else BATCH_IMAGE_PROMPT
+
+
+def merge_image_results(results: list, c_materials_data) -> dict:
+    """
+    One order from the recommendations for several images: quantities summed per artikel_id
+    (as each image's entries were matched to the catalog) and priced once more by match_and_price.
+
+    Args:
+        results: analyze_image_request results, one per image (questions and errors are skipped)
+        c_materials_data: CatalogIndex (or list) of available products
+
+    Returns:
+        dict with 'explanation', 'total', 'requireApproval' and 'items'; every item lists the
+        'images' (indices into `results`) it was found on
+    """
+    catalog = CatalogIndex.from_catalog(c_materials_data)
+    merged = OrderedDict()  # normalized artikel_id -> [artikel_id, anzahl, artikelname]
+    found_on = {}
+    explanations = []
+    for index, result in enumerate(results):
+        if result.get('type') != 'recommendations':
+            continue
+        content = result['content']
+        if content.get('explanation'):
+            explanations.append(f"Image {index + 1}: {content['explanation']}")
+        for item in content.get('items', []):
+            key = normalize_id(item['artikel_id'])
+            entry = merged.setdefault(key, [item['artikel_id'], 0, item.get('artikelname', '')])
+            entry[1] += item.get('anzahl', 0)
+            found_on.setdefault(key, []).append(index)
+
+    detailed = match_and_price({'materials': list(merged.values())}, catalog=catalog, approval_threshold=500.0)
+    for item, key in zip(detailed['items'], merged):
+        item['images'] = sorted(set(found_on[key]))
+    return {'explanation': "\n".join(explanations), **detailed}
+
+
+def _cached_analysis(image_cache, image_base64: str, messages: list, catalog: CatalogIndex, top_k: int, catalog_format: str) -> tuple:
+    """
+    (image hash, prompt key, cached result or None) for an image turn. Only an opening turn
+    (the image and one user message) is looked up; hash and key are None otherwise.
+    """
+    if image_cache is None or len(messages) > 1:
+        return None, None, None
+    image_hash = perceptual_hash(base64.b64decode(image_base64))
+    opening_text = messages[0]["content"] if messages else ""
+    prompt_key = image_cache.prompt_key(opening_text, catalog.assortment_version, top_k, catalog_format)
+    cached = image_cache.get(image_hash, prompt_key)
+    if cached is None:
+        return image_hash, prompt_key, None
+    value, distance = cached
+    prompt_meta = dict(value['meta'], image_cache={'status': 'hit', 'distance': distance})
+    return image_hash, prompt_key, _chat_result(dict(value['parsed']), catalog, prompt_meta)
+
+
+def _store_analysis(image_cache, image_hash, prompt_key: str, parsed: dict, prompt_meta: dict) -> None:
+    if prompt_key is None or not parsed.get('content'):
+        return
+    # the model's reading of the image, not its pricing: a hit is matched to the live catalog
+    image_cache.set(image_hash, prompt_key, {
+        'parsed': {'type': parsed['type'], 'content': parsed['content']},
+        'meta': dict(prompt_meta),
+    })
+    prompt_meta['image_cache'] = {'status': 'miss'}
+
+
+def _image_request(image_base64: str, media_type: str, messages: list, catalog: CatalogIndex, top_k: int, catalog_format: str) -> tuple:
+    """(request kwargs without model and max_tokens - see routed_request, prompt metadata) for an image turn."""
+    # the assistant's first description of the image is the best retrieval query we have;
+    # before it exists nothing matches and the whole catalog is sent. Later turns reuse the
+    # same row set so the catalog block stays byte-identical, i.e. prompt-cached
+    opening_text = " ".join(m["content"] for m in messages[:2])
+    materials_text, prompt_meta = serialize_catalog(catalog, catalog.candidates(opening_text, top_k), catalog_format)
     
-    system_prompt = f"""You are a helpful construction procurement assistant with vision capabilities.
+    catalog_block = cached_catalog_block(
+        """You are a helpful construction procurement assistant with vision capabilities.
 
 You can analyze:
 1. HANDWRITTEN LISTS - Shopping lists, notes with items to order
-2. PHOTOS OF PARTS - Images of screws, tools, materials that need to be identified and ordered
-
-Available C-materials catalog:
-{materials_json}
-
-WORKFLOW:
+2. PHOTOS OF PARTS - Images of screws, tools, materials that need to be identified and ordered""",
+        materials_text,
+        prompt_meta
+    )
+    
+    workflow_prompt = f"""WORKFLOW:
 1. First, describe what you see in the image clearly
 2. If it's a handwritten list, read and transcribe the items
 3. If it's a photo of parts, identify what they are
@@ -438,7 +1118,7 @@ Format your response with bullet points for clarity:
 If ready to recommend, respond with ONLY a JSON object:
 {{
     "materials": [
-        ["artikel_id", quantity],
+        ["artikel_id", quantity, "artikelname"],
         ...
     ],
     "explanation": "Brief explanation of what was identified and ordered"
@@ -462,7 +1142,9 @@ Keep responses SHORT and use bullet points. Construction workers are busy!"""
                             "type": "base64",
                             "media_type": media_type,
                             "data": image_base64
-                        }
+                        },
+                        # the image is the bulk of every turn's prompt: cache it with the catalog
+                        "cache_control": {"type": "ephemeral"}
                     },
                     {
                         "type": "text",
@@ -488,7 +1170,8 @@ Keep responses SHORT and use bullet points. Construction workers are busy!"""
                         "type": "base64",
                         "media_type": media_type,
                         "data": image_base64
-                    }
+                    },
+                    "cache_control": {"type": "ephemeral"}
                 },
                 {
                     "type": "text",
@@ -497,57 +1180,11 @@ Keep responses SHORT and use bullet points. Construction workers are busy!"""
             ]
         })
     
-    try:
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=2000,
-            system=system_prompt,
-            messages=claude_messages
-        )
-        
-        response_text = response.content[0].text.strip()
-        print(f"Image analysis response: {response_text}")
-        
-        # Check if it's a question/description
-        if response_text.upper().startswith("QUESTION:"):
-            question = response_text[9:].strip()
-            return {"type": "question", "content": question}
-        
-        # Try to parse as JSON (final recommendations)
-        try:
-            json_text = response_text
-            if "```json" in json_text:
-                start = json_text.find("```json") + 7
-                end = json_text.find("```", start)
-                json_text = json_text[start:end].strip()
-            elif "```" in json_text:
-                start = json_text.find("```") + 3
-                end = json_text.find("```", start)
-                json_text = json_text[start:end].strip()
-            elif "{" in json_text:
-                first = json_text.find("{")
-                last = json_text.rfind("}")
-                if first != -1 and last != -1:
-                    json_text = json_text[first:last+1]
-            
-            result = json.loads(json_text)
-            
-            # Enrich with pricing
-            detailed = match_and_price(result, catalog=c_materials_data, approval_threshold=500.0)
-            detailed_output = {
-                'explanation': result.get('explanation', ''),
-                **detailed,
-            }
-            
-            return {"type": "recommendations", "content": detailed_output}
-            
-        except json.JSONDecodeError:
-            # If not valid JSON, treat as question/description
-            return {"type": "question", "content": response_text}
-            
-    except Exception as e:
-        print(f"Error in image analysis: {e}")
-        return {"type": "error", "content": str(e)}
+    request = {
+        "system": [catalog_block, {"type": "text", "text": workflow_prompt}],
+        "messages": claude_messages,
+    }
+    return request, prompt_meta
 
 
 # Example usage
@@ -0,0 +1,51 @@
+"""
+Tiered cache for LLM procurement answers.
+
+Tier 1 is an in-memory LRU with TTL; tier 2 (optional) is a SQLite file that
+survives restarts (see TTLStore). Only the model's selection (materials + explanation) is
+cached - prices and stock are always re-applied from the live catalog by
+match_and_price, so a hit is never stale on price.
+"""
+import hashlib
+import json
+import re
+import unicodedata
+
+from backend.utils.ttl_store import TTLStore
+
+
+_SPACE_RE = re.compile(r"\s+")
+_EDGE_PUNCT = " .,!?;:\"'"
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case-, whitespace- and edge-punctuation-insensitive form of a foreman's prompt."""
+    text = unicodedata.normalize('NFKC', str(prompt or '')).lower()
+    return _SPACE_RE.sub(' ', text).strip(_EDGE_PUNCT)
+
+
+def make_key(prompt: str, catalog_version: str, *variant) -> str:
+    """Cache key from the normalized prompt, the catalog version and any prompt-shaping options."""
+    payload = json.dumps([normalize_prompt(prompt), catalog_version, *variant], ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache(TTLStore):
+    """
+    LRU + TTL cache of JSON-serializable values, optionally backed by SQLite (see TTLStore).
+
+    Args:
+        max_entries: In-memory capacity (least recently used entries are evicted)
+        ttl_seconds: Lifetime of an entry in both tiers
+        sqlite_path: File for the persistent tier, or None for memory only
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 6 * 3600, sqlite_path: str = None):
+        super().__init__(max_entries, ttl_seconds, sqlite_path, table="response_cache")
+
+    def stats(self) -> dict:
+        """Hit ratio and memory footprint (bytes of cached JSON) for /metrics."""
+        stats = super().stats()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
@@ -0,0 +1,102 @@
+"""
+Local lexical retrieval over the catalog (BM25), used to send only the top-K
+candidate rows to the model instead of the whole catalog.
+
+German compounds name one product many ways ("Arbeitshandschuhe", "Handschuhe"), so
+a query word also matches, at PART_WEIGHT, catalog words it starts or ends (and
+catalog words that start or end it) with at least MIN_PART_CHARS letters.
+"""
+import heapq
+import math
+
+from backend.utils.name_index import tokenize
+
+
+# weight of a word-part match relative to a whole-token match, and the shortest part
+PART_WEIGHT = 0.5
+MIN_PART_CHARS = 4
+
+
+class BM25Retriever:
+    """
+    Okapi BM25 over selected catalog fields, built once per catalog version.
+
+    Args:
+        rows: Catalog rows (CatalogIndex.rows)
+        fields: Row fields that make up a row's document
+        k1, b: Standard BM25 parameters
+    """
+
+    FIELDS = ('artikelname', 'kategorie', 'lieferant', 'typische_baustelle')
+
+    def __init__(self, rows: list, fields: tuple = FIELDS, k1: float = 1.5, b: float = 0.75):
+        self.rows = rows
+        self.k1 = k1
+        self.b = b
+        self.postings = {}  # token -> [(row position, term frequency)]
+        self.parts = {}     # leading/trailing part of a token -> tokens it is part of
+        self.doc_len = []
+
+        for pos, row in enumerate(rows):
+            tokens = []
+            for field in fields:
+                tokens.extend(tokenize(row.get(field, '')))
+            self.doc_len.append(len(tokens))
+            tf = {}
+            for token in tokens:
+                tf[token] = tf.get(token, 0) + 1
+            for token, freq in tf.items():
+                self.postings.setdefault(token, []).append((pos, freq))
+
+        for token in self.postings:
+            for part in _parts(token):
+                self.parts.setdefault(part, []).append(token)
+
+        n = len(rows)
+        self.avg_len = (sum(self.doc_len) / n) if n else 0.0
+        self.idf = {
+            token: math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for token, plist in self.postings.items()
+        }
+
+    def _query_weights(self, query: str) -> dict:
+        """Catalog token -> weight for `query`: its own tokens 1, word-part matches PART_WEIGHT."""
+        weights = {}
+        for token in set(tokenize(query)):
+            if token in self.postings:
+                weights[token] = 1.0
+            for match in self.parts.get(token, ()):
+                weights.setdefault(match, PART_WEIGHT)
+            for part in _parts(token):
+                if part in self.postings:
+                    weights.setdefault(part, PART_WEIGHT)
+        return weights
+
+    def scores(self, query: str) -> dict:
+        """Row position -> BM25 score for every row sharing a token or word part with `query`."""
+        scores = {}
+        k1, b, avg_len = self.k1, self.b, self.avg_len or 1.0
+        for token, weight in self._query_weights(query).items():
+            plist = self.postings[token]
+            idf = self.idf[token] * weight
+            for pos, freq in plist:
+                norm = k1 * (1 - b + b * self.doc_len[pos] / avg_len)
+                scores[pos] = scores.get(pos, 0.0) + idf * freq * (k1 + 1) / (freq + norm)
+        return scores
+
+    def top_k(self, query: str, k: int) -> list:
+        """Up to `k` best matching rows, best first (empty if nothing matches)."""
+        scores = self.scores(query)
+        best = heapq.nlargest(k, scores.items(), key=lambda kv: kv[1])
+        return [self.rows[pos] for pos, _ in best]
+
+
+def _parts(token: str) -> set:
+    """
+    Leading and trailing parts of a word `token` (at least MIN_PART_CHARS, not the token
+    itself); none for sizes and model numbers, where "M10" is no part of "M100".
+    """
+    if not token.isalpha():
+        return set()
+    ends = range(MIN_PART_CHARS, len(token))
+    return {token[:end] for end in ends} | {token[-end:] for end in ends}
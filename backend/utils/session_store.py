@@ -0,0 +1,174 @@
+"""
+Server-side chat sessions.
+
+A session holds a conversation's history and the catalog context resolved for it
+(the rows retrieved for its user turns, see request_agent._chat_candidates), so
+a client sends only its new message each turn. Sessions are kept in a TTLStore (as
+ResponseCache entries are): an in-memory LRU whose entries expire `ttl_seconds` after
+the last turn, optionally backed by SQLite.
+
+Once the history exceeds its token budget, the oldest exchanges after the opening
+request are dropped and kept as one condensed line each in context["summary"],
+which goes into the system prompt instead. History plus summary therefore level off
+near 1.25 times the budget however long the conversation gets (the opening request
+and the latest exchange are always kept).
+"""
+import secrets
+import threading
+
+from backend.utils.request_agent import estimate_tokens
+from backend.utils.ttl_store import TTLStore
+
+
+# characters kept per condensed message, and the share of the history budget the
+# condensed lines may take (older lines are dropped beyond it)
+SUMMARY_LINE_CHARS = 100
+SUMMARY_BUDGET_SHARE = 0.25
+
+
+def _alternating(messages: list) -> list:
+    """user/assistant messages starting with a user turn, consecutive same-role turns merged."""
+    history = []
+    for msg in messages or []:
+        role, content = msg.get("role"), str(msg.get("content") or "").strip()
+        if role not in ("user", "assistant") or not content:
+            continue
+        if not history and role == "assistant":
+            continue
+        if history and history[-1]["role"] == role:
+            history[-1]["content"] += "\n" + content
+        else:
+            history.append({"role": role, "content": content})
+    return history
+
+
+def _condense(message: dict) -> str:
+    text = " ".join(message["content"].split())
+    if len(text) > SUMMARY_LINE_CHARS:
+        text = text[:SUMMARY_LINE_CHARS - 1] + "…"
+    return f"{message['role']}: {text}"
+
+
+def reply_text(result: dict) -> str:
+    """Assistant message to keep in the history for a chat result (question or recommendations)."""
+    if result.get("type") == "recommendations":
+        content = result.get("content") or {}
+        items = ", ".join(f"{item.get('anzahl')} × {item.get('artikelname', '')} ({item.get('artikel_id')})"
+                          for item in content.get("items", []))
+        explanation = content.get("explanation", "")
+        return f"{explanation}\nRecommended: {items}" if items else explanation
+    return str(result.get("content") or "")
+
+
+class SessionStore:
+    """
+    LRU + TTL store of chat sessions, optionally backed by SQLite.
+
+    A session is {"messages": [...], "context": {...}} (plus "unanswered" between
+    start_turn and finish_turn); get() returns a copy, so a turn that fails or is
+    cancelled before save() leaves the stored session untouched.
+
+    Args:
+        max_sessions: In-memory capacity (least recently used sessions are evicted)
+        ttl_seconds: Idle lifetime of a session (renewed by every save)
+        sqlite_path: File for the persistent tier, or None for memory only
+        history_token_budget: Estimated tokens of history sent per turn before old
+            exchanges are condensed
+    """
+
+    def __init__(self, max_sessions: int = 1024, ttl_seconds: float = 2 * 3600, sqlite_path: str = None,
+                 history_token_budget: int = 2000):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.history_token_budget = history_token_budget
+        self._store = TTLStore(max_sessions, ttl_seconds, sqlite_path, table="chat_sessions", key_column="session_id")
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "turns": 0, "condensed_messages": 0}
+
+    def create(self, messages: list = None) -> tuple:
+        """(session_id, session) for a new conversation, optionally seeded with earlier `messages`."""
+        session_id = secrets.token_urlsafe(16)
+        session = {"messages": _alternating(messages), "context": {}}
+        with self._lock:
+            self._stats["created"] += 1
+        return session_id, session
+
+    def get(self, session_id: str):
+        """Copy of the session stored under `session_id`, or None if unknown or expired."""
+        return self._store.get(session_id)
+
+    def save(self, session_id: str, session: dict) -> None:
+        """Store `session` in both tiers and renew its lifetime."""
+        self._store.set(session_id, session)
+
+    def delete(self, session_id: str) -> None:
+        self._store.delete(session_id)
+
+    def start_turn(self, session: dict, message: str) -> list:
+        """
+        Append the user's `message` to the session and keep the history within budget.
+
+        Returns:
+            The messages to send to the model for this turn
+        """
+        messages = session["messages"]
+        if messages and messages[-1]["role"] == "user":
+            # an earlier message is still unanswered: kept, so a failed turn only takes back the new text
+            session["unanswered"] = messages[-1]["content"]
+            messages[-1]["content"] += "\n" + message
+        else:
+            session.pop("unanswered", None)
+            messages.append({"role": "user", "content": message})
+
+        condensed = []
+        # keep the opening request and the latest exchange
+        while len(messages) > 3 and sum(estimate_tokens(m["content"]) for m in messages) > self.history_token_budget:
+            condensed += [_condense(m) for m in messages[1:3]]
+            del messages[1:3]
+        if condensed:
+            context = session["context"]
+            lines = context.get("summary", "").splitlines() + condensed
+            while len(lines) > 1 and sum(estimate_tokens(line) for line in lines) > \
+                    self.history_token_budget * SUMMARY_BUDGET_SHARE:
+                lines.pop(0)
+            context["summary"] = "\n".join(lines)
+            with self._lock:
+                self._stats["condensed_messages"] += len(condensed)
+        return [dict(m) for m in messages]
+
+    def finish_turn(self, session: dict, result: dict) -> None:
+        """
+        Record the assistant's answer to the turn; an error answer takes back the turn's message
+        instead (restoring an earlier unanswered message it was merged into).
+        """
+        messages = session["messages"]
+        unanswered = session.pop("unanswered", None)
+        if result.get("type") == "error":
+            if messages and messages[-1]["role"] == "user":
+                if unanswered is None:
+                    messages.pop()
+                else:
+                    messages[-1]["content"] = unanswered
+            return
+        messages.append({"role": "assistant", "content": reply_text(result)})
+        with self._lock:
+            self._stats["turns"] += 1
+
+    def stats(self) -> dict:
+        """Session counts and memory footprint (bytes of stored JSON) for /metrics."""
+        store = self._store.stats()
+        with self._lock:
+            return {
+                "created": self._stats["created"],
+                "resumed": store["hits"],
+                "expired": store["misses"],
+                "evictions": store["evictions"],
+                "turns": self._stats["turns"],
+                "condensed_messages": self._stats["condensed_messages"],
+                "sessions": store["entries"],
+                "memory_bytes": store["memory_bytes"],
+                "persistent": store["persistent"],
+            }
+
+    def close(self) -> None:
+        self._store.close()
@@ -0,0 +1,63 @@
+"""
+Single-flight request coalescing for the async endpoints.
+
+Concurrent calls with the same key share one upstream call: the first caller
+starts it, everyone arriving while it runs awaits the same result (or error).
+The upstream call is cancelled only when every caller has given up on it.
+"""
+import asyncio
+
+
+class SingleFlight:
+    """Coalesces identical in-flight async calls. Use from a single event loop."""
+
+    def __init__(self):
+        self._inflight = {}  # key -> asyncio.Future of the shared call
+        self._waiters = {}   # shared call future -> callers still awaiting it
+        self._stats = {"calls": 0, "upstream_calls": 0, "coalesced": 0, "cancelled": 0}
+
+    async def do(self, key, fn):
+        """
+        Return the result of `fn()` (a zero-argument coroutine function), sharing one
+        call among all concurrent callers with the same `key`.
+        """
+        self._stats["calls"] += 1
+        future = self._inflight.get(key)
+        if future is not None:
+            self._stats["coalesced"] += 1
+        else:
+            self._stats["upstream_calls"] += 1
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._finish(key, f))
+
+        # shield: one caller going away must not cancel the call the others wait for
+        self._waiters[future] = self._waiters.get(future, 0) + 1
+        try:
+            return await asyncio.shield(future)
+        finally:
+            self._waiters[future] -= 1
+            if not self._waiters[future]:
+                del self._waiters[future]
+                if not future.done():
+                    # every caller disconnected or timed out: stop the shared call,
+                    # and let a new caller start afresh instead of joining it
+                    future.cancel()
+                    self._stats["cancelled"] += 1
+                    if self._inflight.get(key) is future:
+                        del self._inflight[key]
+
+    def _finish(self, key, future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            # mark the exception as retrieved even if every waiter is gone
+            future.exception()
+
+    def stats(self) -> dict:
+        calls = self._stats["calls"]
+        return {
+            **self._stats,
+            "in_flight": len(self._inflight),
+            "coalesced_ratio": round(self._stats["coalesced"] / calls, 3) if calls else 0.0,
+        }
@@ -0,0 +1,361 @@
+"""
+Rule-based cleanup of German and English speech-to-text transcripts.
+
+"ähm also ich bräuchte äh zwei Packungen Dübel sechs Millimeter danke" becomes
+"2 Packungen Dübel 6mm": filler words, greetings, politeness markers and order
+lead-ins ("ich bräuchte", "I need") are dropped, stutters ("die die") collapsed,
+spoken numbers written as digits ("fünfhundert" -> 500, "vier mal vierzig" -> 4x40,
+"zwei komma fünf" -> 2.5) and unit words abbreviated the way the catalog spells
+them ("Millimeter" -> mm, "Größe zehn" -> Gr.10).
+
+Transcripts that are long or contain self-corrections ("zehn, nein, zwölf Paar")
+are flagged so the caller can hand them to Claude instead.
+"""
+import re
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+from backend.utils.number_words import parse_number_words
+
+
+# transcripts longer than this (words) are flagged "long"
+LONG_TRANSCRIPT_WORDS = 60
+
+# hesitations: never part of an order
+HESITATIONS = ['äh', 'ähm', 'ähhm', 'öh', 'öhm', 'eh', 'ehm', 'hm', 'hmm', 'mhm', 'mh', 'um', 'uh', 'uhm', 'erm']
+# dropped wherever they occur; matched as whole (multi-)word phrases, longest first
+FILLER_PHRASES = HESITATIONS + [
+    # discourse markers
+    'naja', 'na ja', 'sozusagen', 'quasi', 'und so', 'und so weiter', 'oder so',
+    'you know', 'i mean', 'basically', 'or so', 'and so on',
+    # greetings and sign-offs
+    'hallo', 'hi', 'hey', 'moin', 'servus', 'grüß gott', 'guten morgen', 'guten tag', 'guten abend',
+    'hello', 'good morning', 'good afternoon', 'tschüss', 'ciao', 'bye',
+    # politeness
+    'bitte', 'bitteschön', 'bitte schön', 'danke', 'dankeschön', 'danke schön', 'vielen dank',
+    'danke dir', 'danke euch', 'gerne', 'gern',
+    'please', 'thanks', 'thank you', 'thanks a lot', 'cheers',
+    # order lead-ins
+    'ich brauche', 'ich bräuchte', 'ich benötige', 'ich hätte gern', 'ich hätte gerne', 'ich möchte',
+    'ich bestelle', 'ich will', 'wir brauchen', 'wir bräuchten', 'wir benötigen', 'wir hätten gern',
+    'wir hätten gerne', 'wir möchten', 'wir bestellen', 'kannst du', 'könnt ihr', 'können sie',
+    'bestellen', 'besorgen', 'bestellen sie', 'schicken',
+    'i need', 'i would like', "i'd like", 'we need', 'we would like', "we'd like", 'i want',
+    'we want', 'can i get', 'can we get', 'could you order', 'could i get', 'i would need',
+    'we would need',
+]
+# fillers that are also ordinary words ("well pump", "noch 3 Schrauben", "so 5 Stück"): only
+# dropped where they open an utterance or clause, or between hesitations ("äh also äh")
+AMBIGUOUS_FILLERS = [
+    'also', 'ja', 'jo', 'halt', 'eben', 'genau', 'irgendwie', 'okay', 'ok', 'mal eben', 'mal', 'so', 'noch',
+    'like', 'well', 'yeah', 'just', 'kind of', 'sort of',
+]
+
+
+def _phrase_index(phrases: list) -> dict:
+    """first word -> list of phrase tuples, longest first"""
+    index = {}
+    for phrase in phrases:
+        words = tuple(phrase.split())
+        index.setdefault(words[0], []).append(words)
+    for entries in index.values():
+        entries.sort(key=len, reverse=True)
+    return index
+
+
+_FILLERS = _phrase_index(FILLER_PHRASES)
+_AMBIGUOUS = _phrase_index(AMBIGUOUS_FILLERS)
+_HESITATIONS = set(HESITATIONS)
+
+# words that reverse or replace what was just said: the transcript needs Claude
+SELF_CORRECTIONS = [
+    'nein', 'doch nicht', 'ich meine', 'ich mein', 'oder besser', 'lieber doch', 'korrektur',
+    'quatsch', 'streich das', 'stattdessen', 'sorry', 'no wait', 'scratch that', 'actually no',
+    'i meant', 'instead', 'rather',
+]
+_CORRECTION_RE = re.compile(r"(?<![\w])(?:" + "|".join(re.escape(p) for p in SELF_CORRECTIONS) + r")(?![\w])", re.I)
+
+# spoken unit -> written unit, attached to the number in front of it ("6mm")
+UNIT_WORDS = {
+    'millimeter': 'mm', 'millimetern': 'mm', 'millimeters': 'mm', 'millimetre': 'mm', 'millimetres': 'mm',
+    'zentimeter': 'cm', 'zentimetern': 'cm', 'centimeter': 'cm', 'centimeters': 'cm', 'centimetre': 'cm',
+    'centimetres': 'cm',
+    'meter': 'm', 'metern': 'm', 'meters': 'm', 'metre': 'm', 'metres': 'm',
+    'quadratmeter': 'm²', 'quadratmetern': 'm²', 'kubikmeter': 'm³', 'quadratmillimeter': 'mm²',
+    'kilogramm': 'kg', 'kilo': 'kg', 'kilos': 'kg', 'kilogram': 'kg', 'kilograms': 'kg',
+    'gramm': 'g', 'grams': 'g',
+    'liter': 'L', 'litern': 'L', 'liters': 'L', 'litre': 'L', 'litres': 'L',
+    'prozent': '%', 'percent': '%',
+}
+# two-word units ("square meters")
+UNIT_PHRASES = {('square', 'meters'): 'm²', ('square', 'metres'): 'm²', ('cubic', 'meters'): 'm³'}
+# spoken prefix -> written prefix, joined to the number after it ("TX zwanzig" -> TX20)
+NUMBER_PREFIXES = {
+    'größe': 'Gr.', 'grösse': 'Gr.', 'groesse': 'Gr.', 'gr': 'Gr.', 'gr.': 'Gr.', 'size': 'Gr.',
+    'tx': 'TX', 'torx': 'TX', 'm': 'M', 'ph': 'PH', 'pz': 'PZ', 'ffp': 'FFP', 'wd': 'WD-',
+}
+# "vier mal vierzig" -> 4x40
+_DIMENSION_WORDS = {'mal', 'x', 'by', '×'}
+_DECIMAL_WORDS = {'komma', 'point'}
+# articles that are not turned into "1" on their own ("eine Kabeltrommel")
+_ARTICLES = {'ein', 'eine', 'einen', 'einem', 'einer', 'eins', 'a', 'an'}
+_ENGLISH_TENS = {'twenty', 'thirty', 'forty', 'fifty', 'sixty', 'seventy', 'eighty', 'ninety'}
+_MULTIPLIER_WORDS = {'hundert', 'hundred', 'tausend', 'thousand', 'dutzend', 'dozen'}
+# left over at the edges of a clause once fillers are gone
+_EDGE_WORDS = {'und', 'and', 'oder', 'or', 'auch', 'also', 'dann', 'then'}
+
+_TOKEN_RE = re.compile(r"[\wäöüÄÖÜß²³']+(?:[\-./][\wäöüÄÖÜß²³]+)*\.?|[,;:!?.]")
+_DIGITS_RE = re.compile(r"\d+(?:\.\d+)?")
+_PUNCT = ",;:!?."
+
+NormalizedTranscript = namedtuple("NormalizedTranscript", ["text", "flags"])
+
+_stats_lock = threading.Lock()
+_stats = {"calls": 0, "words_in": 0, "words_out": 0, "total_ms": 0.0, "max_ms": 0.0, "flagged": {}}
+
+
+def _lower(token: str) -> str:
+    return token.lower().rstrip('.') if token not in _PUNCT else token
+
+
+@lru_cache(maxsize=4096)
+def _value(token: str):
+    """Integer value of a single number token (digits or number word), else None."""
+    if _DIGITS_RE.fullmatch(token) and '.' not in token:
+        return int(token)
+    word = _lower(token)
+    if not word or word[0].isdigit():
+        return None
+    return parse_number_words(word)
+
+
+def _extends(run: list, token: str) -> bool:
+    """Whether `token` continues the spoken number in `run` ("zwei" + "hundert", "twenty" + "five")."""
+    word = _lower(token)
+    if word in _MULTIPLIER_WORDS:
+        return True
+    prev = _lower(run[-1])
+    value, prev_value = _value(token), _value(run[-1])
+    if value is None or prev_value is None or prev[0].isdigit() or word[0].isdigit():
+        return False
+    if prev in _MULTIPLIER_WORDS or prev_value % 100 == 0:
+        # "two hundred fifty", "zweihundert fünfzig"
+        return 0 < value < (1000 if prev_value % 1000 == 0 else 100)
+    # "twenty five" (German says "fünfundzwanzig": "zwanzig vier" is two numbers)
+    return prev in _ENGLISH_TENS and 0 < value < 10
+
+
+def _number_run(tokens: list, start: int) -> tuple:
+    """(value, end) of the longest spoken number starting at tokens[start], or (None, start)."""
+    if _lower(tokens[start]) in ('a', 'an') and start + 1 < len(tokens) \
+            and _lower(tokens[start + 1]) in _MULTIPLIER_WORDS:
+        # "a dozen", "a hundred"
+        return _number_run(tokens, start + 1)
+    if _value(tokens[start]) is None:
+        return None, start
+    run = [tokens[start]]
+    end = start + 1
+    while end < len(tokens):
+        word = _lower(tokens[end])
+        if word in ('und', 'and') and end + 1 < len(tokens):
+            # "fünf und zwanzig", "hundred and five"
+            prev, nxt = _value(run[-1]), _value(tokens[end + 1])
+            if prev is not None and nxt is not None and not tokens[end + 1][0].isdigit() and (
+                    (0 < prev < 10 and 20 <= nxt <= 90 and nxt % 10 == 0)
+                    or (_lower(run[-1]) in ('hundred', 'thousand') and 0 < nxt < 100)):
+                run += [tokens[end], tokens[end + 1]]
+                end += 2
+                continue
+            break
+        if not _extends(run, tokens[end]):
+            break
+        run.append(tokens[end])
+        end += 1
+    if len(run) == 1:
+        if _lower(run[0]) in _ARTICLES:
+            return None, start
+        if run[0][0].isdigit():
+            return int(run[0]), end
+    value = parse_number_words(" ".join(_lower(t) for t in run))
+    return (value, end) if value is not None else (None, start)
+
+
+def _write_numbers(tokens: list) -> list:
+    """Spoken numbers, decimals, dimensions, prefixes and units -> written form."""
+    out = []
+    i = 0
+    while i < len(tokens):
+        value, end = _number_run(tokens, i)
+        if value is None:
+            out.append(tokens[i])
+            i += 1
+            continue
+        number = str(value)
+        # "zwei komma fünf" -> 2.5
+        if end + 1 < len(tokens) and _lower(tokens[end]) in _DECIMAL_WORDS:
+            fraction = _value(tokens[end + 1])
+            if fraction is not None and 0 <= fraction < 10:
+                number += "." + str(fraction)
+                end += 2
+        # "vier mal vierzig" -> 4x40
+        if end + 1 < len(tokens) and _lower(tokens[end]) in _DIMENSION_WORDS:
+            other, other_end = _number_run(tokens, end + 1)
+            if other is not None:
+                number += "x" + str(other)
+                end = other_end
+        # "TX zwanzig" -> TX20 ("Größe zehn" -> Gr.10)
+        if out and _lower(out[-1]) in NUMBER_PREFIXES and not (len(out) > 1 and _DIGITS_RE.fullmatch(out[-2])):
+            number = NUMBER_PREFIXES[_lower(out.pop())] + number
+        # "sechs Millimeter" -> 6mm
+        if end + 1 < len(tokens) and (_lower(tokens[end]), _lower(tokens[end + 1])) in UNIT_PHRASES:
+            number += UNIT_PHRASES[(_lower(tokens[end]), _lower(tokens[end + 1]))]
+            end += 2
+        elif end < len(tokens) and _lower(tokens[end]) in UNIT_WORDS:
+            number += UNIT_WORDS[_lower(tokens[end])]
+            end += 1
+        out.append(number)
+        i = end
+    return out
+
+
+def _match(index: dict, tokens: list, i: int) -> int:
+    """Length of the longest phrase of `index` at tokens[i], else 0."""
+    words = [_lower(t) for t in tokens[i:i + 4]]
+    for phrase in index.get(words[0], ()):
+        if tuple(words[:len(phrase)]) == phrase:
+            return len(phrase)
+    return 0
+
+
+def _between_hesitations(tokens: list, start: int, end: int) -> bool:
+    """Whether tokens[start:end] has a hesitation before it and, past further ambiguous fillers, after it."""
+    if start == 0 or _lower(tokens[start - 1]) not in _HESITATIONS:
+        return False
+    while end < len(tokens):
+        if _lower(tokens[end]) in _HESITATIONS:
+            return True
+        length = _match(_AMBIGUOUS, tokens, end)
+        if not length:
+            return False
+        end += length
+    return False
+
+
+def _drop_fillers(tokens: list) -> list:
+    out = []
+    opening = True  # nothing but fillers since the start of the utterance or clause
+    i = 0
+    while i < len(tokens):
+        length = _match(_FILLERS, tokens, i)
+        if not length:
+            length = _match(_AMBIGUOUS, tokens, i)
+            if length and not (opening or _between_hesitations(tokens, i, i + length)):
+                length = 0
+        if length:
+            i += length
+            continue
+        out.append(tokens[i])
+        opening = tokens[i] in _PUNCT
+        i += 1
+    return out
+
+
+def _collapse_repeats(tokens: list) -> list:
+    """Stutters: "die die Dübel" -> "die Dübel", "zehn Paar zehn Paar" -> "zehn Paar"."""
+    out = []
+    for token in tokens:
+        out.append(token)
+        for n in (1, 2, 3):
+            if len(out) >= 2 * n and [_lower(t) for t in out[-n:]] == [_lower(t) for t in out[-2 * n:-n]] \
+                    and not all(t in _PUNCT for t in out[-n:]):
+                del out[-n:]
+                break
+    return out
+
+
+def _render(tokens: list) -> str:
+    """Join tokens, tidy punctuation and trim dangling "und"/"also" around clauses."""
+    clauses = [[]]
+    for token in tokens:
+        if token in _PUNCT:
+            clauses[-1].append(token)
+            clauses.append([])
+        else:
+            clauses[-1].append(token)
+
+    parts = []
+    for clause in clauses:
+        words = [t for t in clause if t not in _PUNCT]
+        punct = clause[-1] if clause and clause[-1] in _PUNCT else ""
+        while words and _lower(words[0]) in _EDGE_WORDS:
+            words.pop(0)
+        while words and _lower(words[-1]) in _EDGE_WORDS:
+            words.pop()
+        if not words:
+            # clause emptied: keep a sentence end, drop the comma
+            if punct in ".!?" and punct and parts and parts[-1][-1] in ",;:":
+                parts[-1] = parts[-1][:-1] + punct
+            continue
+        parts.append(" ".join(words) + punct)
+
+    text = " ".join(parts).strip(" ,;:")
+    if text and text[0].islower():
+        text = text[0].upper() + text[1:]
+    return text
+
+
+def normalize_transcript(text: str) -> NormalizedTranscript:
+    """
+    Clean a raw speech-to-text transcript without the LLM.
+
+    Args:
+        text: Raw transcript ("ähm also zwei Packungen Dübel sechs Millimeter bitte")
+
+    Returns:
+        NormalizedTranscript(text, flags): the cleaned text ("2 Packungen Dübel 6mm") and
+        the reasons it may still need Claude ("long", "self_correction", "empty"),
+        empty when the local result can be used as is
+    """
+    start = time.perf_counter()
+    raw = str(text or "")
+    tokens = _TOKEN_RE.findall(raw)
+    # a sentence-final "danke." keeps its period as a separate token
+    tokens = [t for token in tokens for t in ((token[:-1], ".") if len(token) > 1 and token.endswith(".")
+                                              and _lower(token) not in NUMBER_PREFIXES else (token,))]
+    cleaned = _render(_collapse_repeats(_drop_fillers(_write_numbers(tokens))))
+
+    flags = []
+    words_in = sum(1 for t in tokens if t not in _PUNCT)
+    if words_in > LONG_TRANSCRIPT_WORDS:
+        flags.append("long")
+    if _CORRECTION_RE.search(raw):
+        flags.append("self_correction")
+    if not cleaned and raw.strip():
+        flags.append("empty")
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    with _stats_lock:
+        _stats["calls"] += 1
+        _stats["words_in"] += words_in
+        _stats["words_out"] += len(cleaned.split())
+        _stats["total_ms"] += elapsed_ms
+        _stats["max_ms"] = max(_stats["max_ms"], elapsed_ms)
+        for flag in flags:
+            _stats["flagged"][flag] = _stats["flagged"].get(flag, 0) + 1
+
+    return NormalizedTranscript(cleaned, flags)
+
+
+def normalizer_stats() -> dict:
+    """Transcript normalizer call count, latency, words removed and flag counts for /metrics."""
+    with _stats_lock:
+        calls = _stats["calls"]
+        return {
+            "calls": calls,
+            "avg_ms": round(_stats["total_ms"] / calls, 4) if calls else 0.0,
+            "max_ms": round(_stats["max_ms"], 4),
+            "words_removed_ratio": round(1 - _stats["words_out"] / _stats["words_in"], 3) if _stats["words_in"] else 0.0,
+            "flagged": dict(_stats["flagged"]),
+        }
@@ -0,0 +1,121 @@
+"""
+Key-value store of JSON-serializable values with LRU eviction and a TTL.
+
+Tier 1 is an in-memory LRU of the values' JSON text; tier 2 (optional) is a SQLite
+table that survives restarts. Both ResponseCache and SessionStore keep their
+entries here, so eviction, expiry and persistence behave the same for both.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLStore:
+    """
+    LRU + TTL store of JSON-serializable values, optionally backed by SQLite.
+
+    Thread-safe: agent functions run in worker threads. get() returns a fresh copy
+    (decoded from JSON), so callers may modify it without touching the stored value.
+
+    Args:
+        max_entries: In-memory capacity (least recently used entries are evicted)
+        ttl_seconds: Lifetime of an entry in both tiers, renewed by every set()
+        sqlite_path: File for the persistent tier, or None for memory only
+        table: SQLite table of the persistent tier
+        key_column: Name of the table's key column
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 6 * 3600, sqlite_path: str = None,
+                 table: str = "ttl_store", key_column: str = "key"):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, json text)
+        self._memory_bytes = 0
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        self._db = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._select = f"SELECT value, expires_at FROM {table} WHERE {key_column} = ? AND expires_at > ?"
+            self._upsert = f"INSERT OR REPLACE INTO {table} ({key_column}, value, expires_at) VALUES (?, ?, ?)"
+            self._delete = f"DELETE FROM {table} WHERE {key_column} = ?"
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                f"({key_column} TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute(f"DELETE FROM {table} WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+
+    def _store_memory(self, key: str, expires_at: float, text: str) -> None:
+        old = self._entries.pop(key, None)
+        if old:
+            self._memory_bytes -= len(old[1])
+        self._entries[key] = (expires_at, text)
+        self._memory_bytes += len(text)
+        while len(self._entries) > self.max_entries:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self._stats["evictions"] += 1
+
+    def get(self, key: str):
+        """Stored value for `key`, or None if unknown or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return json.loads(entry[1])
+            if entry:
+                self._memory_bytes -= len(entry[1])
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(self._select, (key, now)).fetchone()
+                if row:
+                    # promote to memory so the next hit skips SQLite
+                    self._store_memory(key, row[1], row[0])
+                    self._stats["hits"] += 1
+                    self._stats["disk_hits"] += 1
+                    return json.loads(row[0])
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value) -> None:
+        """Store a JSON-serializable `value` in both tiers and (re)start its lifetime."""
+        text = json.dumps(value, ensure_ascii=False)
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._store_memory(key, expires_at, text)
+            if self._db is not None:
+                self._db.execute(self._upsert, (key, text, expires_at))
+                self._db.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry:
+                self._memory_bytes -= len(entry[1])
+            if self._db is not None:
+                self._db.execute(self._delete, (key,))
+                self._db.commit()
+
+    def stats(self) -> dict:
+        """Hit/miss and eviction counts, size and memory footprint (bytes of stored JSON)."""
+        with self._lock:
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "memory_bytes": self._memory_bytes,
+                "persistent": self._db is not None,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
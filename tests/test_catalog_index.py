@@ -0,0 +1,117 @@
+import os
+
+import pytest
+
+from backend.utils.catalog_index import CatalogIndex, load_catalog_csv, normalize_id
+from backend.utils.request_agent import match_and_price
+
+
+ROWS = [
+    {"artikel_id": "C001", "artikelname": "Schraube TX20 4x40", "kategorie": "Befestigung", "einheit": "Stk",
+     "preis_eur": "0.08"},
+    {"artikel_id": "C019", "artikelname": "Arbeitshandschuhe Gr.9", "kategorie": "PSA", "einheit": "Paar",
+     "preis_eur": 3.5},
+    {"artikel_id": "C020", "artikelname": "Arbeitshandschuhe Gr.10", "kategorie": "PSA", "einheit": "Paar",
+     "preis_eur": "n/a"},
+    {"artikel_id": " c047 ", "artikelname": "Zollstock 2m", "kategorie": "Werkzeug", "einheit": "Stk",
+     "preis_eur": None},
+]
+
+CSV = """artikel_id,artikelname,kategorie,einheit,preis_eur,lieferant,lagerort
+C001,Schraube TX20 4x40,Befestigung,Stk,0.08,Würth,Container A
+C004,Dübel 6mm,Kunststoff,Stk,{price},Fischer,Container A
+"""
+
+
+@pytest.fixture
+def index():
+    return CatalogIndex(ROWS)
+
+
+def test_ids_are_normalized(index):
+    assert normalize_id(" c001 ") == "C001"
+    assert normalize_id(None) == ""
+    assert index.keys == ["C001", "C019", "C020", "C047"]
+    assert index.get("c047")["artikelname"] == "Zollstock 2m"
+    assert index.get("C999") is None
+
+
+def test_prices_are_parsed_once(index):
+    assert index.prices == {"C001": 0.08, "C019": 3.5, "C020": 0.0, "C047": 0.0}
+
+
+def test_exact_match_and_total():
+    priced = match_and_price({"materials": [["c001", 500], ["C019", "2"]]}, catalog=ROWS)
+    assert [(i["artikel_id"], i["anzahl"], i["match_type"]) for i in priced["items"]] == [
+        ("C001", 500, "exact"), ("C019", 2, "exact")]
+    assert priced["total"] == pytest.approx(47.0)
+    assert priced["requireApproval"] is False
+
+
+def test_fuzzy_id_match(index):
+    assert index.closest_id("C0019") == "C019"
+    priced = match_and_price({"materials": [["C0019", 1, "Arbeitshandschuhe Gr.9"]]}, catalog=index)
+    assert priced["items"][0]["artikel_id"] == "C019"
+    assert priced["items"][0]["match_type"] == "fuzzy_id"
+
+
+def test_name_overrides_a_fuzzy_id_pointing_elsewhere(index):
+    # "C0019" is one edit from C019, but the name says Zollstock
+    priced = match_and_price({"materials": [["C0019", 1, "Zollstock 2m"]]}, catalog=index)
+    assert priced["items"][0]["artikel_id"] == " c047 "
+    assert priced["items"][0]["match_type"] == "name"
+
+
+def test_name_match_for_made_up_id(index):
+    assert index.match_name("Arbeitshandschuhe Gr.10") == "C020"
+    priced = match_and_price({"materials": [["XYZ-1", 3, "Schraube TX20 4x40"]]}, catalog=index)
+    assert priced["items"][0]["artikel_id"] == "C001"
+    assert priced["items"][0]["match_type"] == "name"
+
+
+def test_unknown_product_and_bad_entries(index):
+    priced = match_and_price({"materials": [["XYZ-1", "drei"], ["C001"]]}, catalog=index)
+    assert len(priced["items"]) == 1
+    assert priced["items"][0]["matched"] is False
+    assert priced["items"][0]["anzahl"] == 0
+    assert match_and_price({}, catalog=index) == {"total": 0.0, "requireApproval": False, "items": []}
+
+
+def test_approval_threshold(index):
+    priced = match_and_price({"materials": [["C019", 200]]}, catalog=index, approval_threshold=500.0)
+    assert priced["total"] == pytest.approx(700.0)
+    assert priced["requireApproval"] is True
+
+
+def test_csv_is_memoized_per_file_version(tmp_path):
+    path = tmp_path / "catalog.csv"
+    path.write_text(CSV.format(price="0.10"), encoding="utf-8")
+    first = load_catalog_csv(str(path))
+    assert load_catalog_csv(str(path)) is first
+    assert first.prices["C004"] == 0.10
+    assert first.get("C001")["lagerort"] == "Container A"
+
+    projected = load_catalog_csv(str(path), drop_fields=("lagerort",))
+    assert projected is not first
+    assert "lagerort" not in projected.get("C001")
+    assert load_catalog_csv(str(path), drop_fields=("lagerort",)) is projected
+
+    path.write_text(CSV.format(price="0.12"), encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    second = load_catalog_csv(str(path))
+    assert second is not first
+    assert second.prices["C004"] == 0.12
+    assert second.version != first.version
+    assert second.assortment_version != first.assortment_version
+
+
+def test_missing_csv_is_an_empty_index(tmp_path):
+    assert len(load_catalog_csv(str(tmp_path / "missing.csv"))) == 0
+
+
+def test_stock_does_not_change_the_assortment_version():
+    a = CatalogIndex([dict(ROWS[0], lagerbestand=5)])
+    b = CatalogIndex([dict(ROWS[0], lagerbestand=50)])
+    assert a.version != b.version
+    assert a.assortment_version == b.assortment_version
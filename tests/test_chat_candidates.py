@@ -0,0 +1,43 @@
+import pytest
+
+from backend.utils.catalog_index import load_catalog_csv
+from backend.utils.request_agent import _chat_candidates
+
+
+OPENING = [{"role": "user", "content": "Schrauben TX20"}]
+FOLLOW_UP = OPENING + [{"role": "assistant", "content": "Welche Länge?"},
+                       {"role": "user", "content": "4x40, 500 Stück und 10 Paar Arbeitshandschuhe Gr.10"}]
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return load_catalog_csv("backend/data/sample.csv")
+
+
+def ids(rows) -> list:
+    return [row["artikel_id"] for row in rows]
+
+
+def test_later_turns_add_their_products_at_the_end(catalog):
+    # K as many as the opening's hits: no rows filled up, the gloves must come from the follow-up
+    context = {}
+    opening = ids(_chat_candidates(OPENING, catalog, 4, context))
+    assert "C001" in opening and "C020" not in opening
+
+    follow_up = ids(_chat_candidates(FOLLOW_UP, catalog, 4, context))
+    assert follow_up[:len(opening)] == opening
+    assert {"C019", "C020"} <= set(follow_up[len(opening):])
+    assert context["candidate_ids"] == follow_up
+    # the same turn again (e.g. the selection after the decision model) adds nothing
+    assert ids(_chat_candidates(FOLLOW_UP, catalog, 4, context)) == follow_up
+
+
+def test_without_a_session_all_user_turns_are_retrieved(catalog):
+    rows = ids(_chat_candidates(FOLLOW_UP, catalog, 40))
+    assert {"C001", "C020"} <= set(rows)
+
+
+def test_whole_catalog_without_top_k(catalog):
+    context = {}
+    assert _chat_candidates(OPENING, catalog, None, context) is catalog.rows
+    assert _chat_candidates(FOLLOW_UP, catalog, None, context) is catalog.rows
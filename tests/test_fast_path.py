@@ -0,0 +1,34 @@
+import pytest
+
+from backend.benchmarks.bench_fast_path import CASES
+from backend.utils.catalog_index import load_catalog_csv
+from backend.utils.fast_path import match_order, try_fast_path
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return load_catalog_csv("backend/data/sample.csv")
+
+
+@pytest.mark.parametrize("text, expected", CASES, ids=[text[:40] for text, _ in CASES])
+def test_match_order(catalog, text, expected):
+    selection = match_order(text, catalog)
+    if expected is None:
+        assert selection is None
+    else:
+        assert selection is not None
+        assert {artikel_id: anzahl for artikel_id, anzahl, _ in selection["materials"]} == expected
+
+
+def test_quantities_of_one_product_add_up(catalog):
+    selection = match_order("10 Dübel 6mm, 5 Dübel 6mm", catalog)
+    assert [m[:2] for m in selection["materials"]] == [["C004", 15]]
+
+
+def test_try_fast_path_meta(catalog):
+    selection, meta = try_fast_path("500 Schraube TX20 4x40", catalog)
+    assert selection["materials"][0][:2] == ["C001", 500]
+    assert meta["fast_path"] == "hit"
+    selection, meta = try_fast_path("Arbeitshandschuhe", catalog)
+    assert selection is None
+    assert meta["fast_path"] == "miss"
@@ -0,0 +1,81 @@
+import pytest
+
+from backend.benchmarks.mock_anthropic import MockAnthropic
+from backend.utils.deadline import CallScope, RequestCancelled, current_scope
+from backend.utils.llm_governor import GovernedClient, LLMGovernor
+
+
+REQUEST = {"model": "m", "max_tokens": 100, "messages": [{"role": "user", "content": "hi"}]}
+
+
+class CancellingStream:
+    """A stream whose scope is cancelled after the first chunk; records whether it was closed."""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.chunks = 0
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.closed = True
+        return False
+
+    @property
+    def text_stream(self):
+        for chunk in ["one", "two", "three"]:
+            self.chunks += 1
+            self.scope.cancel()
+            yield chunk
+
+    def get_final_message(self):
+        raise AssertionError("cancelled stream read to the end")
+
+
+class Messages:
+    def __init__(self, stream):
+        self._stream = stream
+
+    def create(self, **kwargs):
+        raise AssertionError("create is not cancellable")
+
+    def stream(self, **kwargs):
+        return self._stream
+
+
+def governed(client):
+    return GovernedClient(client, LLMGovernor(1e9, 1e12, max_retries=0))
+
+
+def test_create_without_scope_is_a_plain_call():
+    mock = MockAnthropic(["plain"])
+    message = governed(mock).messages.create(**REQUEST)
+    assert message.content[0].text == "plain"
+    assert len(mock.messages.calls) == 1
+
+
+def test_create_under_scope_returns_the_final_message():
+    mock = MockAnthropic(["a reply in several chunks"], chunk_chars=4)
+    token = current_scope.set(CallScope(30))
+    try:
+        message = governed(mock).messages.create(**REQUEST)
+    finally:
+        current_scope.reset(token)
+    assert message.content[0].text == "a reply in several chunks"
+    assert len(mock.messages.calls) == 1
+
+
+def test_cancelled_scope_stops_a_running_create_and_closes_it():
+    scope = CallScope(30)
+    stream = CancellingStream(scope)
+    client = governed(type("Client", (), {"messages": Messages(stream)})())
+    token = current_scope.set(scope)
+    try:
+        with pytest.raises(RequestCancelled):
+            client.messages.create(**REQUEST)
+    finally:
+        current_scope.reset(token)
+    assert stream.chunks == 1
+    assert stream.closed
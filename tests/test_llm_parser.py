@@ -0,0 +1,73 @@
+import json
+import os
+
+import pytest
+
+from backend.utils.llm_parser import ResponseParser, parse_response
+
+
+OUTPUTS_PATH = os.path.join(os.path.dirname(__file__), "..", "backend", "benchmarks", "llm_outputs.json")
+with open(OUTPUTS_PATH, encoding="utf-8") as f:
+    OUTPUTS = json.load(f)
+
+
+def streamed(text: str, size: int) -> tuple:
+    parser = ResponseParser()
+    entries = []
+    for i in range(0, len(text), size):
+        entries += parser.feed(text[i:i + size])
+    return parser.result(), entries
+
+
+@pytest.mark.parametrize("case", OUTPUTS, ids=[case["name"] for case in OUTPUTS])
+def test_parse_response(case):
+    parsed = parse_response(case["text"])
+    assert parsed["type"] == case["expect_type"]
+    if parsed["type"] == "json":
+        assert len(parsed["content"]["materials"]) == case["expect_materials"]
+
+
+@pytest.mark.parametrize("size", [1, 7, 10_000])
+@pytest.mark.parametrize("case", OUTPUTS, ids=[case["name"] for case in OUTPUTS])
+def test_streamed_same_as_complete(case, size):
+    parsed, _ = streamed(case["text"], size)
+    expected = parse_response(case["text"])
+    assert parsed["type"] == expected["type"]
+    if parsed["type"] == "json":
+        assert parsed["content"]["materials"] == expected["content"]["materials"]
+    elif parsed["type"] == "question":
+        assert parsed["content"] == expected["content"]
+
+
+def test_entries_streamed_as_they_close():
+    text = '{"materials": [["C001", 10, "Schraube TX20 4x40"], ["C004", 20, "Dübel 6mm"]], "explanation": "x"}'
+    parser = ResponseParser()
+    assert parser.feed(text[:text.index("]") + 1]) == [["C001", 10, "Schraube TX20 4x40"]]
+    assert parser.feed(text[text.index("]") + 1:]) == [["C004", 20, "Dübel 6mm"]]
+
+
+def test_is_question():
+    parser = ResponseParser()
+    assert parser.is_question is None
+    parser.feed("**QUES")
+    assert parser.is_question is None
+    parser.feed("TION: Welche Größe?")
+    assert parser.is_question is True
+    assert parser.result() == {"type": "question", "content": "Welche Größe?"}
+
+    parser = ResponseParser()
+    parser.feed("READY")
+    assert parser.is_question is False
+
+
+def test_truncated_reply_keeps_complete_entries():
+    parsed = parse_response('{"materials": [["C001", 10, "Schraube"], ["C004", 2')
+    assert parsed["type"] == "json"
+    assert parsed["recovered"] == "truncated"
+    assert parsed["content"]["materials"] == [["C001", 10, "Schraube"]]
+
+
+def test_trailing_commas_repaired():
+    parsed = parse_response('Hier: {"materials": [["C001", 10, "Schraube"],], "explanation": "x",}')
+    assert parsed["content"]["materials"] == [["C001", 10, "Schraube"]]
+    assert parsed["recovered"] == "trailing_commas"
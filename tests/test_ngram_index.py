@@ -0,0 +1,45 @@
+import difflib
+import random
+
+import pytest
+
+from backend.benchmarks.bench_fuzzy_ids import EDGE_CASES, hallucinate, make_keys
+from backend.utils.catalog_index import load_catalog_csv
+from backend.utils.ngram_index import TrigramIndex
+
+
+@pytest.mark.parametrize("keys, query", EDGE_CASES)
+def test_edge_cases_match_difflib(keys, query):
+    expected = difflib.get_close_matches(query, keys, n=1, cutoff=0.6)
+    assert TrigramIndex(keys).close_matches(query, n=1, cutoff=0.6) == expected
+
+
+def test_closer_key_beyond_one_edit_wins():
+    assert TrigramIndex(["C018X", "C019XYZ"]).closest("C019X") == "C019XYZ"
+
+
+def test_catalog_ids_match_difflib():
+    keys = load_catalog_csv("backend/data/sample.csv").keys
+    index = TrigramIndex(keys)
+    rng = random.Random(0)
+    for _ in range(500):
+        query = hallucinate(rng.choice(keys), rng)
+        assert index.close_matches(query) == difflib.get_close_matches(query, keys, n=1)
+
+
+def test_large_corpus_agrees_with_difflib():
+    # past max_candidates keys sharing as many trigrams are not all scored: near-total, not exact
+    keys = make_keys(2000)
+    index = TrigramIndex(keys)
+    rng = random.Random(1)
+    queries = [hallucinate(rng.choice(keys), rng) for _ in range(1000)]
+    agree = sum(index.closest(q) == (difflib.get_close_matches(q, keys, n=1) or [None])[0] for q in queries)
+    assert agree >= 0.99 * len(queries)
+
+
+def test_exact_and_unmatched_queries():
+    index = TrigramIndex(["C001", "C002", "WUE1234"])
+    assert index.closest("C001") == "C001"
+    assert index.closest("XYZ987") is None
+    assert index.close_matches("") == []
+    assert TrigramIndex([]).close_matches("C001") == []
@@ -0,0 +1,43 @@
+import pytest
+
+from backend.utils.catalog_index import load_catalog_csv
+from backend.utils.retrieval import BM25Retriever
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return load_catalog_csv("backend/data/sample.csv")
+
+
+def names(rows) -> list:
+    return [row["artikelname"] for row in rows]
+
+
+@pytest.mark.parametrize("query", ["Handschuhe", "Arbeitshandschuhe", "Handschuh"])
+def test_word_parts_match(catalog, query):
+    hits = names(catalog.retriever.top_k(query, 10))
+    assert {"Arbeitshandschuhe Gr.9", "Arbeitshandschuhe Gr.10", "Handschuh Latex"} <= set(hits)
+
+
+def test_whole_word_ranks_above_word_part():
+    retriever = BM25Retriever([{"artikelname": "Arbeitshandschuhe"}, {"artikelname": "Handschuh Latex"}])
+    assert names(retriever.top_k("Handschuh", 2)) == ["Handschuh Latex", "Arbeitshandschuhe"]
+
+
+def test_sizes_are_no_word_parts():
+    retriever = BM25Retriever([{"artikelname": "Mutter M10"}, {"artikelname": "Mutter M100"}])
+    assert names(retriever.top_k("M10", 2)) == ["Mutter M10"]
+
+
+def test_candidates_fill_up_to_k(catalog):
+    rows = catalog.candidates("Regal an Betonwand dübeln", 40)
+    assert len(rows) == 40
+    assert names(rows[:3]) == ["Dübel 6mm", "Dübel 8mm", "Dübel 10mm"]
+    assert {"Bohrer 8mm", "Schutzbrille klar"} <= set(names(rows))
+    assert len({row["artikel_id"] for row in rows}) == 40
+
+
+def test_candidates_without_hits_or_k(catalog):
+    assert catalog.candidates("masking tape and a bucket", 40) is catalog.rows
+    assert catalog.candidates("Dübel", None) is catalog.rows
+    assert catalog.candidates("Dübel", 1000) is catalog.rows
@@ -0,0 +1,86 @@
+import pytest
+
+from backend.utils.session_store import SessionStore
+
+
+QUESTION = {"type": "question", "content": "Welche Größe?"}
+ERROR = {"type": "error", "content": "API error"}
+
+
+@pytest.fixture
+def store():
+    store = SessionStore()
+    yield store
+    store.close()
+
+
+def test_turn_appends_user_and_assistant_messages(store):
+    _, session = store.create()
+    sent = store.start_turn(session, "Ich brauche Handschuhe")
+    assert sent == [{"role": "user", "content": "Ich brauche Handschuhe"}]
+    store.finish_turn(session, QUESTION)
+    assert session["messages"] == [{"role": "user", "content": "Ich brauche Handschuhe"},
+                                   {"role": "assistant", "content": "Welche Größe?"}]
+    assert "unanswered" not in session
+    assert store.stats()["turns"] == 1
+
+
+def test_failed_turn_takes_back_its_message(store):
+    _, session = store.create([{"role": "user", "content": "Handschuhe"}, {"role": "assistant", "content": "Größe?"}])
+    store.start_turn(session, "Gr.10")
+    store.finish_turn(session, ERROR)
+    assert session["messages"] == [{"role": "user", "content": "Handschuhe"},
+                                   {"role": "assistant", "content": "Größe?"}]
+
+
+def test_failed_turn_restores_merged_unanswered_message(store):
+    _, session = store.create()
+    store.start_turn(session, "Handschuhe")
+    store.finish_turn(session, ERROR)
+    store.start_turn(session, "Handschuhe")
+    sent = store.start_turn(session, "Gr.10")
+    assert sent == [{"role": "user", "content": "Handschuhe\nGr.10"}]
+    store.finish_turn(session, ERROR)
+    assert session["messages"] == [{"role": "user", "content": "Handschuhe"}]
+    assert "unanswered" not in session
+
+    store.start_turn(session, "Gr.10")
+    store.finish_turn(session, QUESTION)
+    assert session["messages"] == [{"role": "user", "content": "Handschuhe\nGr.10"},
+                                   {"role": "assistant", "content": "Welche Größe?"}]
+
+
+def test_history_is_condensed_within_budget():
+    store = SessionStore(history_token_budget=50)
+    _, session = store.create()
+    for turn in range(10):
+        store.start_turn(session, f"Nachricht {turn} " + "Schrauben " * 10)
+        store.finish_turn(session, QUESTION)
+    assert session["messages"][0]["content"].startswith("Nachricht 0")
+    assert len(session["messages"]) < 20
+    assert all("Nachricht 1 " not in m["content"] for m in session["messages"])
+    assert session["context"]["summary"].startswith("user: Nachricht")
+    assert store.stats()["condensed_messages"] > 0
+
+
+def test_get_returns_a_copy(store):
+    session_id, session = store.create()
+    store.start_turn(session, "Handschuhe")
+    store.save(session_id, session)
+    copy = store.get(session_id)
+    copy["messages"].append({"role": "assistant", "content": "x"})
+    assert store.get(session_id)["messages"] == [{"role": "user", "content": "Handschuhe"}]
+    assert store.get("unknown") is None
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SessionStore(sqlite_path=path)
+    session_id, session = store.create()
+    store.start_turn(session, "Handschuhe")
+    store.save(session_id, session)
+    store.close()
+
+    store = SessionStore(sqlite_path=path)
+    assert store.get(session_id)["messages"] == [{"role": "user", "content": "Handschuhe"}]
+    store.close()
@@ -0,0 +1,40 @@
+import json
+import os
+
+import pytest
+
+from backend.utils.transcript_normalizer import normalize_transcript
+
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "..", "backend", "benchmarks", "voice_transcripts.json")
+with open(CORPUS_PATH, encoding="utf-8") as f:
+    CORPUS = json.load(f)
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["raw"][:40] for case in CORPUS])
+def test_corpus(case):
+    got = normalize_transcript(case["raw"])
+    if case["expected"] is not None:
+        assert got.text == case["expected"]
+    assert got.flags == case["flags"]
+
+
+@pytest.mark.parametrize("raw, expected", [
+    # ambiguous fillers are only dropped where they open a clause or sit between hesitations
+    ("I need a well pump", "A well pump"),
+    ("well, I need a pump", "A pump"),
+    ("Kabelbinder so fünf Stück", "Kabelbinder so 5 Stück"),
+    ("so fünf Stück Kabelbinder", "5 Stück Kabelbinder"),
+    ("noch drei Schrauben", "3 Schrauben"),
+    ("zehn Schrauben und noch drei Dübel", "10 Schrauben und noch 3 Dübel"),
+    ("zehn Schrauben äh also äh acht Dübel", "10 Schrauben 8 Dübel"),
+    # hesitations go anywhere
+    ("zwei ähm Packungen Dübel", "2 Packungen Dübel"),
+])
+def test_ambiguous_fillers(raw, expected):
+    assert normalize_transcript(raw).text == expected
+
+
+def test_flags():
+    assert normalize_transcript("ähm äh").flags == ["empty"]
+    assert normalize_transcript("").text == ""
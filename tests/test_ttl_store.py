@@ -0,0 +1,77 @@
+import time
+
+from backend.utils.response_cache import ResponseCache
+from backend.utils.session_store import SessionStore
+from backend.utils.ttl_store import TTLStore
+
+
+def test_get_returns_a_copy():
+    store = TTLStore()
+    store.set("a", {"items": [1]})
+    value = store.get("a")
+    value["items"].append(2)
+    assert store.get("a") == {"items": [1]}
+
+
+def test_least_recently_used_entry_is_evicted():
+    store = TTLStore(max_entries=2)
+    store.set("a", 1)
+    store.set("b", 2)
+    assert store.get("a") == 1
+    store.set("c", 3)
+    assert store.get("b") is None
+    assert store.get("a") == 1
+    stats = store.stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 2
+    assert stats["memory_bytes"] == len("1") + len("3")
+
+
+def test_entries_expire(monkeypatch):
+    store = TTLStore(ttl_seconds=10)
+    store.set("a", 1)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert store.get("a") is None
+    assert store.stats()["entries"] == 0
+    assert store.stats()["misses"] == 1
+
+
+def test_delete():
+    store = TTLStore()
+    store.set("a", 1)
+    store.delete("a")
+    store.delete("unknown")
+    assert store.get("a") is None
+    assert store.stats()["memory_bytes"] == 0
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "store.sqlite")
+    store = TTLStore(sqlite_path=path, table="things", key_column="thing_id")
+    store.set("a", {"x": "ü"})
+    store.close()
+
+    reopened = TTLStore(sqlite_path=path, table="things", key_column="thing_id")
+    assert reopened.get("a") == {"x": "ü"}
+    assert reopened.get("a") == {"x": "ü"}
+    stats = reopened.stats()
+    assert stats["hits"] == 2
+    assert stats["disk_hits"] == 1
+    assert stats["persistent"] is True
+    reopened.close()
+
+
+def test_cache_and_sessions_share_one_file(tmp_path):
+    path = str(tmp_path / "shared.sqlite")
+    cache = ResponseCache(sqlite_path=path)
+    sessions = SessionStore(sqlite_path=path)
+    cache.set("k", {"total": 1.0})
+    session_id, session = sessions.create()
+    sessions.save(session_id, session)
+    assert cache.get(session_id) is None
+    assert sessions.get("k") is None
+    assert cache.get("k") == {"total": 1.0}
+    assert sessions.get(session_id) == session
+    cache.close()
+    sessions.close()